@@ -0,0 +1,88 @@
+"""
+轻量 ABI 编解码
+
+只实现本项目用到的几种布局（定长字、address、string / bytes、Multicall3
+aggregate3 的参数和返回值），不依赖 eth_abi：导入 eth_abi 及其依赖需要约
+0.4 秒，而这里的解码只是按偏移量切片。
+
+地址输出为小写的 0x 十六进制字符串，与 eth_abi 5 的解码结果一致。
+"""
+
+WORD = 32
+
+
+def _check(data, offset, size):
+    if offset < 0 or offset + size > len(data):
+        raise ValueError(
+            f"ABI 数据长度不足: 需要 {offset + size} 字节，实际 {len(data)}"
+        )
+
+
+def read_uint(data, offset):
+    _check(data, offset, WORD)
+    return int.from_bytes(data[offset : offset + WORD], "big")
+
+
+def read_address(data, offset):
+    _check(data, offset, WORD)
+    return "0x" + data[offset + 12 : offset + WORD].hex()
+
+
+def read_bytes(data, offset):
+    """offset 为长度字所在位置"""
+    length = read_uint(data, offset)
+    _check(data, offset + WORD, length)
+    return bytes(data[offset + WORD : offset + WORD + length])
+
+
+def read_string(data, offset):
+    return read_bytes(data, offset).decode("utf-8")
+
+
+def encode_uint(value):
+    return value.to_bytes(WORD, "big")
+
+
+def encode_address(address):
+    return bytes.fromhex(address[2:]).rjust(WORD, b"\x00")
+
+
+def _encode_bytes(value):
+    return encode_uint(len(value)) + value + b"\x00" * (-len(value) % WORD)
+
+
+def encode_aggregate3(calls):
+    """编码 aggregate3((address,bool,bytes)[]) 的参数，calls: [(目标地址, calldata)]，均允许失败"""
+    elements = [
+        encode_address(target)
+        + encode_uint(1)
+        + encode_uint(3 * WORD)
+        + _encode_bytes(calldata)
+        for target, calldata in calls
+    ]
+    offsets = []
+    position = len(elements) * WORD
+    for element in elements:
+        offsets.append(encode_uint(position))
+        position += len(element)
+    return (
+        encode_uint(WORD)
+        + encode_uint(len(elements))
+        + b"".join(offsets)
+        + b"".join(elements)
+    )
+
+
+def decode_aggregate3(data):
+    """解码 aggregate3 的返回值 (bool,bytes)[]，返回 [(success, returnData)]"""
+    array = read_uint(data, 0)
+    count = read_uint(data, array)
+    base = array + WORD
+    results = []
+    for i in range(count):
+        element = base + read_uint(data, base + i * WORD)
+        success = read_uint(data, element) != 0
+        results.append(
+            (success, read_bytes(data, element + read_uint(data, element + WORD)))
+        )
+    return results
@@ -0,0 +1,122 @@
+"""
+地址集合索引
+
+黑名单、观察名单等地址列表统一加载为 20 字节的 bytes 键存入 set，
+查询时只需把待查地址规范化一次，即可 O(1) 判断是否命中，与大小写无关。
+
+地址文件每行一个地址，# 之后为注释，空行忽略。文件修改后由 RuleEngine.run()
+定时检查并在线程中重新解析，解析完成后整体替换集合，不阻塞事件循环。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def address_key(address):
+    """把 0x 开头的十六进制地址规范化为 20 字节的键，格式不合法返回 None"""
+    if not isinstance(address, str):
+        return None
+    hex_part = address[2:] if address[:2] in ("0x", "0X") else address
+    if len(hex_part) != 40:
+        return None
+    try:
+        return bytes.fromhex(hex_part)
+    except ValueError:
+        return None
+
+
+def _read_address_file(path):
+    keys = set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            key = address_key(line)
+            if key is None:
+                logger.warning(f"地址格式不正确，已忽略: {path}:{line_no} {line}")
+                continue
+            keys.add(key)
+    return keys
+
+
+class AddressSet:
+    """
+    由若干地址文件和内联地址组成的集合
+
+    paths: 地址文件路径列表，文件变化时在 maybe_reload 中重新加载
+    addresses: 直接写在配置里的地址
+    """
+
+    def __init__(self, name, paths=(), addresses=()):
+        self.name = name
+        self.paths = list(paths)
+        self._inline = {k for k in map(address_key, addresses) if k is not None}
+        self._keys = frozenset()
+        self._mtimes = {}
+        self._load()
+
+    def _stat_all(self):
+        return {path: os.stat(path).st_mtime_ns for path in self.paths}
+
+    def _read_all(self):
+        """读取全部地址文件，返回 (mtimes, 键集合)"""
+        mtimes = self._stat_all()
+        keys = set(self._inline)
+        for path in self.paths:
+            keys |= _read_address_file(path)
+        return mtimes, frozenset(keys)
+
+    def _load(self):
+        self._mtimes, self._keys = self._read_all()
+        logger.info(f"已加载地址集合 {self.name}: {len(self._keys)} 个地址")
+
+    async def maybe_reload(self):
+        """
+        地址文件变化时重新加载，读取失败则保留旧集合
+
+        检查和解析都在线程中进行，完成后一次性替换集合，查询看到的要么是旧集合
+        要么是新集合
+        """
+        if not self.paths:
+            return
+        try:
+            if await asyncio.to_thread(self._stat_all) == self._mtimes:
+                return
+            mtimes, keys = await asyncio.to_thread(self._read_all)
+        except Exception as e:
+            logger.error(f"地址集合 {self.name} 重新加载失败，继续使用旧数据: {e}")
+            return
+        self._mtimes, self._keys = mtimes, keys
+        logger.info(f"已重新加载地址集合 {self.name}: {len(keys)} 个地址")
+
+    def __contains__(self, address):
+        key = address if isinstance(address, bytes) else address_key(address)
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def memory_usage(self):
+        """集合本身加上所有键占用的字节数（估算）"""
+        size = sys.getsizeof(self._keys)
+        if self._keys:
+            size += len(self._keys) * sys.getsizeof(next(iter(self._keys)))
+        return size
+
+
+def load_address_sets(specs, base_dir="."):
+    """
+    按配置创建具名地址集合
+
+    specs: {名称: {"files": [...], "addresses": [...]}}，相对路径相对于 base_dir
+    """
+    sets = {}
+    for name, spec in (specs or {}).items():
+        paths = [os.path.join(base_dir, p) for p in spec.get("files", [])]
+        sets[name] = AddressSet(name, paths, spec.get("addresses", []))
+    return sets
@@ -0,0 +1,78 @@
+"""
+地址集合基准测试：对比 AddressSet 与原先"大写字符串 list"两种黑名单的内存占用和查询耗时
+
+用法: python bench/addrset_bench.py [地址数量=50000] [查询次数=100000]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from addrset import AddressSet
+
+
+def random_address(rng):
+    return "0x" + "".join(rng.choice("0123456789abcdefABCDEF") for _ in range(40))
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def time_lookups(contains, queries):
+    start = time.perf_counter()
+    hits = 0
+    for q in queries:
+        if contains(q):
+            hits += 1
+    elapsed = time.perf_counter() - start
+    return elapsed / len(queries) * 1e9, hits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    rng = random.Random(56)
+    addresses = [random_address(rng) for _ in range(count)]
+    # 一半查询命中（大小写不同），一半不命中
+    queries = [rng.choice(addresses).swapcase() for _ in range(lookups // 2)]
+    queries += [random_address(rng) for _ in range(lookups - len(queries))]
+    rng.shuffle(queries)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(addresses))
+        path = f.name
+    try:
+        start = time.perf_counter()
+        address_set, set_bytes = measure(lambda: AddressSet("bench", [path]))
+        load_ms = (time.perf_counter() - start) * 1000
+    finally:
+        os.unlink(path)
+    set_ns, set_hits = time_lookups(address_set.__contains__, queries)
+
+    upper_list, list_bytes = measure(lambda: [a.upper() for a in addresses])
+    # list 是线性扫描，查询次数按比例缩减以免跑太久
+    list_queries = queries[: max(1, min(len(queries), 2_000_000 // max(count, 1)))]
+    list_ns, _ = time_lookups(lambda q: q.upper() in upper_list, list_queries)
+
+    print(f"地址数量: {count}  查询次数: {lookups}  命中: {set_hits}")
+    print(
+        f"AddressSet  加载 {load_ms:8.1f} ms  内存 {set_bytes / 1024:10.1f} KiB  "
+        f"(估算 {address_set.memory_usage() / 1024:.1f} KiB)  单次查询 {set_ns:10.1f} ns"
+    )
+    print(
+        f"list[upper] 内存 {list_bytes / 1024:10.1f} KiB  单次查询 {list_ns:10.1f} ns"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+负载测试：新币集中发射时各监控脚本的吞吐量和延迟
+
+本机起一个假的 JSON-RPC WebSocket 节点和一个假的币安接口，每个场景启动一次
+监控脚本（子进程，WS_URL 指向假节点），按发射节奏把 synthlogs.py 生成的
+日志作为订阅推送发出。脚本照常解码、过滤、补齐字段并发布事件（sink 换成
+临时文件，不发 Telegram）。
+
+每个事件的耗时取自链路追踪（见 tracing.py）：把慢事件阈值设为 0 以上的极小值，
+全部 Trace 都写进临时文件，从中统计 p50 / p99（从收到推送到处理完成，含排队）。
+吞吐量为事件数除以从第一条推送到最后一个事件处理完成的时间。正式推送前先推送
+一个区块的预热事件并等它处理完，进程池启动、首次取价等一次性开销不计入结果。发布的事件写进
+另一个临时文件，统计各脚本主要事件（见 PUBLISHED）的发布数，确认事件真的走完了
+补齐字段和发布，而不是在过滤规则处就返回了。每个场景运行 --rounds 次（默认 3），
+各项指标取中位数。
+
+结果与 bench/load_baseline.json 中记录的基线比较：p99 高于基线、发布数少于基线，
+或者（只对 storm 场景）吞吐量低于基线超过容差时退出码为 1。其他场景按
+BLOCK_INTERVAL 的节奏推送，吞吐量只反映推送节奏，只作参考。基线与机器相关，
+换机器后先用 --record 重新记录。
+
+用法: python bench/load_test.py [场景，逗号分隔，默认全部] [--record] [--rounds 3] [--tolerance 0.3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import websockets
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from abi import WORD, encode_address, encode_uint
+from calldata import WRAPPERS
+from synthlogs import WBNB, EVENTS, LogFactory, _encode_bytes, burst_schedule
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "load_baseline.json"
+)
+
+# 场景名 -> (脚本, [(事件类型, 占比)], 发射节奏, 事件数, 每个区块的事件数)
+SCENARIOS = {
+    "four:steady": (
+        "four",
+        [("four_create", 0.9), ("four_liquidity", 0.1)],
+        "steady",
+        400,
+        40,
+    ),
+    "four:storm": (
+        "four",
+        [("four_create", 0.9), ("four_liquidity", 0.1)],
+        "storm",
+        400,
+        40,
+    ),
+    "flap:steady": ("flap", [("flap_created", 1.0)], "steady", 200, 20),
+    "flap:storm": ("flap", [("flap_created", 1.0)], "storm", 200, 20),
+    "pancake:steady": ("pancake", [("pair_created", 1.0)], "steady", 200, 20),
+    "pancake:spiky": ("pancake", [("pair_created", 1.0)], "spiky", 200, 20),
+    "pancake:storm": ("pancake", [("pair_created", 1.0)], "storm", 200, 20),
+}
+# 各脚本的主要事件类型，用来统计发布数
+PUBLISHED = {
+    "four_token_created",
+    "four_token_bonded",
+    "flap_token_created",
+    "pancake_pair_created",
+}
+# 两个区块之间的间隔（秒），比真实出块快，压缩测试时间
+BLOCK_INTERVAL = 0.25
+# 等待全部事件处理完的超时（秒）
+DRAIN_TIMEOUT = 60
+BASELINE_NOTE = (
+    "只有 storm 场景的吞吐量参与比较；其他场景按 BLOCK_INTERVAL 节奏推送，"
+    "吞吐量只反映推送节奏。p99 和发布数所有场景都比较。"
+)
+# p99 的绝对容差（毫秒），避免个位数毫秒的抖动被当作退化
+P99_SLACK_MS = 5
+
+# 子进程：通过环境变量指定连接地址和事件输出，导入脚本后改写币安接口地址，再运行
+RUNNER = """
+import asyncio, importlib, logging, os, sys
+os.environ.update(WS_URL=sys.argv[2], SINKS="file:" + sys.argv[5])
+module = importlib.import_module(sys.argv[1])
+import market, tracing
+market.market_info_endpoint.url = sys.argv[3] + "/market"
+market.token_meta_endpoint.url = sys.argv[3] + "/meta"
+tracing.configure(slow_threshold_ms=1e-9, slow_path=sys.argv[4])
+logging.getLogger("tracing").disabled = True
+asyncio.run(module.main())
+"""
+
+
+def _string_result(value):
+    return encode_uint(WORD) + _encode_bytes(value.encode())
+
+
+def _aggregate3_result(results):
+    """aggregate3 的返回值 (bool success, bytes returnData)[]"""
+    heads, tails = b"", b""
+    for data in results:
+        heads += encode_uint(len(results) * WORD + len(tails))
+        tails += encode_uint(1) + encode_uint(2 * WORD) + _encode_bytes(data)
+    return encode_uint(WORD) + encode_uint(len(results)) + heads + tails
+
+
+# 交易对储备 (reserve0, reserve1, blockTimestampLast)
+RESERVES = encode_uint(10**24) + encode_uint(10**21) + encode_uint(0)
+
+# 函数选择器 -> 返回值，覆盖各脚本用到的 getter；其余调用返回一个 0。
+# token0() 对生成的交易对返回它真正的 token0
+GETTERS = {
+    "06fdde03": _string_result("BenchDog"),  # name()
+    "95d89b41": _string_result("BDOG"),  # symbol()
+    "313ce567": encode_uint(18),  # decimals()
+    "18160ddd": encode_uint(10**27),  # totalSupply()
+    "0902f1ac": RESERVES,  # getReserves()
+    "0dfe1681": encode_address(WBNB),  # token0()
+    "e6a43905": encode_address("0x" + "00" * 20),  # getPair(address,address)
+    "771a3a1d": encode_uint(300),  # taxRate()
+    "38af3eed": encode_address("0x" + "be" * 20),  # beneficiary()
+}
+
+
+class FakeNode:
+    """回应 JSON-RPC 请求（含批量请求），记录 logs 订阅，按需推送日志"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.ws = None
+        self.subscription = None
+        self.subscribed = None
+
+    async def handler(self, ws):
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                if isinstance(request, list):
+                    reply = [self.reply(ws, item) for item in request]
+                else:
+                    reply = self.reply(ws, request)
+                await ws.send(json.dumps(reply))
+        except websockets.exceptions.ConnectionClosed:
+            # 每个场景结束时直接杀掉子进程
+            pass
+
+    def eth_call(self, target, calldata):
+        selector = calldata[:4]
+        if selector in WRAPPERS:
+            inner = WRAPPERS[selector](target, calldata[4:])
+            return _aggregate3_result([self.eth_call(t, data) for t, data in inner])
+        if selector.hex() == "0dfe1681" and target in self.factory.pairs:
+            return encode_address(self.factory.pairs[target][0])
+        return GETTERS.get(selector.hex(), encode_uint(0))
+
+    def reply(self, ws, request):
+        method, params = request.get("method"), request.get("params") or []
+        result = None
+        if method == "eth_subscribe":
+            result = hex(request["id"])
+            if params[0] == "logs":
+                self.ws, self.subscription = ws, result
+                if not self.subscribed.done():
+                    self.subscribed.set_result(None)
+        elif method == "eth_call":
+            call = params[0]
+            data = bytes.fromhex(call["data"][2:])
+            result = "0x" + self.eth_call(call["to"].lower(), data).hex()
+        elif method == "eth_getTransactionByHash":
+            result = self.factory.transactions.get(params[0])
+        elif method == "eth_blockNumber":
+            result = "0x1"
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def push(self, log):
+        notification = {
+            "jsonrpc": "2.0",
+            "method": "eth_subscription",
+            "params": {"subscription": self.subscription, "result": log},
+        }
+        await self.ws.send(json.dumps(notification))
+
+
+async def market_handler(request):
+    """假的币安接口，市场信息和元数据共用"""
+    data = {
+        "marketCap": "250000",
+        "holders": "120",
+        "devHolders": 1,
+        "holdersDevPercent": "2.5",
+        "top10HoldersPercentage": "30",
+        "name": "BenchDog",
+        "symbol": "BDOG",
+    }
+    return web.json_response({"success": True, "data": data})
+
+
+def build_logs(factory, mix, shape, events, block_size, first_block=1000):
+    """按发射节奏生成 [[区块内的日志]]，各事件类型按占比交错"""
+    blocks = []
+    made = {event: 0 for event, _ in mix}
+    total = 0
+    schedule = burst_schedule(shape, events, block_size)
+    for block, count in enumerate(schedule, first_block):
+        logs = []
+        for _ in range(count):
+            total += 1
+            # 选出当前比例最落后的事件类型
+            event = min(mix, key=lambda item: made[item[0]] / total - item[1])[0]
+            made[event] += 1
+            logs.append(getattr(factory, EVENTS[event])(block))
+        blocks.append(logs)
+    return blocks
+
+
+def count_lines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+
+def count_published(path):
+    with open(path, encoding="utf-8") as f:
+        return sum(json.loads(line).get("type") in PUBLISHED for line in f)
+
+
+async def drain(trace_path, events_path, count):
+    """等到 count 个事件处理完（或超时），返回已发布的事件数"""
+    deadline = time.monotonic() + DRAIN_TIMEOUT
+    while count_lines(trace_path) < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    # 事件由 sink 的后台任务写入文件，稍等它写完
+    await asyncio.sleep(0.5)
+    return count_published(events_path)
+
+
+async def run_scenario(name, node, url, market_url):
+    monitor, mix, shape, events, block_size = SCENARIOS[name]
+    node.factory = LogFactory()
+    # 预热用的一个区块，排在正式推送之前
+    (warmup,) = build_logs(node.factory, mix, "storm", block_size, block_size, 999)
+    blocks = build_logs(node.factory, mix, shape, events, block_size)
+    node.subscribed = asyncio.get_running_loop().create_future()
+
+    paths = []
+    for _ in range(2):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        paths.append(path)
+    trace_path, events_path = paths
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        RUNNER,
+        monitor,
+        url,
+        market_url,
+        trace_path,
+        events_path,
+        cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.wait_for(node.subscribed, 30)
+        for log in warmup:
+            await node.push(log)
+        warmup_published = await drain(trace_path, events_path, len(warmup))
+
+        start = time.time()
+        for i, logs in enumerate(blocks):
+            if i:
+                await asyncio.sleep(BLOCK_INTERVAL)
+            for log in logs:
+                await node.push(log)
+        published = await drain(trace_path, events_path, len(warmup) + events)
+    finally:
+        process.kill()
+        await process.wait()
+
+    with open(trace_path, encoding="utf-8") as f:
+        traces = [json.loads(line) for line in f][len(warmup) :]
+    published -= warmup_published
+    for path in paths:
+        os.unlink(path)
+    if len(traces) < events:
+        return {
+            "events": len(traces),
+            "error": f"超时，只处理完 {len(traces)}/{events} 个事件",
+        }
+
+    latencies = sorted(trace["total_ms"] for trace in traces)
+    elapsed = max(trace["ts"] for trace in traces) - start
+    return {
+        "events": len(traces),
+        "published": published,
+        "throughput": round(len(traces) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1
+        ),
+    }
+
+
+async def run_rounds(name, node, url, market_url, rounds):
+    """运行多次，各项指标取中位数；任何一次超时都算失败"""
+    runs = []
+    for _ in range(rounds):
+        result = await run_scenario(name, node, url, market_url)
+        if "error" in result:
+            return result
+        runs.append(result)
+    return {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ("throughput", "p50_ms", "p99_ms")
+    } | {
+        "events": runs[0]["events"],
+        "published": min(run["published"] for run in runs),
+    }
+
+
+def check(result, baseline, tolerance, paced):
+    """与基线比较，返回退化项的说明；paced 为按节奏推送的场景，不检查吞吐量"""
+    if "error" in result:
+        return [result["error"]]
+    problems = []
+    if result["published"] == 0:
+        problems.append("没有发布任何事件，处理函数都在过滤规则处返回了")
+    if not baseline:
+        return problems
+    expected = baseline.get("published", 0)
+    if result["published"] < expected:
+        problems.append(f"发布 {result['published']} 个事件，少于基线 {expected} 个")
+    if not paced and result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        problems.append(
+            f"吞吐量 {result['throughput']}/s 低于基线 {baseline['throughput']}/s"
+        )
+    if result["p99_ms"] > baseline["p99_ms"] * (1 + tolerance) + P99_SLACK_MS:
+        problems.append(f"p99 {result['p99_ms']}ms 高于基线 {baseline['p99_ms']}ms")
+    return problems
+
+
+def load_baselines():
+    try:
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="监控脚本负载测试")
+    parser.add_argument("scenarios", nargs="?", default=",".join(SCENARIOS))
+    parser.add_argument("--record", action="store_true", help="把本次结果记录为基线")
+    parser.add_argument("--rounds", type=int, default=3, help="每个场景运行次数")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="允许的退化比例")
+    args = parser.parse_args()
+    names = args.scenarios.split(",")
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f"未知的场景: {name}，可选: {', '.join(SCENARIOS)}")
+
+    baselines = load_baselines()
+    node = FakeNode(LogFactory())
+    app = web.Application()
+    app.router.add_get("/{path:.*}", market_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    market_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    failed = False
+    results = {}
+    try:
+        async with websockets.serve(
+            node.handler, "127.0.0.1", 0, max_size=None
+        ) as server:
+            url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            print(
+                f"{'场景':<16}{'事件':>6}{'发布':>6}{'吞吐量':>12}"
+                f"{'p50':>10}{'p99':>10}  基线"
+            )
+            for name in names:
+                result = results[name] = await run_rounds(
+                    name, node, url, market_url, args.rounds
+                )
+                baseline = baselines.get(name)
+                paced = SCENARIOS[name][2] != "storm"
+                problems = (
+                    []
+                    if args.record
+                    else check(result, baseline, args.tolerance, paced)
+                )
+                failed |= bool(problems)
+                if "error" in result:
+                    print(f"{name:<16}{result['events']:>6}  {result['error']}")
+                    continue
+                reference = (
+                    f"{baseline['throughput']}/s p99 {baseline['p99_ms']}ms"
+                    if baseline
+                    else "-"
+                )
+                # 按节奏推送的场景，吞吐量只作参考
+                mark = "*" if paced else " "
+                print(
+                    f"{name:<16}{result['events']:>6}{result['published']:>6}"
+                    f"{result['throughput']:>9}/s{mark}"
+                    f"{result['p50_ms']:>8}ms{result['p99_ms']:>8}ms  {reference}"
+                )
+                for problem in problems:
+                    print(f"  ✗ {problem}")
+        print("* 按 BLOCK_INTERVAL 节奏推送，吞吐量只作参考，不与基线比较")
+    finally:
+        await runner.cleanup()
+
+    if args.record:
+        baselines["_说明"] = BASELINE_NOTE
+        baselines.update(
+            {name: result for name, result in results.items() if "error" not in result}
+        )
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"基线已写入 {BASELINE_FILE}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,111 @@
+"""
+启动基准测试：各监控脚本从启动进程到发出第一个 logs 订阅的耗时，以及此时的
+常驻内存（RSS）
+
+本机起一个假的 JSON-RPC WebSocket 节点，把脚本的 connection.url 指向它，
+不需要真实节点和 Telegram 配置。RSS 从 /proc 读取，仅支持 Linux。
+
+用法: python bench/startup_bench.py [脚本=flap,four,pancake] [每个脚本运行次数=5]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import websockets
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# 子进程：导入脚本后改写连接地址再运行，计时包含解释器启动和全部导入
+RUNNER = """
+import asyncio, importlib, sys
+module = importlib.import_module(sys.argv[1])
+module.connection.url = sys.argv[2]
+asyncio.run(module.main())
+"""
+
+
+class FakeNode:
+    """回应所有请求；收到 logs 订阅时记录时间"""
+
+    def __init__(self):
+        self.subscribed = None
+
+    async def handler(self, ws):
+        try:
+            async for message in ws:
+                await ws.send(self.reply(json.loads(message)))
+        except websockets.exceptions.ConnectionClosed:
+            # 每轮结束时直接杀掉子进程
+            pass
+
+    def reply(self, request):
+        result = None
+        if request.get("method") == "eth_subscribe":
+            result = hex(request["id"])
+            if request["params"][0] == "logs" and not self.subscribed.done():
+                self.subscribed.set_result(time.perf_counter())
+        return json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result})
+
+
+def read_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def run_once(node, url, monitor):
+    node.subscribed = asyncio.get_running_loop().create_future()
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        RUNNER,
+        monitor,
+        url,
+        cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        subscribed_at = await asyncio.wait_for(node.subscribed, 30)
+        return (subscribed_at - start) * 1000, read_rss_mb(process.pid)
+    finally:
+        process.kill()
+        await process.wait()
+
+
+async def main():
+    monitors = (sys.argv[1] if len(sys.argv) > 1 else "flap,four,pancake").split(",")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    node = FakeNode()
+    async with websockets.serve(node.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        url = f"ws://127.0.0.1:{port}"
+
+        print(f"{'脚本':<10}{'首次订阅 中位数':>16}{'最小':>10}{'RSS':>12}")
+        for monitor in monitors:
+            times, rss = [], []
+            for _ in range(runs):
+                elapsed, rss_mb = await run_once(node, url, monitor)
+                times.append(elapsed)
+                if rss_mb is not None:
+                    rss.append(rss_mb)
+            rss_text = f"{statistics.median(rss):.1f} MB" if rss else "-"
+            print(
+                f"{monitor:<10}{statistics.median(times):>14.0f} ms"
+                f"{min(times):>8.0f} ms{rss_text:>12}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,236 @@
+"""
+合成链上日志：按现有解码函数期望的布局生成 ABI 编码的事件日志，供负载测试使用
+
+- four TokenCreate / LiquidityAdded（见 decoders.decode_token_create_event 等）
+- flap TokenCreated 及其创建交易（见 decoders.parse_event_data、decode_create_transaction）
+- PancakeSwap PairCreated（见 pancake.parse_pair_created_event）
+
+burst_schedule() 给出各种发射节奏下每个区块的事件数。
+
+用法: python bench/synthlogs.py [事件类型=four_create] [数量=3]，输出生成的日志
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from abi import WORD, encode_address, encode_uint
+
+FOUR_CONTRACT = "0x5c952063c7fc8610ffdb798152d69f0b9550762b"
+FOUR_TOKEN_CREATE_TOPIC = (
+    "0x396d5e902b675b032348d3d2e9517ee8f0c4a926603fbc075d3d282ff00cad20"
+)
+FOUR_LIQUIDITY_ADDED_TOPIC = (
+    "0xc18aa71171b358b706fe3dd345299685ba21a5316c66ffa9e319268b033c44b0"
+)
+FLAP_CONTRACT = "0xe2ce6ab80874fa9fa2aae65d277dd6b8e65c9de0"
+FLAP_TOKEN_CREATED_TOPIC = (
+    "0x504e7f360b2e5fe33cbaaae4c593bc55305328341bf79009e43e0e3b7f699603"
+)
+# newTokenV2 的选择器，见 decoders.CREATE_DECODERS
+FLAP_CREATE_SELECTOR = bytes.fromhex("0ba6324e")
+PANCAKE_FACTORY = "0xca143ce32fe78f1f7019d7d551a6402fc5350c73"
+PAIR_CREATED_TOPIC = (
+    "0x0d3648bd0f6ba80134a33ba9275ac585d9d315f0ad8355cddefde31afa28d0e9"
+)
+WBNB = "0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c"
+# PairCreated 的报价代币：WBNB 和 USDT 在 lists/blacklist.txt 中，会被第一条规则跳过
+BUSD = "0xe9e7cea3dedca5984780bafc599bd69add087d56"
+
+
+def _encode_bytes(value):
+    """动态 bytes/string 的编码：长度 + 按 32 字节补齐的内容"""
+    padding = -len(value) % WORD
+    return encode_uint(len(value)) + value + b"\x00" * padding
+
+
+def _encode(head, tail_values):
+    """
+    head: 静态字段的编码（bytes）或 None（表示此处为动态字段），按顺序排列；
+    tail_values: 动态字段的 bytes 值，依次对应 head 中的 None
+    """
+    offset = len(head) * WORD
+    out, tail = b"", b""
+    dynamic = iter(tail_values)
+    for item in head:
+        if item is None:
+            out += encode_uint(offset + len(tail))
+            tail += _encode_bytes(next(dynamic))
+        else:
+            out += item
+    return out + tail
+
+
+def _topic(address):
+    return "0x" + encode_address(address).hex()
+
+
+class LogFactory:
+    """生成各类事件日志，地址、交易哈希按序号生成，同一个 seed 结果相同"""
+
+    def __init__(self, seed=56):
+        self.rng = random.Random(seed)
+        self.count = 0
+        # 交易哈希 -> 交易（flap 的 eth_getTransactionByHash 需要）
+        self.transactions = {}
+        # 交易对地址 -> (token0, token1)（假节点回应 token0() 需要）
+        self.pairs = {}
+
+    def _address(self):
+        return "0x" + self.rng.getrandbits(160).to_bytes(20, "big").hex()
+
+    def _name(self):
+        return "Bench" + "".join(self.rng.choice("ABCDEFGH") for _ in range(6))
+
+    def _log(self, address, topics, data, block):
+        self.count += 1
+        return {
+            "address": address,
+            "topics": topics,
+            "data": "0x" + data.hex(),
+            "blockNumber": hex(block),
+            "transactionHash": "0x" + self.count.to_bytes(32, "big").hex(),
+            "logIndex": hex(self.count % 512),
+            "removed": False,
+        }
+
+    def four_token_create(self, block):
+        """(address creator, address token, uint256 requestId, string name, string symbol,
+        uint256 totalSupply, uint256 launchTime, uint256 launchFee)"""
+        name = self._name()
+        data = _encode(
+            [
+                encode_address(self._address()),
+                encode_address(self._address()),
+                encode_uint(self.count),
+                None,
+                None,
+                encode_uint(10**27),
+                encode_uint(1_700_000_000 + block),
+                encode_uint(10**16),
+            ],
+            [name.encode(), name[-4:].upper().encode()],
+        )
+        return self._log(FOUR_CONTRACT, [FOUR_TOKEN_CREATE_TOPIC], data, block)
+
+    def four_liquidity_added(self, block):
+        """(address base, uint256 offers, address quote, uint256 funds)"""
+        data = (
+            encode_address(self._address())
+            + encode_uint(2 * 10**26)
+            + encode_address("0x" + "00" * 20)
+            + encode_uint(18 * 10**18)
+        )
+        return self._log(FOUR_CONTRACT, [FOUR_LIQUIDITY_ADDED_TOPIC], data, block)
+
+    def flap_token_created(self, block, tax_rate=300):
+        """(uint256 ts, address creator, uint256 nonce, address token, string name,
+        string symbol, string meta)，同时登记对应的创建交易"""
+        name = self._name()
+        symbol = name[-4:].upper()
+        creator = self._address()
+        # 代币地址不以 8888 结尾，避免命中 rules.json 的跳过规则
+        token = self._address()[:-4] + "1234"
+        data = _encode(
+            [
+                encode_uint(1_700_000_000 + block),
+                encode_address(creator),
+                encode_uint(self.count),
+                encode_address(token),
+                None,
+                None,
+                None,
+            ],
+            [name.encode(), symbol.encode(), b"ipfs://bench"],
+        )
+        log = self._log(FLAP_CONTRACT, [FLAP_TOKEN_CREATED_TOPIC], data, block)
+        self.transactions[log["transactionHash"]] = {
+            "to": FLAP_CONTRACT,
+            "input": "0x" + self.flap_create_input(name, symbol, tax_rate).hex(),
+        }
+        return log
+
+    def flap_create_input(self, name, symbol, tax_rate):
+        """创建调用的 calldata，参数为一个 tuple，布局见 decoders._decode_new_token_v2"""
+        fields = _encode(
+            [
+                None,
+                None,
+                None,
+                encode_uint(1),
+                self.rng.getrandbits(256).to_bytes(32, "big"),
+                encode_uint(tax_rate),
+                encode_uint(0),
+                encode_address("0x" + "00" * 20),
+                encode_uint(0),
+                # 受益人与创建者不同，避免命中 rules.json 的跳过规则
+                encode_address(self._address()),
+                None,
+            ],
+            [name.encode(), symbol.encode(), b"ipfs://bench", b""],
+        )
+        return FLAP_CREATE_SELECTOR + encode_uint(WORD) + fields
+
+    def pair_created(self, block):
+        """PairCreated(address indexed token0, address indexed token1, address pair, uint256)"""
+        token0, token1 = sorted([self._address(), BUSD])
+        pair = self._address()
+        self.pairs[pair] = (token0, token1)
+        data = encode_address(pair) + encode_uint(self.count)
+        topics = [PAIR_CREATED_TOPIC, _topic(token0), _topic(token1)]
+        return self._log(PANCAKE_FACTORY, topics, data, block)
+
+
+# 事件类型 -> 生成方法名
+EVENTS = {
+    "four_create": "four_token_create",
+    "four_liquidity": "four_liquidity_added",
+    "flap_created": "flap_token_created",
+    "pair_created": "pair_created",
+}
+
+
+def burst_schedule(shape, events, block_size):
+    """
+    每个区块的事件数列表，总数为 events
+
+    steady: 每个区块 block_size 个
+    storm: 全部挤在一个区块
+    spiky: 每 4 个区块里一个区块集中 4 * block_size 个，其余为空
+    ramp: 从 1 个逐块增加到 2 * block_size 个
+    """
+    counts = []
+    remaining = events
+    step = 0
+    while remaining > 0:
+        if shape == "steady":
+            n = block_size
+        elif shape == "storm":
+            n = remaining
+        elif shape == "spiky":
+            n = 4 * block_size if step % 4 == 0 else 0
+        elif shape == "ramp":
+            n = 1 + step * 2 * block_size // max(1, events // block_size)
+        else:
+            raise ValueError(f"未知的发射节奏: {shape}")
+        n = min(n, remaining)
+        counts.append(n)
+        remaining -= n
+        step += 1
+    return counts
+
+
+def main():
+    event = sys.argv[1] if len(sys.argv) > 1 else "four_create"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    factory = LogFactory()
+    make = getattr(factory, EVENTS[event])
+    for i in range(count):
+        print(json.dumps(make(100 + i)))
+
+
+if __name__ == "__main__":
+    main()
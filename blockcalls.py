@@ -0,0 +1,71 @@
+"""
+按区块批量读取合约 getter
+
+同一区块里新建的一批合约，所有 getter 的 eth_call 合成一个 JSON-RPC 批量请求
+（见 RpcClient.call_batch），在事件所在区块上执行。新币集中发射时，不论一个区块
+里有多少个事件，每个区块都只需要一次往返。
+
+收到一批推送时先调用 prefetch() 发出请求，处理函数再用 get() 取结果；没有
+预取过的合约在 get() 时单独发出请求。
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class BlockCalls:
+    """
+    getters: 名称 -> 函数选择器（如 {"taxRate": "0x771a3a1d"}），均为无参数的 getter
+    size: 保留最近多少个合约的结果
+    """
+
+    def __init__(self, getters, size=1024):
+        self.getters = dict(getters)
+        self.size = size
+        self._results = OrderedDict()
+        self.requests = 0
+
+    def prefetch(self, rpc, block, targets):
+        """为同一区块的一批合约发出一个批量请求，已经请求过的合约跳过"""
+        targets = [t for t in dict.fromkeys(targets) if (block, t) not in self._results]
+        if not targets:
+            return
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for target in targets:
+            futures[target] = self._results[(block, target)] = loop.create_future()
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+        self.requests += 1
+        loop.create_task(self._fetch(rpc, block, futures))
+
+    async def _fetch(self, rpc, block, futures):
+        requests = [
+            ("eth_call", [{"to": target, "data": selector}, block])
+            for target in futures
+            for selector in self.getters.values()
+        ]
+        try:
+            results = await rpc.call_batch(requests)
+        except Exception as e:
+            logger.warning(f"批量读取 {len(futures)} 个合约失败（区块 {block}）: {e}")
+            results = [e] * len(requests)
+
+        names = list(self.getters)
+        for i, future in enumerate(futures.values()):
+            values = {}
+            for name, result in zip(names, results[i * len(names) :]):
+                # 调用回退或出错时为 None
+                ok = isinstance(result, str) and len(result) > 2
+                values[name] = bytes.fromhex(result[2:]) if ok else None
+            if not future.done():
+                future.set_result(values)
+
+    async def get(self, rpc, block, target):
+        """合约在 block 上各 getter 的原始返回值（bytes），失败的为 None"""
+        if (block, target) not in self._results:
+            self.prefetch(rpc, block, [target])
+        return await asyncio.shield(self._results[(block, target)])
@@ -0,0 +1,169 @@
+"""
+包装调用的拆解
+
+代币创建不一定是直接调用 portal：可能经过 Multicall3、路由合约自身的
+multicall、智能钱包的 execute / executeBatch、Safe 的 execTransaction，或者
+ERC-4337 EntryPoint 的 handleOps。这里按函数选择器查表，逐层拆出内层的
+(目标地址, calldata)，直到不再是已知的包装调用为止。
+
+目标地址为小写的 0x 十六进制字符串；调用自身（如路由的 multicall(bytes[])）
+时内层目标沿用外层目标。
+"""
+
+from abi import WORD, read_address, read_bytes, read_uint
+
+MAX_DEPTH = 4
+
+
+def _offset(data, base, head):
+    """head 位置上的动态字段偏移量，相对于 base"""
+    return base + read_uint(data, head)
+
+
+def _elements(data, base, head):
+    """
+    head 位置上的动态数组，返回 (元素区起点, 元素个数)；
+    动态元素的偏移量相对于元素区起点
+    """
+    array = _offset(data, base, head)
+    return array + WORD, read_uint(data, array)
+
+
+def _dynamic_elements(data, base, head):
+    """元素为动态类型（bytes、含 bytes 的 tuple）的数组，依次产出每个元素的起点"""
+    start, count = _elements(data, base, head)
+    for i in range(count):
+        yield _offset(data, start, start + i * WORD)
+
+
+def _bytes_field(data, element, index):
+    """tuple 中第 index 个字段为 bytes 时读出它"""
+    return read_bytes(data, _offset(data, element, element + index * WORD))
+
+
+def _address_call_tuples(array_index, bytes_index):
+    """第 array_index 个参数为 (address, ..., bytes, ...)[] 形式的调用列表"""
+
+    def unwrap(target, data):
+        return [
+            (read_address(data, element), _bytes_field(data, element, bytes_index))
+            for element in _dynamic_elements(data, 0, array_index * WORD)
+        ]
+
+    return unwrap
+
+
+def _self_calls(array_index):
+    """第 array_index 个参数为 bytes[]，调用自身的 multicall"""
+
+    def unwrap(target, data):
+        return [
+            (target, read_bytes(data, element))
+            for element in _dynamic_elements(data, 0, array_index * WORD)
+        ]
+
+    return unwrap
+
+
+def _single_call(address_index, bytes_index):
+    """参数中分别给出目标地址和 calldata 的单个调用"""
+
+    def unwrap(target, data):
+        return [
+            (
+                read_address(data, address_index * WORD),
+                _bytes_field(data, 0, bytes_index),
+            )
+        ]
+
+    return unwrap
+
+
+def _parallel_arrays(targets_index, calls_index):
+    """executeBatch(address[], ..., bytes[])：目标和 calldata 分别放在两个数组里"""
+
+    def unwrap(target, data):
+        start, count = _elements(data, 0, targets_index * WORD)
+        targets = [read_address(data, start + i * WORD) for i in range(count)]
+        calls = [
+            read_bytes(data, element)
+            for element in _dynamic_elements(data, 0, calls_index * WORD)
+        ]
+        return list(zip(targets, calls))
+
+    return unwrap
+
+
+def _erc7579_execute(target, data):
+    """execute(bytes32 mode, bytes executionCalldata)，只处理单个调用和批量调用"""
+    call_type = data[0]
+    execution = _bytes_field(data, 0, 1)
+    if call_type == 0x00:
+        # abi.encodePacked(target, value, callData)
+        return [("0x" + execution[:20].hex(), execution[20 + WORD :])]
+    if call_type == 0x01:
+        # abi.encode(Execution[])，Execution 为 (address, uint256, bytes)
+        return _address_call_tuples(0, 2)(target, execution)
+    return []
+
+
+def _user_operations(target, data):
+    """handleOps(UserOperation[], address)：由各个账户执行 callData（第 4 个字段）"""
+    return [
+        (read_address(data, op), _bytes_field(data, op, 3))
+        for op in _dynamic_elements(data, 0, 0)
+    ]
+
+
+# 函数选择器 -> 拆解函数 unwrap(外层目标, 去掉选择器的参数) -> [(目标, calldata)]
+WRAPPERS = {
+    # Multicall3: aggregate / blockAndAggregate((address,bytes)[])
+    bytes.fromhex("252dba42"): _address_call_tuples(0, 1),
+    bytes.fromhex("c3077fa9"): _address_call_tuples(0, 1),
+    # Multicall3: tryAggregate / tryBlockAndAggregate(bool,(address,bytes)[])
+    bytes.fromhex("bce38bd7"): _address_call_tuples(1, 1),
+    bytes.fromhex("399542e9"): _address_call_tuples(1, 1),
+    # Multicall3: aggregate3((address,bool,bytes)[])
+    bytes.fromhex("82ad56cb"): _address_call_tuples(0, 2),
+    # Multicall3: aggregate3Value((address,bool,uint256,bytes)[])
+    bytes.fromhex("174dea71"): _address_call_tuples(0, 3),
+    # 路由合约: multicall(bytes[]) / multicall(uint256,bytes[]) / multicall(bytes32,bytes[])
+    bytes.fromhex("ac9650d8"): _self_calls(0),
+    bytes.fromhex("5ae401dc"): _self_calls(1),
+    bytes.fromhex("1f0464d1"): _self_calls(1),
+    # 智能钱包: execute(address,uint256,bytes) / execute(address,uint256,bytes,uint8)
+    # / executeCall(address,uint256,bytes)
+    bytes.fromhex("b61d27f6"): _single_call(0, 2),
+    bytes.fromhex("51945447"): _single_call(0, 2),
+    bytes.fromhex("9e5d4c49"): _single_call(0, 2),
+    # 智能钱包: executeBatch(address[],bytes[]) / executeBatch(address[],uint256[],bytes[])
+    bytes.fromhex("18dfb3c7"): _parallel_arrays(0, 1),
+    bytes.fromhex("47e1da2a"): _parallel_arrays(0, 2),
+    # 智能钱包: executeBatch((address,uint256,bytes)[])
+    bytes.fromhex("34fcd5be"): _address_call_tuples(0, 2),
+    # ERC-7579: execute(bytes32,bytes)
+    bytes.fromhex("e9ae5c53"): _erc7579_execute,
+    # Safe: execTransaction(address to,uint256 value,bytes data,...)
+    bytes.fromhex("6a761202"): _single_call(0, 2),
+    # ERC-4337 EntryPoint v0.6 / v0.7: handleOps(UserOperation[],address)
+    bytes.fromhex("1fad948c"): _user_operations,
+    bytes.fromhex("765e827f"): _user_operations,
+}
+
+
+def iter_calls(target, calldata, depth=0):
+    """
+    递归拆解包装调用，依次产出最内层的 (目标地址, calldata)；
+    无法按已知格式拆开的包装调用原样产出
+    """
+    unwrap = WRAPPERS.get(bytes(calldata[:4]))
+    if unwrap is None or depth >= MAX_DEPTH:
+        yield target, calldata
+        return
+    try:
+        inner = unwrap(target, calldata[4:])
+    except (ValueError, IndexError):
+        yield target, calldata
+        return
+    for inner_target, inner_calldata in inner:
+        yield from iter_calls(inner_target, inner_calldata, depth + 1)
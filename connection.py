@@ -0,0 +1,152 @@
+"""
+WebSocket 连接管理
+
+断线后第一次立即重连，之后按指数退避（带随机抖动）重试，连接稳定运行一段
+时间后退避次数清零。
+
+可选的备用连接：主连接工作时后台预先建立好一条连接，主连接断开后由备用连接
+直接接管并重新订阅，省去建立连接和握手的时间。
+
+假死检测：每条连接额外订阅 newHeads 作为心跳（推送不进入事件队列），超过
+stall_timeout 秒没有收到任何消息就主动重连，不必等 ping 超时。
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+import websockets
+
+import tracing
+from rpc import RpcClient
+
+logger = logging.getLogger(__name__)
+
+
+class StallError(Exception):
+    """连接长时间没有收到任何消息"""
+
+
+class ConnectionManager:
+    """
+    session: async session(rpc)，在新连接上订阅并持续处理推送，连接断开时抛出异常
+    standby: 是否维持一条预先建立好的备用连接
+    stall_timeout: 超过多少秒没有收到任何消息视为假死，0 表示不检测
+    """
+
+    def __init__(
+        self,
+        url,
+        name="BSC 主网",
+        standby=False,
+        stall_timeout=30,
+        heartbeat=True,
+        min_delay=0.5,
+        max_delay=30,
+        stable_time=60,
+    ):
+        self.url = url
+        self.name = name
+        self.standby = standby
+        self.stall_timeout = stall_timeout
+        self.heartbeat = heartbeat
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.stable_time = stable_time
+        # 当前连接上的 RpcClient，没有连接时为 None（供后台任务发请求）
+        self.rpc = None
+        self._standby_task = None
+
+    async def _connect(self):
+        return await websockets.connect(
+            self.url, ping_interval=20, ping_timeout=10, close_timeout=10
+        )
+
+    def _backoff(self, attempt):
+        """第 0 次立即重试，之后指数增长，取 [delay/2, delay] 之间的随机值"""
+        if attempt == 0:
+            return 0
+        delay = min(self.max_delay, self.min_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _start_standby(self):
+        if self.standby:
+            self._standby_task = asyncio.create_task(self._connect())
+
+    async def _take_connection(self):
+        """优先使用已就绪的备用连接，否则新建连接"""
+        task, self._standby_task = self._standby_task, None
+        if task is not None:
+            if task.done() and not task.cancelled() and task.exception() is None:
+                ws = task.result()
+                if ws.open:
+                    logger.info(f"[{self.name}] 备用连接接管")
+                    return ws
+                await ws.close()
+            elif not task.done():
+                task.cancel()
+        return await self._connect()
+
+    async def _watchdog(self, rpc):
+        interval = max(1.0, self.stall_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            idle = time.monotonic() - rpc.last_message_at
+            if idle > self.stall_timeout:
+                raise StallError(f"{idle:.0f} 秒没有收到任何消息")
+
+    async def _run_session(self, rpc, session):
+        if self.heartbeat:
+            heads = await rpc.call("eth_subscribe", ["newHeads"])
+            # 心跳同时记录出块时间，用于统计节点推送延迟
+            rpc.mute(heads, tracing.record_head)
+        tasks = [asyncio.create_task(session(rpc))]
+        if self.stall_timeout:
+            tasks.append(asyncio.create_task(self._watchdog(rpc)))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, session):
+        attempt = 0
+        while True:
+            try:
+                ws = await self._take_connection()
+            except Exception as e:
+                attempt += 1
+                delay = self._backoff(attempt)
+                logger.error(f"[{self.name}] 连接失败: {e}，{delay:.1f}秒后重试...")
+                await asyncio.sleep(delay)
+                continue
+
+            logger.info(f"已连接到 {self.name}")
+            self._start_standby()
+            rpc = self.rpc = RpcClient(ws)
+            started = time.monotonic()
+            try:
+                await self._run_session(rpc, session)
+            except websockets.exceptions.ConnectionClosed as e:
+                logger.warning(f"[{self.name}] 连接已关闭: {e}")
+            except StallError as e:
+                logger.warning(f"[{self.name}] 连接假死: {e}，主动重连")
+            except Exception as e:
+                logger.error(f"[{self.name}] 连接错误: {e}")
+            finally:
+                self.rpc = None
+                await rpc.close()
+                # 假死的连接关闭握手可能要等到超时，放到后台，不耽误重连
+                asyncio.ensure_future(ws.close())
+
+            # 稳定运行过一段时间的连接断开后重新从立即重试开始
+            if time.monotonic() - started >= self.stable_time:
+                attempt = 0
+            delay = self._backoff(attempt)
+            attempt += 1
+            if delay:
+                logger.info(f"[{self.name}] {delay:.1f}秒后重连...")
+                await asyncio.sleep(delay)
@@ -0,0 +1,125 @@
+"""
+解码进程池
+
+ABI 解码是纯 CPU 计算，在事件循环里执行时会挡住 WebSocket 读取和 ping。
+平时一条条到来的事件直接在事件循环里解码，开销可以忽略；待处理的推送堆积到
+threshold 条以上（新币集中发射、节点一次补发大量日志）时，改为把日志按
+chunk_size 分批送进进程池解码，每批只有一次进程间往返。
+
+解码函数需要是模块级函数（见 decoders.py），这样才能传给子进程。子进程里
+没有日志输出线程，解码函数产生的日志记录随结果带回主进程再输出；需要跨事件
+保留的状态（如解码失败的选择器）也要由主进程根据返回值维护。
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 子进程中产生的日志记录，随解码结果一起带回主进程
+_worker_records = []
+
+
+class _CollectHandler(logging.Handler):
+    def emit(self, record):
+        # 参数和异常在子进程里格式化好，记录才能跨进程传递
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        _worker_records.append(record)
+
+
+def _init_worker():
+    """子进程启动时把继承来的日志队列换成收集器（队列的输出线程只在主进程里）"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_CollectHandler())
+
+
+def _map_chunk(func, chunk):
+    """在子进程中解码一批数据，返回 (结果, 期间产生的日志记录)"""
+    try:
+        return [func(item) for item in chunk], list(_worker_records)
+    finally:
+        _worker_records.clear()
+
+
+def _replay(records):
+    """在主进程中输出子进程带回的日志记录"""
+    for record in records:
+        logging.getLogger(record.name).handle(record)
+
+
+class DecodePool:
+    """
+    workers: 进程数，0 表示不启用，全部在事件循环里解码
+    threshold: 待处理的推送数达到多少条时送进进程池
+    chunk_size: 每批送进进程池的条数
+    """
+
+    def __init__(self, workers=0, threshold=32, chunk_size=64):
+        self.workers = workers
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        # 当前待处理的推送数，由接收循环更新
+        self.backlog = 0
+        self.offloaded = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker
+            )
+            logger.info(f"解码进程池已启动，{self.workers} 个进程")
+        return self._executor
+
+    def should_offload(self, count=1):
+        return self.workers > 0 and max(count, self.backlog) >= self.threshold
+
+    async def map(self, func, items):
+        """批量解码，堆积时分批送进进程池，结果顺序与 items 一致"""
+        items = list(items)
+        if not items or not self.should_offload(len(items)):
+            return [func(item) for item in items]
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        chunks = [
+            items[i : i + self.chunk_size]
+            for i in range(0, len(items), self.chunk_size)
+        ]
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, _map_chunk, func, chunk)
+                for chunk in chunks
+            )
+        )
+        self.offloaded += len(items)
+        logger.debug("进程池解码 %s 条，%s 批", len(items), len(chunks))
+        decoded = []
+        for chunk_results, records in results:
+            _replay(records)
+            decoded += chunk_results
+        return decoded
+
+    async def run(self, func, item):
+        """解码单条数据，堆积时送进进程池，平时直接执行"""
+        if not self.should_offload():
+            return func(item)
+        self.offloaded += 1
+        results, records = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), _map_chunk, func, [item]
+        )
+        _replay(records)
+        return results[0]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
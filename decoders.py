@@ -0,0 +1,260 @@
+"""
+事件日志和交易 input 的解码函数
+
+这些函数只依赖参数，不访问网络和全局状态，既可以在事件循环里直接调用，
+也可以送进解码进程池（见 decodepool.py）批量执行。
+
+ABI 解码按固定布局直接切片（见 abi.py），不需要导入 eth_abi。
+"""
+
+import logging
+import time
+from collections import OrderedDict
+
+from abi import WORD, read_address, read_bytes, read_string, read_uint
+from calldata import iter_calls
+
+logger = logging.getLogger(__name__)
+
+
+def parse_event_data(data):
+    """
+    解析 TokenCreated 事件数据
+    参数: (uint256 ts, address creator, uint256 nonce, address token, string name, string symbol, string meta)
+    """
+    try:
+        data = data.replace("0x", "")
+
+        # 每个参数占 64 个字符（32 字节）
+        ts = int(data[0:64], 16)
+        creator = "0x" + data[64:128][-40:]
+        nonce = int(data[128:192], 16)
+        token = "0x" + data[192:256][-40:]
+
+        # 动态类型偏移量
+        name_offset = int(data[256:320], 16)
+        symbol_offset = int(data[320:384], 16)
+        meta_offset = int(data[384:448], 16)
+
+        # 解析字符串
+        name_len = int(data[name_offset * 2 : name_offset * 2 + 64], 16)
+        name = bytes.fromhex(
+            data[name_offset * 2 + 64 : name_offset * 2 + 64 + name_len * 2]
+        ).decode("utf-8")
+
+        symbol_len = int(data[symbol_offset * 2 : symbol_offset * 2 + 64], 16)
+        symbol = bytes.fromhex(
+            data[symbol_offset * 2 + 64 : symbol_offset * 2 + 64 + symbol_len * 2]
+        ).decode("utf-8")
+
+        meta_len = int(data[meta_offset * 2 : meta_offset * 2 + 64], 16)
+        meta = bytes.fromhex(
+            data[meta_offset * 2 + 64 : meta_offset * 2 + 64 + meta_len * 2]
+        ).decode("utf-8")
+
+        return {
+            "timestamp": ts,
+            "creator": creator,
+            "nonce": nonce,
+            "token": token,
+            "name": name,
+            "symbol": symbol,
+            "meta": meta,
+        }
+
+    except Exception as e:
+        logger.error(f"事件解析失败: {e}")
+        return None
+
+
+def _decode_new_token_v2(data):
+    """
+    newTokenV2 去掉选择器后的参数
+    参数结构: (string name, string symbol, string meta, uint8 dexThresh, bytes32 salt,
+               uint16 taxRate, uint8 migratorType, address quoteToken, uint256 quoteAmt,
+               address beneficiary, bytes permitData)
+    """
+    # 所有参数包装在一个 tuple 里，tuple 含动态类型，开头是它的偏移量
+    base = read_uint(data, 0)
+
+    def field(i):
+        return base + i * WORD
+
+    return {
+        "name": read_string(data, base + read_uint(data, field(0))),
+        "symbol": read_string(data, base + read_uint(data, field(1))),
+        "meta": read_string(data, base + read_uint(data, field(2))),
+        "dexThresh": read_uint(data, field(3)),
+        "salt": "0x" + data[field(4) : field(5)].hex(),
+        "taxRate": read_uint(data, field(5)),
+        "migratorType": read_uint(data, field(6)),
+        "quoteToken": read_address(data, field(7)),
+        "quoteAmt": read_uint(data, field(8)),
+        "beneficiary": read_address(data, field(9)),
+        "permitData": "0x" + read_bytes(data, base + read_uint(data, field(10))).hex(),
+    }
+
+
+# 创建函数的选择器 -> 解码函数(去掉选择器的参数)，新的创建函数在这里登记
+CREATE_DECODERS = {
+    # newTokenV2((string,string,string,uint8,bytes32,uint16,uint8,address,uint256,address,bytes))
+    bytes.fromhex("0ba6324e"): _decode_new_token_v2,
+}
+
+
+def decode_create_transaction(tx, portal, skip=frozenset()):
+    """
+    从交易中找出代币创建调用并解码
+
+    tx: {"to": ..., "input": ...}（eth_getTransactionByHash 的结果）
+    portal: 创建函数所在的合约地址
+    skip: 已知解码不了的 (目标地址, 选择器)，遇到直接跳过（见 CreateSelectors）
+
+    交易经过 multicall、智能钱包、Safe、EntryPoint 等包装时逐层拆开（见
+    calldata.py），先尝试目标为 portal 的内层调用，再尝试其他调用（转发同样
+    参数的代理合约）。解码函数按选择器从 CREATE_DECODERS 中选取；直接调用
+    portal 而选择器未登记时按 newTokenV2 的布局尝试，其他合约上未登记的选择器
+    不尝试。
+
+    返回 {"args": 解码结果或 None, "decoded": 解码成功的 (目标地址, 选择器),
+    "failed": [解码失败的 (目标地址, 选择器)，不含 portal], "selector": 交易的
+    选择器, "calls": 内层调用数}
+    """
+    report = {"args": None, "decoded": None, "failed": [], "selector": None, "calls": 0}
+    input_hex = tx.get("input") or ""
+    try:
+        data = bytes.fromhex(input_hex[2:] if input_hex.startswith("0x") else input_hex)
+    except ValueError:
+        return report
+    report["selector"] = data[:4]
+    to = (tx.get("to") or "").lower() or None
+    portal = portal.lower()
+
+    calls = list(iter_calls(to, data))
+    calls.sort(key=lambda call: call[0] != portal)
+    report["calls"] = len(calls)
+    for target, calldata in calls:
+        selector = bytes(calldata[:4])
+        decode = CREATE_DECODERS.get(selector)
+        if target == portal and decode is None:
+            decode = _decode_new_token_v2
+        if len(calldata) < 4 or decode is None or (target, selector) in skip:
+            continue
+        try:
+            report["args"] = decode(calldata[4:])
+        except Exception:
+            # portal 上的失败只说明这笔交易有问题，不记入
+            if target != portal:
+                report["failed"].append((target, selector))
+            continue
+        report["decoded"] = (target, selector)
+        break
+    return report
+
+
+class CreateSelectors:
+    """
+    创建调用解码失败的 (目标地址, 选择器)，只在主进程中维护
+
+    解码可能在进程池的子进程中执行，结论通过 decode_create_transaction 的返回值
+    带回来。同一个其他合约上的选择器连续失败 threshold 次后跳过，ttl 秒内没有
+    再失败就重新尝试；成功解码一次即清除。portal 上的失败不会被记入（见
+    decode_create_transaction），创建函数本身永远不会被跳过。
+    """
+
+    def __init__(self, size=1024, ttl=600, threshold=3):
+        self.size = size
+        self.ttl = ttl
+        self.threshold = threshold
+        # (目标地址, 选择器) -> (失败次数, 最近一次失败的时间)，按最近一次失败排序
+        self._failures = OrderedDict()
+        self._skip = frozenset()
+
+    def _rebuild(self):
+        self._skip = frozenset(
+            key for key, (count, _) in self._failures.items() if count >= self.threshold
+        )
+
+    def skip(self):
+        """当前应跳过的 (目标地址, 选择器)，过期的条目在这里清除"""
+        deadline = time.monotonic() - self.ttl
+        expired = False
+        while self._failures:
+            key, (_, failed_at) = next(iter(self._failures.items()))
+            if failed_at > deadline:
+                break
+            del self._failures[key]
+            expired = True
+        if expired:
+            self._rebuild()
+        return self._skip
+
+    def record(self, report):
+        """记下本次解码的结论，返回解码结果（没有可解码的创建调用时为 None）"""
+        if report["decoded"] is not None:
+            self._failures.pop(report["decoded"], None)
+        now = time.monotonic()
+        for key in report["failed"]:
+            count, _ = self._failures.pop(key, (0, now))
+            self._failures[key] = (count + 1, now)
+            if len(self._failures) > self.size:
+                self._failures.popitem(last=False)
+        self._rebuild()
+
+        if report["args"] is None:
+            selector = report["selector"]
+            logger.warning(
+                "交易input中没有可解码的创建调用，选择器: 0x%s，内层调用 %s 个",
+                selector.hex() if selector else "",
+                report["calls"],
+            )
+        return report["args"]
+
+
+def _log_data(data_hex):
+    return bytes.fromhex(data_hex[2:] if data_hex.startswith("0x") else data_hex)
+
+
+def decode_token_create_event(data_hex):
+    """
+    解析 TokenCreate 事件数据
+    参数: (address creator, address token, uint256 requestId, string name, string symbol,
+           uint256 totalSupply, uint256 launchTime, uint256 launchFee)
+    """
+    try:
+        data = _log_data(data_hex)
+        total_supply = read_uint(data, 5 * WORD)
+        launch_fee = read_uint(data, 7 * WORD)
+        return {
+            "creator": read_address(data, 0),
+            "token": read_address(data, WORD),
+            "requestId": read_uint(data, 2 * WORD),
+            "name": read_string(data, read_uint(data, 3 * WORD)),
+            "symbol": read_string(data, read_uint(data, 4 * WORD)),
+            "totalSupply": total_supply,
+            "totalSupply_formatted": total_supply / 10**18,
+            "launchTime": read_uint(data, 6 * WORD),
+            "launchFee": launch_fee,
+            "launchFee_formatted": launch_fee / 10**18,
+        }
+    except Exception as e:
+        logger.error(f"解析 TokenCreate 事件失败: {e}")
+        return None
+
+
+def decode_liquidity_added_event(data_hex):
+    """
+    解析 LiquidityAdded 事件数据
+    参数: (address base, uint256 offers, address quote, uint256 funds)
+    """
+    try:
+        data = _log_data(data_hex)
+        return {
+            "base": read_address(data, 0),
+            "offers": read_uint(data, WORD),
+            "quote": read_address(data, 2 * WORD),
+            "funds": read_uint(data, 3 * WORD),
+        }
+    except Exception as e:
+        logger.error(f"解析 LiquidityAdded 事件失败: {e}")
+        return None
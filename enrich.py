@@ -0,0 +1,149 @@
+"""
+按需补齐事件字段的依赖图
+
+每个 provider 声明自己产出哪些字段、获取代价以及依赖哪些字段。只有当规则
+或消息格式化真正用到某个字段时才会调用对应的 provider，依赖按代价从低到高
+补齐，同一事件内每个 provider 最多调用一次。
+
+每个事件处理完后调用 finish()，统计各 provider 的实际调用次数和因为不需要
+而省下的调用次数，定期输出到日志。
+"""
+
+import logging
+from collections import Counter
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class Provider:
+    __slots__ = ("name", "fields", "cost", "requires", "fetch")
+
+    def __init__(self, name, fields, cost, requires, fetch):
+        self.name = name
+        self.fields = fields
+        self.cost = cost
+        self.requires = requires
+        self.fetch = fetch
+
+
+class EnrichContext(dict):
+    """
+    单个事件的字段字典
+
+    env 存放 provider 需要的非字段依赖（如 WebSocket 连接），fetched 记录本事件已调用的 provider
+    """
+
+    __slots__ = ("env", "fetched")
+
+    def __init__(self, fields, env):
+        super().__init__(fields)
+        self.env = env
+        self.fetched = set()
+
+
+class Enricher:
+    def __init__(self, name, stats_every=100):
+        self.name = name
+        self.stats_every = stats_every
+        self.providers = {}
+        self._by_field = {}
+        self._costs = {}
+        self.calls = Counter()
+        self.avoided = Counter()
+        self.events = 0
+
+    def provider(self, *fields, cost=1, requires=(), name=None):
+        """
+        注册 provider 的装饰器
+
+        被装饰的函数签名为 async fetch(ctx) -> dict，返回的字段合并进 ctx；
+        返回 None 或缺少某个字段时该字段保持缺失，本事件内不再重试。
+        """
+
+        def register(fetch):
+            provider = Provider(
+                name or fetch.__name__, fields, cost, tuple(requires), fetch
+            )
+            self.providers[provider.name] = provider
+            for field in fields:
+                self._by_field[field] = provider
+            self._costs.clear()
+            return fetch
+
+        return register
+
+    def cost(self, field):
+        """补齐某个字段的总代价（包括全部依赖，依赖间共用的 provider 只算一次）"""
+        if field not in self._costs:
+            self._costs[field] = sum(p.cost for p in self._closure(field))
+        return self._costs[field]
+
+    def _closure(self, field, seen=None, ctx=()):
+        """补齐字段需要调用的 provider（含依赖），ctx 中已有的字段不再展开"""
+        seen = set() if seen is None else seen
+        provider = self._by_field.get(field)
+        if field in ctx or provider is None or provider.name in seen:
+            return []
+        seen.add(provider.name)
+        result = [provider]
+        for dep in provider.requires:
+            result += self._closure(dep, seen, ctx)
+        return result
+
+    def cost_of(self, fields, ctx=None):
+        """
+        补齐一组字段的代价，供 RuleEngine 给规则排序：各字段需要的 provider
+        去重后代价求和，ctx 中已有的字段和本事件已调用过的 provider 不计
+        """
+        ctx = () if ctx is None else ctx
+        fetched = getattr(ctx, "fetched", ())
+        seen = set(fetched)
+        return sum(
+            provider.cost
+            for field in fields
+            for provider in self._closure(field, seen, ctx)
+        )
+
+    def context(self, fields, **env):
+        return EnrichContext(fields, env)
+
+    async def resolve(self, field, ctx):
+        """补齐单个字段，签名与 RuleEngine.evaluate 的 resolve 参数一致"""
+        if field in ctx:
+            return
+        provider = self._by_field.get(field)
+        if provider is None or provider.name in ctx.fetched:
+            return
+        ctx.fetched.add(provider.name)
+
+        await self.require(ctx, provider.requires)
+        self.calls[provider.name] += 1
+        with span(provider.name):
+            result = await provider.fetch(ctx)
+        if result:
+            ctx.update(result)
+
+    async def require(self, ctx, fields):
+        """按代价从低到高补齐一组字段"""
+        for field in sorted(fields, key=self.cost):
+            await self.resolve(field, ctx)
+
+    def finish(self, ctx):
+        """事件处理结束，记录本事件没有用到的 provider"""
+        for name in self.providers:
+            if name not in ctx.fetched:
+                self.avoided[name] += 1
+        self.events += 1
+        if self.stats_every and self.events % self.stats_every == 0:
+            self.log_stats()
+
+    def log_stats(self):
+        summary = " | ".join(
+            f"{name}: 调用 {self.calls[name]} 省去 {self.avoided[name]}"
+            for name in self.providers
+        )
+        logger.info(
+            f"[{self.name}] 已处理 {self.events} 个事件，按需获取统计: {summary}"
+        )
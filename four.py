@@ -1,160 +1,103 @@
 import asyncio
-import websockets
-import json
 import logging
-from eth_abi import decode
-import aiohttp
-
-# 配置日志系统
-chinese_time_format = "%Y年%m月%d日%H时%M分%S秒"
-log_format = "[%(levelname)s] %(asctime)s [%(name)s]：%(message)s"
-logging.basicConfig(
-    format=log_format, level=logging.INFO, datefmt=chinese_time_format, force=True
+import functools
+import os
+import time
+from decoders import decode_liquidity_added_event, decode_token_create_event
+from enrich import Enricher
+from logsetup import setup_logging
+from market import STALE_MARK, get_token_market_info
+from pairstream import PairStream
+from rules import RuleEngine
+from runtime import make_runtime
+from telegram_bot import TelegramBot
+from templates import (
+    FOUR_MARKET_CAP_CROSSED,
+    FOUR_MARKET_CAP_UPDATE,
+    FOUR_MARKET_LINES,
+    FOUR_TOKEN_BONDED,
+    FOUR_TOKEN_BONDED_KEYBOARD,
+    FOUR_TOKEN_CREATED,
+    FOUR_TOKEN_CREATED_KEYBOARD,
 )
-logging.getLogger("telethon").setLevel(logging.WARNING)
-logger = logging.getLogger(__name__)
+from watcher import MarketCapWatcher
 
-# Telegram 配置
-TELEGRAM_BOT_TOKEN = ""  # 替换为你的 bot token
-TELEGRAM_CHAT_ID_TOKEN_CREATE = ""  # TokenCreate 事件的频道 ID
-TELEGRAM_CHAT_ID_TOKEN_BONDED = ""  # TokenBONDED 事件的频道 ID
+# 配置日志系统，见 logsetup.py
+setup_logging()
+logger = logging.getLogger(__name__)
 
+# 以下配置（市值门槛除外）优先使用同名环境变量（PAIR_STREAM_ENABLED 对应 PAIR_STREAM），
+# 没有设置时使用这里的默认值
+
+# Telegram 配置：替换为你的 bot token，以及 TokenCreate / TokenBONDED 事件的频道 ID
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
+TELEGRAM_CHAT_ID_TOKEN_CREATE = os.getenv("TELEGRAM_CHAT_ID_TOKEN_CREATE", "")
+TELEGRAM_CHAT_ID_TOKEN_BONDED = os.getenv("TELEGRAM_CHAT_ID_TOKEN_BONDED", "")
+telegram = TelegramBot(TELEGRAM_BOT_TOKEN)
+
+# 连接、解码进程池、事件输出和链路追踪，配置见 runtime.py
+runtime = make_runtime()
+dispatcher = runtime.dispatcher
+
+# 按需获取的字段：代币名称需要一次 RPC，市场信息需要调用币安API
+MARKET_RULE_FIELDS = (
+    "market_info",
+    "marketCap",
+    "devHolders",
+    "devHoldingPercent",
+    "holders",
+    "top10HoldersPercentage",
+)
+enricher = Enricher("four")
 
-async def send_telegram_message(message, chat_id, parse_mode=None, reply_markup=None):
-    """使用 Telegram HTTP API 发送消息"""
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": message,
-        "disable_web_page_preview": True,
-    }
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    if reply_markup:
-        payload["reply_markup"] = reply_markup
+# 迁移后市值跟踪：市值突破以下门槛（美元）时再推送一次
+MARKET_CAP_WATCH_THRESHOLDS = [100_000, 500_000, 1_000_000, 5_000_000]
+# 每分钟最多请求次数
+MARKET_CAP_WATCH_BUDGET = int(os.getenv("MARKET_CAP_WATCH_BUDGET", "60"))
+# 突破门槛时的提醒方式：edit 编辑原迁移消息（失败时再发新消息），send 总是发新消息
+MARKET_CAP_UPDATE_MODE = os.getenv("MARKET_CAP_UPDATE_MODE", "edit")
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    logger.info(f"Telegram 消息发送成功到 {chat_id}")
-                    return True
-                else:
-                    error_text = await response.text()
-                    logger.error(
-                        f"Telegram 消息发送失败: {response.status} - {error_text}"
-                    )
-                    return False
-    except Exception as e:
-        logger.error(f"发送 Telegram 消息异常: {e}")
-        return False
+# 迁移后通过 Sync/Swap 事件实时跟踪 PancakeSwap 交易对储备
+PAIR_STREAM_ENABLED = os.getenv("PAIR_STREAM", "0") == "1"
+PANCAKE_FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+WBNB = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
 
 
-def decode_token_create_event(data_hex):
-    """解析 TokenCreate 事件数据"""
-    try:
-        decoded = decode(
-            [
-                "address",
-                "address",
-                "uint256",
-                "string",
-                "string",
-                "uint256",
-                "uint256",
-                "uint256",
-            ],
-            bytes.fromhex(data_hex[2:] if data_hex.startswith("0x") else data_hex),
-        )
-        return {
-            "creator": decoded[0],
-            "token": decoded[1],
-            "requestId": decoded[2],
-            "name": decoded[3],
-            "symbol": decoded[4],
-            "totalSupply": decoded[5],
-            "totalSupply_formatted": decoded[5] / 10**18,
-            "launchTime": decoded[6],
-            "launchFee": decoded[7],
-            "launchFee_formatted": decoded[7] / 10**18,
-        }
-    except Exception as e:
-        logger.error(f"解析 TokenCreate 事件失败: {e}")
-        return None
+def format_market_cap(mc):
+    """格式化市值显示（M/K/万）"""
+    if mc >= 1000000:
+        return f"{mc/1000000:.1f}M USD ({mc/10000:.1f}万)"
+    elif mc >= 1000:
+        return f"{mc/1000:.1f}K USD ({mc/10000:.1f}万)"
+    return f"{mc:.1f} USD"
 
 
-def decode_liquidity_added_event(data_hex):
-    """解析 LiquidityAdded 事件数据"""
-    try:
-        decoded = decode(
-            [
-                "address",
-                "uint256",
-                "address",
-                "uint256",
-            ],
-            bytes.fromhex(data_hex[2:] if data_hex.startswith("0x") else data_hex),
-        )
-        return {
-            "base": decoded[0],
-            "offers": decoded[1],
-            "quote": decoded[2],
-            "funds": decoded[3],
-        }
-    except Exception as e:
-        logger.error(f"解析 LiquidityAdded 事件失败: {e}")
-        return None
-
-
-async def get_token_info(ws, token_address):
+async def get_token_info(rpc, token_address):
     """通过WebSocket获取代币信息（名称和符号）"""
     try:
         name_selector = "0x06fdde03"
         symbol_selector = "0x95d89b41"
 
-        # 获取name
-        name_payload = {
-            "jsonrpc": "2.0",
-            "id": 100,
-            "method": "eth_call",
-            "params": [{"to": token_address, "data": name_selector}, "latest"],
-        }
-        await ws.send(json.dumps(name_payload))
-        name_response = await ws.recv()
-        name_data = json.loads(name_response)
-
-        # 获取symbol
-        symbol_payload = {
-            "jsonrpc": "2.0",
-            "id": 101,
-            "method": "eth_call",
-            "params": [{"to": token_address, "data": symbol_selector}, "latest"],
-        }
-        await ws.send(json.dumps(symbol_payload))
-        symbol_response = await ws.recv()
-        symbol_data = json.loads(symbol_response)
+        name_result = await rpc.call(
+            "eth_call", [{"to": token_address, "data": name_selector}, "latest"]
+        )
+        symbol_result = await rpc.call(
+            "eth_call", [{"to": token_address, "data": symbol_selector}, "latest"]
+        )
 
         # 解析结果
         name = ""
         symbol = ""
 
-        if (
-            "result" in name_data
-            and name_data["result"]
-            and name_data["result"] != "0x"
-        ):
-            result = name_data["result"].replace("0x", "")
+        if name_result and name_result != "0x":
+            result = name_result.replace("0x", "")
             if len(result) >= 128:
                 length = int(result[64:128], 16)
                 name_hex = result[128 : 128 + length * 2]
                 name = bytes.fromhex(name_hex).decode("utf-8", errors="ignore")
 
-        if (
-            "result" in symbol_data
-            and symbol_data["result"]
-            and symbol_data["result"] != "0x"
-        ):
-            result = symbol_data["result"].replace("0x", "")
+        if symbol_result and symbol_result != "0x":
+            result = symbol_result.replace("0x", "")
             if len(result) >= 128:
                 length = int(result[64:128], 16)
                 symbol_hex = result[128 : 128 + length * 2]
@@ -167,266 +110,296 @@ async def get_token_info(ws, token_address):
         return "", ""
 
 
-async def get_token_market_info(token_address):
-    """通过币安API获取代币市场信息"""
+async def get_pancake_pair(rpc, token_address, quote_address):
+    """通过 PancakeSwap Factory 的 getPair 查询迁移后的交易对地址，不存在返回 None"""
+    if int(quote_address, 16) == 0:
+        quote_address = WBNB  # quote 为零地址表示 BNB
+    data = (
+        "0xe6a43905"
+        + token_address[2:].lower().rjust(64, "0")
+        + quote_address[2:].lower().rjust(64, "0")
+    )
     try:
-        url = "https://web3.binance.com/bapi/defi/v4/public/wallet-direct/buw/wallet/market/token/dynamic/info"
-        params = {"chainId": "56", "contractAddress": token_address}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url, params=params, timeout=aiohttp.ClientTimeout(total=5)
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("success") and result.get("data"):
-                        data = result["data"]
-                        return {
-                            "marketCap": float(data.get("marketCap", 0)),
-                            "devHolders": data.get("devHolders", 0),
-                            "devHoldingPercent": data.get("holdersDevPercent", "0"),
-                            "holders": data.get("holders", "0"),
-                            "top10HoldersPercentage": data.get(
-                                "top10HoldersPercentage", "0"
-                            ),
-                        }
-                return None
+        result = await rpc.call(
+            "eth_call", [{"to": PANCAKE_FACTORY, "data": data}, "latest"]
+        )
     except Exception as e:
-        logger.warning(f"获取市场信息异常: {e}")
+        logger.warning(f"查询交易对失败: {e}")
         return None
+    if not result or int(result, 16) == 0:
+        return None
+    return "0x" + result[-40:]
+
+
+@enricher.provider("base_name", "base_symbol", cost=1)
+async def fetch_base_token_info(ctx):
+    """通过 RPC 获取 base 代币名称和符号"""
+    base_name, base_symbol = await get_token_info(ctx.env["rpc"], ctx["base"])
+    logger.info("Base代币信息: %s (%s)", base_name, base_symbol)
+    return {"base_name": base_name, "base_symbol": base_symbol}
+
+
+@enricher.provider(*MARKET_RULE_FIELDS, cost=2)
+async def fetch_base_market_info(ctx):
+    """通过币安API获取 base 代币市场信息，失败时 market_info 为 None"""
+    market_info = await get_token_market_info(ctx["base"])
+    if not market_info:
+        return {"market_info": None}
+    logger.info(
+        "市值: $%.2f | 持有者: %s | Dev持仓: %s%% (%s个)",
+        market_info["marketCap"],
+        market_info["holders"],
+        market_info["devHoldingPercent"],
+        market_info["devHolders"],
+    )
+    return dict(market_info, market_info=market_info)
+
+
+rule_engine = RuleEngine(
+    os.getenv("RULES_FILE", "rules.json"), "four", cost=enricher.cost_of
+)
+
+
+async def send_token_created(values):
+    """发送 Telegram 通知到 TokenCreate 频道"""
+    await telegram.send(
+        FOUR_TOKEN_CREATED.render(values),
+        TELEGRAM_CHAT_ID_TOKEN_CREATE,
+        reply_markup=FOUR_TOKEN_CREATED_KEYBOARD.render(values),
+    )
 
 
-async def subscribe_bsc_events():
-    """
-    连接到 BSC 主网 WebSocket，订阅指定合约的两个事件
-    """
-    ws_url = ""
-    contract = "0x5c952063c7fc8610FFDB798152D69F0B9550762b"
-    token_create_topic = (
-        "0x396d5e902b675b032348d3d2e9517ee8f0c4a926603fbc075d3d282ff00cad20"
+async def send_token_bonded(values, market_info):
+    """发送 Telegram 通知到 LiquidityAdded 频道，消息包含市场信息"""
+    market_lines = ""
+    if market_info:
+        top10_raw = market_info.get("top10HoldersPercentage", "0")
+        market_lines = FOUR_MARKET_LINES.render(
+            {
+                "market_cap": format_market_cap(market_info["marketCap"]),
+                "stale": STALE_MARK if market_info["stale"] else "",
+                "holders": market_info["holders"],
+                "top10_percent": f"{float(top10_raw):.2f}" if top10_raw else "0",
+            }
+        )
+    # 记录 message_id，之后市值突破门槛时直接编辑这条消息
+    await telegram.send(
+        FOUR_TOKEN_BONDED.render(dict(values, market_lines=market_lines)),
+        TELEGRAM_CHAT_ID_TOKEN_BONDED,
+        reply_markup=FOUR_TOKEN_BONDED_KEYBOARD.render(values),
+        key=values["address"].lower(),
     )
-    liquidity_added_topic = (
-        "0xc18aa71171b358b706fe3dd345299685ba21a5316c66ffa9e319268b033c44b0"
+
+
+async def send_market_cap_crossed(values):
+    """更新原迁移消息，无法编辑时推送到 TokenBONDED 频道"""
+    key = values["address"].lower()
+    sent = telegram.get_sent(key)
+    if MARKET_CAP_UPDATE_MODE == "edit" and sent:
+        text = sent.text + FOUR_MARKET_CAP_UPDATE.render(values)
+        if await telegram.edit(key, text):
+            return
+    await telegram.send(
+        FOUR_MARKET_CAP_CROSSED.render(values), TELEGRAM_CHAT_ID_TOKEN_BONDED
     )
 
-    # 订阅 TokenCreate 事件
-    subscribe_token_create = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "eth_subscribe",
-        "params": ["logs", {"address": contract, "topics": [token_create_topic]}],
-    }
 
-    # 订阅 LiquidityAdded 事件
-    subscribe_liquidity_added = {
-        "jsonrpc": "2.0",
-        "id": 2,
-        "method": "eth_subscribe",
-        "params": ["logs", {"address": contract, "topics": [liquidity_added_topic]}],
+async def notify_market_cap_crossed(token, threshold, market_info):
+    """迁移后的代币市值突破门槛"""
+    minutes = (time.monotonic() - token.added_at) / 60
+    values = {
+        "threshold": format_market_cap(threshold),
+        "name": token.name or "未知",
+        "symbol": token.symbol or "?",
+        "address": token.address,
+        "market_cap": format_market_cap(market_info["marketCap"]),
+        "initial_market_cap": format_market_cap(token.initial_market_cap),
+        "minutes": minutes,
+        "holders": market_info["holders"],
     }
+    dispatcher.publish(
+        "four_market_cap_crossed",
+        {
+            "token": token.address,
+            "name": token.name,
+            "symbol": token.symbol,
+            "threshold": threshold,
+            "initial_market_cap": token.initial_market_cap,
+            "minutes": minutes,
+            "market_info": market_info,
+        },
+        (
+            functools.partial(send_market_cap_crossed, values)
+            if TELEGRAM_CHAT_ID_TOKEN_BONDED
+            else None
+        ),
+    )
+
+
+market_cap_watcher = MarketCapWatcher(
+    MARKET_CAP_WATCH_THRESHOLDS,
+    notify_market_cap_crossed,
+    requests_per_minute=MARKET_CAP_WATCH_BUDGET,
+)
+
+
+async def handle_token_create(rpc, event_result, parsed):
+    """处理单个 TokenCreate 事件，parsed 为 decode_token_create_event 的结果"""
+    logger.info(
+        "收到 TokenCreate 事件",
+        extra={"sample": "token_create_received"},
+    )
+    if parsed:
+        logger.info(
+            "代币名称: %s | 代币符号: %s | 代币地址: %s",
+            parsed["name"],
+            parsed["symbol"],
+            parsed["token"],
+        )
+
+        ctx = dict(parsed, event="TokenCreate")
+        rule = await rule_engine.evaluate(ctx)
+        if rule:
+            logger.info(
+                "命中规则 %s: %s",
+                rule.name,
+                rule.message,
+                extra={"sample": f"rule:{rule.name}"},
+            )
+            return
+
+        # 结构化事件先发出，Telegram 消息在 Telegram sink 中渲染
+        values = {
+            "name": parsed["name"],
+            "symbol": parsed["symbol"],
+            "address": parsed["token"],
+            "creator": parsed["creator"],
+        }
+        dispatcher.publish(
+            "four_token_created",
+            parsed,
+            (
+                functools.partial(send_token_created, values)
+                if TELEGRAM_CHAT_ID_TOKEN_CREATE
+                else None
+            ),
+        )
 
-    retry_delay = 5  # 重连延迟秒数
 
-    while True:
+async def handle_liquidity_added(rpc, event_result, parsed):
+    """处理单个 LiquidityAdded 事件：过滤、按需补齐代币和市场信息并推送"""
+    logger.info(
+        "收到 LiquidityAdded 事件",
+        extra={"sample": "liquidity_added_received"},
+    )
+    # 原始数据只在 DEBUG 级别输出
+    logger.debug(
+        "data: %s topics: %s", event_result.get("data"), event_result.get("topics")
+    )
+    if parsed:
+        logger.info("%s", parsed)
+
+        # 过滤规则：代币信息和市场信息只在规则或消息用到时才去获取
+        ctx = enricher.context(parsed, rpc=rpc)
+        ctx["event"] = "LiquidityAdded"
+        notify = TELEGRAM_CHAT_ID_TOKEN_BONDED or dispatcher.structured
         try:
-            async with websockets.connect(
-                ws_url, ping_interval=20, ping_timeout=10, close_timeout=10
-            ) as ws:
-                logger.info(f"已连接到 BSC 主网")
-
-                # 发送订阅请求
-                await ws.send(json.dumps(subscribe_token_create))
-                logger.info(f"已订阅合约 {contract} 的 TokenCreate 事件")
-
-                await ws.send(json.dumps(subscribe_liquidity_added))
-                logger.info(f"已订阅合约 {contract} 的 LiquidityAdded 事件")
-
-                # 持续接收事件
-                while True:
-                    message = await ws.recv()
-                    data = json.loads(message)
-
-                    if "params" in data and "result" in data["params"]:
-                        event_result = data["params"]["result"]
-
-                        # 打印事件信息
-                        topics = event_result.get("topics", [])
-                        event_data = event_result.get("data", "")
-
-                        # 判断事件类型并解析
-                        if topics and topics[0] == token_create_topic:
-                            logger.info(f"收到 TokenCreate 事件")
-                            parsed = decode_token_create_event(event_data)
-                            if parsed:
-                                logger.info(
-                                    f"代币名称: {parsed['name']} | 代币符号: {parsed['symbol']} | 代币地址: {parsed['token']}"
-                                )
-
-                                # 发送 Telegram 通知到 TokenCreate 频道
-                                if TELEGRAM_CHAT_ID_TOKEN_CREATE:
-                                    token_addr = parsed["token"]
-                                    token_name = parsed["name"]
-                                    token_symbol = parsed["symbol"]
-                                    creator_addr = parsed["creator"]
-
-                                    msg = f"🆕 新代币创建\n\n"
-                                    msg += f"💰 代币名称: {token_name}(💛BSC)\n"
-                                    msg += f"🔣 代币符号: {token_symbol}\n\n"
-                                    msg += f"[Avebot链接]({f'https://pro.ave.ai/token/{token_addr}-bsc?lang=zh-cn&code=pikacyan'}) | "
-                                    msg += f"[Axiom链接]({f'https://axiom.trade/t/{token_addr}?chain=bnb'}) | "
-                                    msg += f"[Binance Web3]({f'https://web3.binance.com/zh-CN/token/bsc/{token_addr}?ref=ER50PYNM'}) | "
-                                    msg += f"[GMGN链接]({f'https://gmgn.ai/bsc/token/CHENGZI_{token_addr}'}) | "
-                                    msg += f"[OKX Web3]({f'https://web3.okx.com/zh-hans/token/bsc/{token_addr}'})\n\n"
-                                    msg += f"📋 合约地址: `{token_addr}`\n\n"
-                                    msg += f"✨ Powered by [PikacyanWeb3](https://x.com/pikacyanweb3)"
-                                    buttons = {
-                                        "inline_keyboard": [
-                                            [
-                                                {
-                                                    "text": "🐦 Search CA on X",
-                                                    "url": f"https://x.com/search?q={token_addr}",
-                                                },
-                                                {
-                                                    "text": "🐦 Search Creator on X",
-                                                    "url": f"https://x.com/search?q={creator_addr}",
-                                                },
-                                            ],
-                                            [
-                                                {
-                                                    "text": "Avebot 立即购买",
-                                                    "url": f"https://t.me/AveSniperBot_01_bot?start={token_addr}-pikacyan",
-                                                },
-                                                {
-                                                    "text": "Bloom 立即购买",
-                                                    "url": f"https://t.me/BloomEVMbot?start=ref_pikacyan_ca_{token_addr}",
-                                                },
-                                            ],
-                                        ]
-                                    }
-                                    await send_telegram_message(
-                                        msg,
-                                        TELEGRAM_CHAT_ID_TOKEN_CREATE,
-                                        parse_mode="Markdown",
-                                        reply_markup=buttons,
-                                    )
-
-                        elif topics and topics[0] == liquidity_added_topic:
-                            logger.info(f"收到 LiquidityAdded 事件")
-                            logger.info(f"{event_data}")
-                            logger.info(f"{topics}")
-                            parsed = decode_liquidity_added_event(event_data)
-                            if parsed:
-                                logger.info(f"{parsed}")
-
-                                # 发送 Telegram 通知到 LiquidityAdded 频道
-                                if TELEGRAM_CHAT_ID_TOKEN_BONDED:
-                                    base_addr = parsed["base"]
-                                    quote_addr = parsed["quote"]
-
-                                    # 通过 RPC 获取代币名称和符号
-                                    base_name, base_symbol = await get_token_info(
-                                        ws, base_addr
-                                    )
-                                    logger.info(
-                                        f"Base代币信息: {base_name} ({base_symbol})"
-                                    )
-
-                                    # 获取市场信息
-                                    market_info = await get_token_market_info(base_addr)
-                                    if market_info:
-                                        logger.info(
-                                            f"市值: ${market_info['marketCap']:,.2f} | "
-                                            f"持有者: {market_info['holders']} | "
-                                            f"Dev持仓: {market_info['devHoldingPercent']}% ({market_info['devHolders']}个)"
-                                        )
-
-                                    # 构造交易平台链接
-                                    platform_links = (
-                                        f"[Avebot]({f'https://pro.ave.ai/token/{base_addr}-bsc?lang=zh-cn&code=pikacyan'}) | "
-                                        f"[Axiom]({f'https://axiom.trade/meme/{base_addr}?chain=bnb'}) | "
-                                        f"[Binance]({f'https://web3.binance.com/zh-CN/token/bsc/{base_addr}?ref=ER50PYNM'}) | "
-                                        f"[GMGN]({f'https://gmgn.ai/bsc/token/CHENGZI_{base_addr}'}) | "
-                                        f"[OKX]({f'https://web3.okx.com/zh-hans/token/bnbchain/{base_addr}'})"
-                                    )
-
-                                    # 构建消息，包含市场信息
-                                    market_cap_formatted = ""
-                                    top10_percent = "0"
-                                    if market_info:
-                                        mc = market_info["marketCap"]
-                                        if mc >= 1000000:
-                                            market_cap_formatted = f"{mc/1000000:.1f}M USD ({mc/10000:.1f}万)"
-                                        elif mc >= 1000:
-                                            market_cap_formatted = (
-                                                f"{mc/1000:.1f}K USD ({mc/10000:.1f}万)"
-                                            )
-                                        else:
-                                            market_cap_formatted = f"{mc:.1f} USD"
-                                        top10_raw = market_info.get(
-                                            "top10HoldersPercentage", "0"
-                                        )
-                                        top10_percent = (
-                                            f"{float(top10_raw):.2f}"
-                                            if top10_raw
-                                            else "0"
-                                        )
-
-                                    msg = f"🚀🚀🚀 代币已迁移\n\n"
-                                    msg += (
-                                        f"💰 代币名称: {base_name or '未知'}(💛BSC)\n"
-                                    )
-                                    msg += f"🔣 代币符号: {base_symbol or '?'}\n\n"
-
-                                    if market_info:
-                                        msg += (
-                                            f"🚀 当前市值: **{market_cap_formatted}**\n"
-                                        )
-                                        msg += f"👥 持币人数: **{market_info['holders']}** | Top10持仓: **{top10_percent}%**\n\n"
-
-                                    msg += f"[Avebot链接]({f'https://pro.ave.ai/token/{base_addr}-bsc?lang=zh-cn&code=pikacyan'}) | "
-                                    msg += f"[Axiom链接]({f'https://axiom.trade/t/{base_addr}?chain=bnb'}) | "
-                                    msg += f"[Binance Web3]({f'https://web3.binance.com/zh-CN/token/bsc/{base_addr}?ref=ER50PYNM'}) | "
-                                    msg += f"[GMGN链接]({f'https://gmgn.ai/bsc/token/CHENGZI_{base_addr}'}) | "
-                                    msg += f"[OKX Web3]({f'https://web3.okx.com/zh-hans/token/bsc/{base_addr}'})\n\n"
-                                    msg += f"📋 合约地址: `{base_addr}`\n\n"
-                                    msg += f"✨ Powered by [PikacyanWeb3](https://x.com/pikacyanweb3)"
-                                    buttons = {
-                                        "inline_keyboard": [
-                                            [
-                                                {
-                                                    "text": "🐦 Search CA on X",
-                                                    "url": f"https://x.com/search?q={base_addr}",
-                                                },
-                                            ],
-                                            [
-                                                {
-                                                    "text": "Avebot 立即购买",
-                                                    "url": f"https://t.me/AveSniperBot_01_bot?start={base_addr}-pikacyan",
-                                                },
-                                                {
-                                                    "text": "Bloom 立即购买",
-                                                    "url": f"https://t.me/BloomEVMbot?start=ref_pikacyan_ca_{base_addr}",
-                                                },
-                                            ],
-                                        ]
-                                    }
-                                    await send_telegram_message(
-                                        msg,
-                                        TELEGRAM_CHAT_ID_TOKEN_BONDED,
-                                        parse_mode="Markdown",
-                                        reply_markup=buttons,
-                                    )
-                    else:
-                        logger.debug(f"收到消息: {data}")
-
-        except websockets.exceptions.ConnectionClosed as e:
-            logger.warning(f"连接已关闭: {e}，{retry_delay}秒后重连...")
-            await asyncio.sleep(retry_delay)
-        except Exception as e:
-            logger.error(f"连接错误: {e}，{retry_delay}秒后重连...")
-            await asyncio.sleep(retry_delay)
+            rule = await rule_engine.evaluate(ctx, enricher.resolve)
+            if rule:
+                logger.info(
+                    "命中规则 %s: %s",
+                    rule.name,
+                    rule.message,
+                    extra={"sample": f"rule:{rule.name}"},
+                )
+                return
+            if notify:
+                await enricher.require(ctx, ("base_name", "market_info"))
+        finally:
+            enricher.finish(ctx)
+
+        if notify:
+            base_addr = parsed["base"]
+            quote_addr = parsed["quote"]
+            base_name = ctx["base_name"]
+            base_symbol = ctx["base_symbol"]
+            market_info = ctx["market_info"]
+
+            # 结构化事件先发出，Telegram 消息在 Telegram sink 中渲染
+            values = {
+                "name": base_name or "未知",
+                "symbol": base_symbol or "?",
+                "address": base_addr,
+            }
+            dispatcher.publish(
+                "four_token_bonded",
+                dict(
+                    parsed,
+                    base_name=base_name,
+                    base_symbol=base_symbol,
+                    market_info=market_info,
+                ),
+                (
+                    functools.partial(send_token_bonded, values, market_info)
+                    if TELEGRAM_CHAT_ID_TOKEN_BONDED
+                    else None
+                ),
+            )
+
+            # 迁移后实时跟踪交易对的 Sync/Swap
+            if pair_stream:
+                pair = await get_pancake_pair(rpc, base_addr, quote_addr)
+                if pair:
+                    pair_stream.add(pair, base_symbol)
+
+            # 迁移后继续跟踪市值，突破门槛时再提醒
+            market_cap_watcher.track(
+                base_addr,
+                base_name,
+                base_symbol,
+                market_info["marketCap"] if market_info else 0,
+            )
+
+
+FOUR_CONTRACT = "0x5c952063c7fc8610FFDB798152D69F0B9550762b"
+TOKEN_CREATE_TOPIC = (
+    "0x396d5e902b675b032348d3d2e9517ee8f0c4a926603fbc075d3d282ff00cad20"
+)
+LIQUIDITY_ADDED_TOPIC = (
+    "0xc18aa71171b358b706fe3dd345299685ba21a5316c66ffa9e319268b033c44b0"
+)
+
+# 两个事件合并进共用的 logs 订阅，按 (合约, topic0) 路由
+runtime.log_router.on(
+    FOUR_CONTRACT, TOKEN_CREATE_TOPIC, handle_token_create, decode_token_create_event
+)
+runtime.log_router.on(
+    FOUR_CONTRACT,
+    LIQUIDITY_ADDED_TOPIC,
+    handle_liquidity_added,
+    decode_liquidity_added_event,
+)
+
+
+def publish_pair_reserves(snapshot):
+    """交易对储备更新，只作为结构化事件发布，不发 Telegram"""
+    dispatcher.publish("four_pair_reserves", snapshot.to_dict())
+
+
+pair_stream = (
+    PairStream(on_update=publish_pair_reserves) if PAIR_STREAM_ENABLED else None
+)
+if pair_stream:
+    runtime.add_stream(pair_stream)
+    runtime.add_task(pair_stream.run)
+runtime.add_task(market_cap_watcher.run)
+runtime.add_task(rule_engine.run)
+
+
+async def main():
+    await runtime.run()
 
 
 if __name__ == "__main__":
-    # 订阅事件
-    asyncio.run(subscribe_bsc_events())
+    # 订阅事件，并在后台跟踪迁移后代币的市值
+    asyncio.run(main())
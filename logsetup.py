@@ -0,0 +1,184 @@
+"""
+日志配置
+
+所有日志记录先放进内存队列，由后台线程统一格式化和输出，事件处理协程只付出
+入队的代价。格式化也推迟到后台线程进行，因此热路径上的日志应使用
+logger.info("... %s", value) 的写法，级别未开启时参数不会被格式化。
+
+环境变量：
+    LOG_FORMAT        text（默认，与原来的中文格式相同）或 json（每行一个 JSON，
+                      extra 中的字段作为键值输出）
+    LOG_SAMPLE_EVERY  带 extra={"sample": key} 的重复日志每多少条保留 1 条，默认 10
+    LOG_LEVELS        启动时的各模块级别，如 rules=DEBUG,market=WARNING
+    LOG_LEVELS_FILE   级别文件（JSON，{"模块名": "级别"}，root 表示根日志），
+                      默认 log_levels.json，修改后自动生效，不需要重启
+
+事件处理过程中产生的记录带有 trace id（文本格式写在模块名之后，JSON 格式为
+trace_id 字段），同一个事件的日志可以按它串起来，见 tracing.py。
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+import tracing
+
+TEXT_FORMAT = "[%(levelname)s] %(asctime)s [%(name)s]%(trace)s：%(message)s"
+TIME_FORMAT = "%Y年%m月%d日%H时%M分%S秒"
+
+# LogRecord 自带的属性，其余的都是 extra 传入的字段
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "sample",
+    "trace",
+}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """带 extra={"sample": key} 的记录按 key 计数，每 every 条只保留第 1 条"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self.counts = Counter()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or self.every <= 1:
+            return True
+        count = self.counts[key]
+        self.counts[key] = count + 1
+        if count % self.every:
+            return False
+        # 保留下来的这条代表 every 条
+        record.sampled = self.every
+        return True
+
+
+class TraceFilter(logging.Filter):
+    """在事件处理过程中产生的记录上附加当前 trace id（见 tracing.py）"""
+
+    def filter(self, record):
+        trace = tracing.current()
+        if trace is None:
+            record.trace = ""
+        else:
+            record.trace = f" [{trace.id}]"
+            record.trace_id = trace.id
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # 同一进程内的队列不需要序列化，格式化留给后台线程
+        return record
+
+
+def set_level(name, level):
+    """运行时调整某个模块的日志级别，name 为 root 或空时调整根日志"""
+    logger = logging.getLogger(None if name in ("", "root") else name)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip()
+    return levels
+
+
+class LevelFile:
+    """级别文件，文件修改后重新应用"""
+
+    def __init__(self, path, interval=2.0):
+        self.path = path
+        self.interval = interval
+        self._mtime = None
+
+    def maybe_reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                levels = json.load(f)
+            for name, level in levels.items():
+                set_level(name, level)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"日志级别文件加载失败: {e}")
+            return
+        logging.getLogger(__name__).info(f"已应用日志级别: {levels}")
+
+    def _watch(self):
+        while True:
+            self.maybe_reload()
+            time.sleep(self.interval)
+
+    def start(self):
+        threading.Thread(target=self._watch, name="log-levels", daemon=True).start()
+
+
+def setup_logging(level=logging.INFO):
+    """配置根日志，多次调用（组合运行）时只生效一次"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, TIME_FORMAT)
+    output = logging.StreamHandler()
+    output.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(SampleFilter(int(os.getenv("LOG_SAMPLE_EVERY", "10"))))
+    # trace id 要在产生记录的协程里读取，不能留给后台线程
+    handler.addFilter(TraceFilter())
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    logging.getLogger("telethon").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    for name, name_level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        set_level(name, name_level)
+    LevelFile(os.getenv("LOG_LEVELS_FILE", "log_levels.json")).start()
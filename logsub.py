@@ -0,0 +1,180 @@
+"""
+日志订阅合并与路由
+
+各个处理函数按 (合约地址, topic0) 登记，订阅时把所有登记合并成尽量少的 logs
+过滤器：地址写成数组，topic0 写成 OR 列表。默认只生成一个过滤器，不管监控多少
+个合约、多少种事件都只占一个订阅。
+
+合并后的过滤器是地址和 topic0 的笛卡尔积，可能收到没有登记过的组合（A 合约的
+事件 X 只登记在 B 合约上），这些日志在路由时直接丢弃。某个组合量很大、不希望
+多收时可以用 exact=True，按 topic0 集合相同的地址分组，每组一个过滤器。
+
+路由是一次字典查找：键为 (地址的 20 字节, 小写 topic0)。
+"""
+
+import logging
+import time
+
+from addrset import address_key
+from tracing import Trace, activate
+
+logger = logging.getLogger(__name__)
+
+
+class LogRouter:
+    def __init__(self, exact=False):
+        self.exact = exact
+        self._handlers = {}
+        # 保留登记时的地址写法，用于订阅参数和日志
+        self._addresses = {}
+        self._subscription_ids = set()
+        self.unrouted = 0
+
+    def on(self, address, topic, handler, decoder=None):
+        """
+        登记处理函数：async handler(rpc, log)
+        给出 decoder 时先解码日志的 data，改为调用 handler(rpc, log, decoded)；
+        decoder 需要是模块级函数，批量处理时可能在解码进程池中执行
+        同一个 (地址, topic0) 只能登记一次
+        """
+        key = address_key(address)
+        if key is None:
+            raise ValueError(f"不合法的合约地址: {address}")
+        route = (key, topic.lower())
+        if route in self._handlers:
+            raise ValueError(f"重复登记: {address} {topic}")
+        self._handlers[route] = (handler, decoder)
+        self._addresses.setdefault(key, address)
+
+    def plan(self):
+        """返回 eth_subscribe 的 logs 过滤器列表"""
+        if not self._handlers:
+            return []
+        if self.exact:
+            topics_by_address = {}
+            for key, topic in self._handlers:
+                topics_by_address.setdefault(key, set()).add(topic)
+            groups = {}
+            for key, topics in topics_by_address.items():
+                groups.setdefault(frozenset(topics), []).append(key)
+        else:
+            keys = {key for key, _ in self._handlers}
+            topics = {topic for _, topic in self._handlers}
+            groups = {frozenset(topics): list(keys)}
+
+        filters = []
+        for topics, keys in groups.items():
+            addresses = sorted(self._addresses[key] for key in keys)
+            filters.append(
+                {
+                    "address": addresses[0] if len(addresses) == 1 else addresses,
+                    "topics": [sorted(topics)],
+                }
+            )
+        return filters
+
+    async def subscribe(self, rpc):
+        """在连接上发送合并后的订阅，重连后重新调用"""
+        self._subscription_ids.clear()
+        for filter_params in self.plan():
+            subscription_id = await rpc.call("eth_subscribe", ["logs", filter_params])
+            self._subscription_ids.add(subscription_id)
+            logger.info(
+                f"已订阅 {len(filter_params['topics'][0])} 种事件: {filter_params['address']}"
+            )
+
+    def owns(self, subscription_id):
+        return subscription_id in self._subscription_ids
+
+    def route(self, log):
+        """返回 (handler, decoder)，没有登记的组合返回 None"""
+        topics = log.get("topics")
+        if not topics:
+            return None
+        return self._handlers.get((address_key(log.get("address")), topics[0].lower()))
+
+    def _drop(self, log):
+        self.unrouted += 1
+        logger.debug("丢弃未登记的日志: %s %s", log.get("address"), log.get("topics"))
+
+    def _trace(self, log, handler):
+        block = log.get("blockNumber")
+        return Trace(
+            handler.__name__,
+            log.get("_received"),
+            int(block, 16) if isinstance(block, str) else None,
+        )
+
+    async def _call(self, trace, rpc, log, handler, decoder, decoded):
+        """
+        调用处理函数；处理函数抛出的异常只记录下来，不影响同一批里的其他日志，
+        连接断开等问题由接收循环下一次 recv() 时发现
+        """
+        try:
+            with activate(trace):
+                try:
+                    if decoder is None:
+                        await handler(rpc, log)
+                    else:
+                        await handler(rpc, log, decoded)
+                except Exception:
+                    logger.exception(
+                        "%s 处理日志失败，交易: %s",
+                        handler.__name__,
+                        log.get("transactionHash"),
+                    )
+        finally:
+            trace.release()
+
+    async def dispatch(self, rpc, log):
+        """把日志交给登记的处理函数，没有登记的组合返回 False"""
+        route = self.route(log)
+        if route is None:
+            self._drop(log)
+            return False
+        handler, decoder = route
+        trace = self._trace(log, handler)
+        decoded = None
+        if decoder is not None:
+            start = time.monotonic()
+            decoded = decoder(log.get("data", ""))
+            trace.add("解码", start, time.monotonic())
+        await self._call(trace, rpc, log, handler, decoder, decoded)
+        return True
+
+    async def dispatch_batch(self, rpc, logs, pool):
+        """
+        处理一批日志：同一个 decoder 的日志一起交给解码进程池（堆积时才真正
+        送进子进程），再按原顺序逐条调用处理函数
+        """
+        pool.backlog = len(logs) + rpc.pending()
+        routed = []
+        by_decoder = {}
+        for log in logs:
+            route = self.route(log)
+            if route is None:
+                self._drop(log)
+                continue
+            if route[1] is not None:
+                by_decoder.setdefault(route[1], []).append(len(routed))
+            routed.append((log, route[0], route[1], self._trace(log, route[0])))
+
+        decoded = {}
+        for decoder, indexes in by_decoder.items():
+            start = time.monotonic()
+            results = await pool.map(
+                decoder, [routed[i][0].get("data", "") for i in indexes]
+            )
+            end = time.monotonic()
+            decoded.update(zip(indexes, results))
+            # 批量解码的耗时由这一批的每个事件共同承担
+            for i in indexes:
+                routed[i][3].add("解码", start, end)
+
+        batch_ready = time.monotonic()
+        for i, (log, handler, decoder, trace) in enumerate(routed):
+            # 处理函数内部的解码（如交易 input）按剩余的堆积量决定是否送进进程池
+            pool.backlog = len(routed) - i + rpc.pending()
+            # 等待同一批前面的事件处理完，同样算作排队
+            trace.add("排队", batch_ready, time.monotonic())
+            await self._call(trace, rpc, log, handler, decoder, decoded.get(i))
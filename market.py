@@ -0,0 +1,181 @@
+"""
+币安 Web3 市场数据接口
+
+每个接口各有一个熔断器：连续失败或超时达到阈值后熔断，之后的请求不再等待
+超时而是立即返回；熔断期间在后台定期探测接口，恢复后自动闭合。
+
+请求失败或熔断时，如果该代币有上一次成功获取的数据，则返回这份数据并标记为
+过期（stale），没有缓存时返回空结果。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MARKET_INFO_URL = "https://web3.binance.com/bapi/defi/v4/public/wallet-direct/buw/wallet/market/token/dynamic/info"
+TOKEN_META_URL = "https://web3.binance.com/bapi/defi/v1/public/wallet-direct/buw/wallet/dex/market/token/meta/info"
+REQUEST_TIMEOUT = 5  # 单次请求超时秒数
+STALE_MARK = " (缓存)"  # 消息中标记过期数据
+
+
+class CircuitBreaker:
+    """
+    连续失败 failure_threshold 次后熔断，熔断期间每隔 probe_interval 秒
+    调用 probe() 探测一次，探测成功即恢复
+    """
+
+    def __init__(self, name, failure_threshold=3, probe_interval=10):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.failures = 0
+        self.opened_at = None
+        self._probe_task = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def record_success(self):
+        if self.is_open:
+            logger.info(
+                f"{self.name} 已恢复，熔断持续 {time.monotonic() - self.opened_at:.1f} 秒"
+            )
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, probe):
+        self.failures += 1
+        if self.is_open or self.failures < self.failure_threshold:
+            return
+        self.opened_at = time.monotonic()
+        logger.warning(
+            f"{self.name} 连续失败 {self.failures} 次，熔断 (每 {self.probe_interval} 秒探测一次)"
+        )
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(probe))
+
+    async def _probe_loop(self, probe):
+        while self.is_open:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                if await probe():
+                    self.record_success()
+            except Exception as e:
+                logger.debug(f"{self.name} 探测失败: {e}")
+
+
+class MarketEndpoint:
+    """单个币安接口：熔断 + 按代币地址缓存最近一次成功的数据"""
+
+    def __init__(self, name, url, cache_size=10_000):
+        self.name = name
+        self.url = url
+        self.cache_size = cache_size
+        self.breaker = CircuitBreaker(name)
+        self._cache = OrderedDict()
+
+    async def _request(self, token_address):
+        """
+        请求接口，返回 data 字段；接口正常但没有该代币的数据时返回 None，
+        请求失败、超时或状态码异常时抛出异常
+        """
+        import aiohttp
+
+        params = {"chainId": "56", "contractAddress": token_address}  # BSC链ID
+        async with get_session().get(
+            self.url,
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        ) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"状态码: {resp.status}")
+            result = await resp.json()
+            if result.get("success") and result.get("data"):
+                return result["data"]
+            return None
+
+    async def fetch(self, token_address):
+        """返回 (data, stale)；没有可用数据时返回 (None, False)"""
+        key = token_address.lower()
+        if not self.breaker.is_open:
+            try:
+                data = await self._request(token_address)
+            except Exception as e:
+                logger.warning(f"{self.name} 请求失败: {e!r}, token: {token_address}")
+                self.breaker.record_failure(lambda: self._probe(token_address))
+            else:
+                self.breaker.record_success()
+                if data is not None:
+                    self._cache[key] = data
+                    self._cache.move_to_end(key)
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                return data, False
+
+        data = self._cache.get(key)
+        return data, data is not None
+
+    async def _probe(self, token_address):
+        await self._request(token_address)
+        return True
+
+
+market_info_endpoint = MarketEndpoint("币安市场信息接口", MARKET_INFO_URL)
+token_meta_endpoint = MarketEndpoint("币安代币元数据接口", TOKEN_META_URL)
+
+_session = None
+
+
+def get_session():
+    """进程内共用的 aiohttp 会话，首次使用时创建"""
+    global _session
+    if _session is None or _session.closed:
+        # aiohttp 导入较慢，推迟到第一次请求，不占用启动时间
+        import aiohttp
+
+        _session = aiohttp.ClientSession()
+    return _session
+
+
+async def get_token_market_info(token_address):
+    """通过币安API获取代币市场信息，数据来自缓存时 stale 为 True"""
+    data, stale = await market_info_endpoint.fetch(token_address)
+    if not data:
+        return None
+    return {
+        "marketCap": float(data.get("marketCap", 0)),
+        "devHolders": data.get("devHolders", 0),
+        "devHoldingPercent": data.get("holdersDevPercent", "0"),
+        "holders": data.get("holders", "0"),
+        "top10HoldersPercentage": data.get("top10HoldersPercentage", "0"),
+        "stale": stale,
+    }
+
+
+async def get_token_market_cap(token_address):
+    """通过币安API获取代币市值，返回 (市值, 是否来自缓存)，获取失败市值为 0"""
+    data, stale = await market_info_endpoint.fetch(token_address)
+    if data and data.get("marketCap"):
+        # 将字符串转换为浮点数
+        return float(data["marketCap"]), stale
+    return 0, False
+
+
+async def get_token_metadata(token_address):
+    """
+    通过币安API获取代币元数据，返回 (name, symbol)
+
+    请求失败、熔断打开或返回的名称和符号都为空时返回 None，调用方可以
+    `await get_token_metadata(...) or await ...` 改从链上读取。
+    """
+    data, _ = await token_meta_endpoint.fetch(token_address)
+    if not data:
+        return None
+    name, symbol = data.get("name", ""), data.get("symbol", "")
+    if not name and not symbol:
+        return None
+    return name, symbol
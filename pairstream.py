@@ -0,0 +1,182 @@
+"""
+新交易对的 Sync / Swap 实时跟踪
+
+推送过的交易对加入跟踪集合，所有交易对共用一个多地址 logs 订阅
+（topics 为 [[Sync, Swap]]）。集合变化后不会立即重订阅，而是每隔
+update_interval 秒合并一次：先订阅新的地址集合，再取消旧订阅，中间不漏事件；
+切换期间新旧订阅会推送同一条日志，按 (transactionHash, logIndex) 去重。
+
+每个交易对在内存中保存最新储备快照，每次 Sync 后以快照调用 on_update（各脚本
+把它作为结构化事件发布），超过 ttl 秒后移出订阅。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOPIC = "0x1c411e9a96e071241c2f21f7726b17ae89e3cab4c78be50e062b03a9fffbbad1"
+SWAP_TOPIC = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822"
+
+
+class PairSnapshot:
+    __slots__ = (
+        "pair",
+        "label",
+        "expires_at",
+        "reserve0",
+        "reserve1",
+        "block",
+        "swaps",
+        "updated_at",
+    )
+
+    def __init__(self, pair, label, expires_at):
+        self.pair = pair
+        self.label = label
+        self.expires_at = expires_at
+        self.reserve0 = None
+        self.reserve1 = None
+        self.block = None
+        self.swaps = 0
+        self.updated_at = None
+
+    def to_dict(self):
+        return {
+            "pair": self.pair,
+            "label": self.label,
+            "reserve0": self.reserve0,
+            "reserve1": self.reserve1,
+            "block": self.block,
+            "swaps": self.swaps,
+        }
+
+
+class PairStream:
+    """on_update: 储备更新后以 PairSnapshot 调用的回调"""
+
+    def __init__(self, ttl=1800, max_pairs=1000, update_interval=2.0, on_update=None):
+        self.ttl = ttl
+        self.max_pairs = max_pairs
+        self.update_interval = update_interval
+        self.pairs = OrderedDict()
+        self.rpc = None
+        self.subscription_id = None
+        self._subscription_ids = set()
+        self._dirty = False
+        self.on_update = on_update
+        # 最近处理过的 (transactionHash, logIndex)，用于订阅切换期间去重
+        self._seen = OrderedDict()
+        self.seen_size = 4096
+
+    def add(self, pair, label=""):
+        """加入跟踪，已在跟踪中则刷新过期时间"""
+        key = pair.lower()
+        expires_at = time.monotonic() + self.ttl
+        if key in self.pairs:
+            self.pairs[key].expires_at = expires_at
+            self.pairs.move_to_end(key)
+            return
+        if len(self.pairs) >= self.max_pairs:
+            oldest, _ = self.pairs.popitem(last=False)
+            logger.info(f"Sync/Swap 跟踪数量已满，移出 {oldest}")
+        self.pairs[key] = PairSnapshot(pair, label, expires_at)
+        self._dirty = True
+        logger.info(f"开始跟踪交易对 Sync/Swap: {label} {pair}")
+
+    def snapshot(self, pair):
+        return self.pairs.get(pair.lower())
+
+    def attach(self, rpc):
+        """新连接建立后调用，下一轮会在新连接上重新订阅"""
+        self.rpc = rpc
+        self.subscription_id = None
+        self._subscription_ids.clear()
+        self._dirty = bool(self.pairs)
+
+    def owns(self, subscription_id):
+        return subscription_id in self._subscription_ids
+
+    def handle(self, log):
+        """处理一条 Sync / Swap 日志，更新储备快照"""
+        snapshot = self.pairs.get(log.get("address", "").lower())
+        if snapshot is None or self._duplicate(log):
+            return
+        topics = log.get("topics", [])
+        data = log.get("data", "0x")[2:]
+        if topics and topics[0] == SYNC_TOPIC and len(data) >= 128:
+            snapshot.reserve0 = int(data[0:64], 16)
+            snapshot.reserve1 = int(data[64:128], 16)
+            snapshot.block = int(log.get("blockNumber", "0x0"), 16)
+            snapshot.updated_at = time.monotonic()
+            logger.debug(
+                "[Sync] %s %s 储备: %s / %s 区块: %s",
+                snapshot.label,
+                snapshot.pair,
+                snapshot.reserve0,
+                snapshot.reserve1,
+                snapshot.block,
+            )
+            if self.on_update is not None:
+                self.on_update(snapshot)
+        elif topics and topics[0] == SWAP_TOPIC:
+            snapshot.swaps += 1
+
+    def _duplicate(self, log):
+        key = (log.get("transactionHash"), log.get("logIndex"))
+        if key[0] is None:
+            return False
+        if key in self._seen:
+            return True
+        self._seen[key] = True
+        if len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def _expire(self, now):
+        expired = [key for key, s in self.pairs.items() if s.expires_at <= now]
+        for key in expired:
+            snapshot = self.pairs.pop(key)
+            logger.info(
+                f"停止跟踪交易对 Sync/Swap: {snapshot.label} {snapshot.pair} (共 {snapshot.swaps} 笔 Swap)"
+            )
+        if expired:
+            self._dirty = True
+
+    async def _resubscribe(self):
+        rpc = self.rpc
+        old_id = self.subscription_id
+        new_id = None
+        if self.pairs:
+            filter_params = {
+                "address": [s.pair for s in self.pairs.values()],
+                "topics": [[SYNC_TOPIC, SWAP_TOPIC]],
+            }
+            new_id = await rpc.call("eth_subscribe", ["logs", filter_params])
+            self._subscription_ids.add(new_id)
+        self.subscription_id = new_id
+        self._dirty = False
+        if old_id is not None:
+            try:
+                await rpc.call("eth_unsubscribe", [old_id])
+            except Exception as e:
+                logger.debug(f"取消旧 Sync/Swap 订阅失败: {e}")
+            finally:
+                # 取消完成前旧订阅仍可能推送，期间照常处理
+                self._subscription_ids.discard(old_id)
+        logger.info(f"Sync/Swap 订阅已更新，当前跟踪 {len(self.pairs)} 个交易对")
+
+    async def run(self):
+        """后台循环：移出过期交易对，并把集合变化合并成一次重订阅"""
+        while True:
+            await asyncio.sleep(self.update_interval)
+            self._expire(time.monotonic())
+            if self._dirty and self.rpc is not None:
+                try:
+                    await self._resubscribe()
+                except Exception as e:
+                    # 连接断开时等待 attach 到新连接后再订阅
+                    self._dirty = True
+                    logger.warning(f"Sync/Swap 订阅更新失败: {e}")
@@ -1,32 +1,77 @@
 import asyncio
-import websockets
-import json
 import logging
-import aiohttp
+import functools
 import os
-
-# 配置日志系统
-chinese_time_format = "%Y年%m月%d日%H时%M分%S秒"
-log_format = "[%(levelname)s] %(asctime)s [%(name)s]：%(message)s"
-logging.basicConfig(
-    format=log_format, level=logging.INFO, datefmt=chinese_time_format, force=True
+import time
+from enrich import Enricher
+from logsetup import setup_logging
+from pairstream import PairStream
+from pricing import get_pair_snapshot
+from market import STALE_MARK, get_token_market_cap, get_token_metadata
+from rules import RuleEngine
+from runtime import make_runtime
+from telegram_bot import TelegramBot
+from templates import (
+    BUY_KEYBOARD,
+    PANCAKE_AXIOM_LINK,
+    PANCAKE_LIQUIDITY_LINE,
+    PANCAKE_MARKET_CAP_CROSSED,
+    PANCAKE_MARKET_CAP_UPDATE,
+    PANCAKE_PAIR_CREATED,
 )
-logging.getLogger("telethon").setLevel(logging.WARNING)
+from watcher import MarketCapWatcher
+
+# 配置日志系统，见 logsetup.py
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Telegram配置
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
-blacklist = [
-    "0xBB4CDB9CBD36B01BD1CBAEBF2DE08D9173BC095C",  # wbnb
-    "0x000ae314e2a2172a039b26378814c252734f556a",  # aster
-    "0x55d398326f99059ff775485246999027b3197955",  # usdt
-    "0x8d0d000ee44948fc98c9b98a4fa4921476f08b0d",  # usd1
-    "0xce24439f2d9c6a2289f741120fe202248b666666",  # u
-    "0x0782b6d8c4551b9760e74c0545a9bcd90bdc41e5",  # lisusd
+telegram = TelegramBot(
+    TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, disable_web_page_preview=False
+)
+
+# 连接和事件输出（含链路追踪），配置见 runtime.py
+runtime = make_runtime()
+dispatcher = runtime.dispatcher
+
+# 推送后市值跟踪：市值突破门槛（美元，逗号分隔，留空关闭）时再推送一次
+MARKET_CAP_WATCH_THRESHOLDS = [
+    float(v)
+    for v in os.getenv(
+        "MARKET_CAP_WATCH_THRESHOLDS", "5000000,10000000,50000000"
+    ).split(",")
+    if v.strip()
 ]
-# 自动将所有黑名单地址转换为大写，实现不区分大小写的匹配
-blacklist = [addr.upper() for addr in blacklist]
+MARKET_CAP_WATCH_BUDGET = int(os.getenv("MARKET_CAP_WATCH_BUDGET", "60"))
+# 突破门槛时的提醒方式：edit 编辑原推送消息（失败时再发新消息），send 总是发新消息
+MARKET_CAP_UPDATE_MODE = os.getenv("MARKET_CAP_UPDATE_MODE", "edit")
+
+# 推送后通过 Sync/Swap 事件实时跟踪交易对储备（PAIR_STREAM=1 开启），PAIR_STREAM_TTL 秒后停止
+PAIR_STREAM_ENABLED = os.getenv("PAIR_STREAM", "0") == "1"
+PAIR_STREAM_TTL = int(os.getenv("PAIR_STREAM_TTL", "1800"))
+
+# 市值来源：onchain 读取交易对储备计算（默认，早期版本为 binance），binance 使用
+# 币安API；推送后的市值跟踪使用同一来源
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "onchain")
+
+# 按需获取的字段：元数据和市值都来自币安API，只有规则或消息格式化用到时才去请求
+enricher = Enricher("pancake")
+
+# 推送消息需要的字段
+MESSAGE_FIELDS = (
+    "contract_address",
+    "contract_name",
+    "contract_symbol",
+    "contract_market_cap",
+    "paired_token_address",
+    "paired_token_name",
+    "paired_token_symbol",
+    "paired_market_cap",
+    "contract_market_cap_stale",
+    "paired_market_cap_stale",
+)
 
 
 def parse_pair_created_event(topics, data):
@@ -64,95 +109,34 @@ def parse_pair_created_event(topics, data):
         return None
 
 
-async def send_telegram_message(text, contract_address=None, chat_id=None):
-    """发送Telegram消息"""
-    try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": chat_id or TELEGRAM_CHAT_ID,
-            "text": text,
-            "parse_mode": "Markdown",
-        }
-
-        if contract_address:
-            payload["reply_markup"] = {
-                "inline_keyboard": [
-                    [
-                        {
-                            "text": "Avebot 立即购买",
-                            "url": f"https://t.me/AveSniperBot_01_bot?start={contract_address}-pikacyan",
-                        },
-                        {
-                            "text": "Bloom 立即购买",
-                            "url": f"https://t.me/BloomEVMbot?start=ref_AJ3IYD6EXI_ca_{contract_address}",
-                        },
-                        {
-                            "text": "GMGN 立即购买",
-                            "url": f"https://t.me/gmgn_bsc_bot?start=i_lZKIXD4b_c_{contract_address}",
-                        },
-                    ]
-                ]
-            }
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as resp:
-                if resp.status == 200:
-                    pass
-    except Exception as e:
-        logger.warning(f"Telegram发送失败: {e}")
-
-
-async def get_token_info(ws, token_address):
+async def get_token_info(rpc, token_address):
     """通过WebSocket获取代币信息（名称和符号）"""
     try:
         # ERC20的name()和symbol()函数选择器
         name_selector = "0x06fdde03"
         symbol_selector = "0x95d89b41"
 
-        # 获取name
-        name_payload = {
-            "jsonrpc": "2.0",
-            "id": 100,
-            "method": "eth_call",
-            "params": [{"to": token_address, "data": name_selector}, "latest"],
-        }
-        await ws.send(json.dumps(name_payload))
-        name_response = await ws.recv()
-        name_data = json.loads(name_response)
-
-        # 获取symbol
-        symbol_payload = {
-            "jsonrpc": "2.0",
-            "id": 101,
-            "method": "eth_call",
-            "params": [{"to": token_address, "data": symbol_selector}, "latest"],
-        }
-        await ws.send(json.dumps(symbol_payload))
-        symbol_response = await ws.recv()
-        symbol_data = json.loads(symbol_response)
+        name_result = await rpc.call(
+            "eth_call", [{"to": token_address, "data": name_selector}, "latest"]
+        )
+        symbol_result = await rpc.call(
+            "eth_call", [{"to": token_address, "data": symbol_selector}, "latest"]
+        )
 
         # 解析结果
         name = ""
         symbol = ""
 
-        if (
-            "result" in name_data
-            and name_data["result"]
-            and name_data["result"] != "0x"
-        ):
-            result = name_data["result"].replace("0x", "")
+        if name_result and name_result != "0x":
+            result = name_result.replace("0x", "")
             # 跳过前64字符（偏移量），然后读取长度
             if len(result) >= 128:
                 length = int(result[64:128], 16)
                 name_hex = result[128 : 128 + length * 2]
                 name = bytes.fromhex(name_hex).decode("utf-8", errors="ignore")
 
-        if (
-            "result" in symbol_data
-            and symbol_data["result"]
-            and symbol_data["result"] != "0x"
-        ):
-            result = symbol_data["result"].replace("0x", "")
+        if symbol_result and symbol_result != "0x":
+            result = symbol_result.replace("0x", "")
             if len(result) >= 128:
                 length = int(result[64:128], 16)
                 symbol_hex = result[128 : 128 + length * 2]
@@ -165,236 +149,340 @@ async def get_token_info(ws, token_address):
         return "", ""
 
 
-async def get_token_market_cap(token_address):
-    """通过币安API获取代币市值"""
-    try:
-        url = f"https://web3.binance.com/bapi/defi/v4/public/wallet-direct/buw/wallet/market/token/dynamic/info"
-        params = {"chainId": "56", "contractAddress": token_address}  # BSC链ID
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url, params=params, timeout=aiohttp.ClientTimeout(total=5)
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("success") and result.get("data"):
-                        market_cap = result["data"].get("marketCap")
-                        if market_cap:
-                            # 将字符串转换为浮点数
-                            return float(market_cap)
-                logger.warning(
-                    f"获取市值失败，token: {token_address}, 状态码: {resp.status}"
-                )
-                return 0
-    except Exception as e:
-        logger.warning(f"获取市值异常: {e}, token: {token_address}")
-        return 0
+def register_token_providers(token_key):
+    """为 token0 / token1 注册市值和元数据 provider"""
+    label = token_key.capitalize()
+
+    if PRICE_SOURCE == "binance":
+
+        @enricher.provider(
+            f"{token_key}_market_cap",
+            f"{token_key}_market_cap_stale",
+            cost=1,
+            name=f"{token_key}_market_cap",
+        )
+        async def fetch_market_cap(ctx):
+            market_cap, stale = await get_token_market_cap(ctx[token_key])
+            logger.info(
+                "%s市值: $%.2f%s", label, market_cap, STALE_MARK if stale else ""
+            )
+            return {
+                f"{token_key}_market_cap": market_cap,
+                f"{token_key}_market_cap_stale": stale,
+            }
+
+    @enricher.provider(
+        f"{token_key}_name", f"{token_key}_symbol", cost=1, name=f"{token_key}_metadata"
+    )
+    async def fetch_metadata(ctx):
+        # 获取代币信息，优先用API，失败则用区块链
+        name, symbol = await get_token_metadata(ctx[token_key]) or await get_token_info(
+            ctx.env["rpc"], ctx[token_key]
+        )
+        logger.info("%s信息: %s (%s)", label, name, symbol)
+        return {f"{token_key}_name": name, f"{token_key}_symbol": symbol}
+
+
+register_token_providers("token0")
+register_token_providers("token1")
+
+if PRICE_SOURCE == "onchain":
+
+    @enricher.provider(
+        "token0_market_cap",
+        "token0_market_cap_stale",
+        "token1_market_cap",
+        "token1_market_cap_stale",
+        "liquidity_usd",
+        cost=1,
+    )
+    async def fetch_onchain_pricing(ctx):
+        """一次 multicall 读取交易对储备，在事件所在区块上计算两个代币的市值"""
+        try:
+            snapshot = await get_pair_snapshot(
+                ctx.env["rpc"], ctx["pair"], ctx["token0"], ctx["token1"], ctx["block"]
+            )
+        except Exception as e:
+            logger.warning(f"链上定价失败: {e}, pair: {ctx['pair']}")
+            snapshot = {}
+
+        fields = {"liquidity_usd": snapshot.get("liquidity_usd")}
+        for token_key in ("token0", "token1"):
+            market_cap = snapshot.get(f"{token_key}_market_cap")
+            stale = False
+            if market_cap is None:
+                # 链上无法定价（没有 WBNB / 稳定币路径）时回退到币安API
+                market_cap, stale = await get_token_market_cap(ctx[token_key])
+            fields[f"{token_key}_market_cap"] = market_cap
+            fields[f"{token_key}_market_cap_stale"] = stale
+            logger.info(
+                "%s市值: $%.2f%s",
+                token_key.capitalize(),
+                market_cap,
+                STALE_MARK if stale else "",
+            )
+        return fields
+
+
+@enricher.provider(
+    "contract_address",
+    "contract_name",
+    "contract_symbol",
+    "contract_market_cap",
+    "contract_market_cap_stale",
+    "paired_token_address",
+    "paired_token_name",
+    "paired_token_symbol",
+    "paired_market_cap",
+    "paired_market_cap_stale",
+    cost=0,
+    requires=(
+        "token0_market_cap",
+        "token1_market_cap",
+        "token0_name",
+        "token1_name",
+    ),
+)
+async def select_contract_token(ctx):
+    """选择市值较小的token作为合约地址"""
+    if ctx["token0_market_cap"] <= ctx["token1_market_cap"]:
+        contract_key, paired_key = "token0", "token1"
+    else:
+        contract_key, paired_key = "token1", "token0"
+
+    fields = {
+        "contract_address": ctx[contract_key],
+        "contract_name": ctx[f"{contract_key}_name"] or "Unknown",
+        "contract_symbol": ctx[f"{contract_key}_symbol"] or "?",
+        "contract_market_cap": ctx[f"{contract_key}_market_cap"],
+        "contract_market_cap_stale": ctx[f"{contract_key}_market_cap_stale"],
+        "paired_token_address": ctx[paired_key],
+        "paired_token_name": ctx[f"{paired_key}_name"] or "Unknown",
+        "paired_token_symbol": ctx[f"{paired_key}_symbol"] or "?",
+        "paired_market_cap": ctx[f"{paired_key}_market_cap"],
+        "paired_market_cap_stale": ctx[f"{paired_key}_market_cap_stale"],
+    }
+    logger.info(
+        "选择市值较小的Token作为合约地址: %s (市值: $%.2f)",
+        fields["contract_address"],
+        fields["contract_market_cap"],
+    )
+    return fields
 
 
-async def get_token_metadata(token_address):
-    """通过币安API获取代币元数据，返回(name, symbol)或("", "")"""
+rule_engine = RuleEngine(
+    os.getenv("RULES_FILE", "rules.json"), "pancake", cost=enricher.cost_of
+)
+
+
+async def send_pair_created(values):
+    """渲染并发送交易对创建消息"""
+    address = values["address"]
+    # 检查是否需要添加 Axiom 链接
+    axiom_link = ""
+    if address.lower().startswith("0x4444") or address.lower().endswith("4444"):
+        axiom_link = PANCAKE_AXIOM_LINK.render(values)
+
+    liquidity_line = (
+        PANCAKE_LIQUIDITY_LINE.render(values) if values["liquidity_usd"] else ""
+    )
+
+    text = PANCAKE_PAIR_CREATED.render(
+        dict(
+            values,
+            market_cap_stale=STALE_MARK if values["market_cap_stale"] else "",
+            paired_market_cap_stale=(
+                STALE_MARK if values["paired_market_cap_stale"] else ""
+            ),
+            liquidity_line=liquidity_line,
+            axiom_link=axiom_link,
+        )
+    )
+    # 记录 message_id，之后市值突破门槛时直接编辑这条消息
+    await telegram.send(
+        text, reply_markup=BUY_KEYBOARD.render(values), key=address.lower()
+    )
+
+
+async def handle_pair_created(rpc, event_result):
+    """处理单个 PairCreated 事件：过滤、按需补齐字段并推送"""
+    logger.info(
+        "🎉 收到新的 PairCreated 事件", extra={"sample": "pair_created_received"}
+    )
+    # 解析事件数据
+    topics = event_result.get("topics", [])
+    event_data = event_result.get("data", "")
+
+    if len(topics) < 3:
+        logger.warning(f"topics数量不足: {len(topics)}")
+        return
+
+    event_info = parse_pair_created_event(topics, event_data)
+    if not event_info:
+        return
+    logger.info(
+        "[交易对创建] Token0: %s | Token1: %s | Pair: %s | Index: %s",
+        event_info["token0"],
+        event_info["token1"],
+        event_info["pair"],
+        event_info["pairIndex"],
+    )
+
+    # 过滤规则：市值、元数据只在规则需要时才去获取
+    ctx = enricher.context(event_info, rpc=rpc)
+    ctx["block"] = event_result.get("blockNumber", "latest")
     try:
-        url = f"https://web3.binance.com/bapi/defi/v1/public/wallet-direct/buw/wallet/dex/market/token/meta/info"
-        params = {"chainId": "56", "contractAddress": token_address}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url, params=params, timeout=aiohttp.ClientTimeout(total=5)
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("success") and result.get("data"):
-                        data = result["data"]
-                        return data.get("name", ""), data.get("symbol", "")
-                return "", ""
-    except Exception as e:
-        return "", ""
+        rule = await rule_engine.evaluate(ctx, enricher.resolve)
+        if rule:
+            logger.info(
+                "命中规则 %s: %s (%s / %s)",
+                rule.name,
+                rule.message,
+                event_info["token0"],
+                event_info["token1"],
+                extra={"sample": f"rule:{rule.name}"},
+            )
+            return
+
+        await enricher.require(ctx, MESSAGE_FIELDS)
+    finally:
+        enricher.finish(ctx)
+
+    contract_address = ctx["contract_address"]
+
+    # 获取交易哈希
+    tx_hash = event_result.get("transactionHash", "")
+
+    # 结构化事件先发出，Telegram 消息在 Telegram sink 中渲染
+    values = {
+        "name": ctx["contract_name"],
+        "symbol": ctx["contract_symbol"],
+        "address": contract_address,
+        "market_cap": ctx["contract_market_cap"],
+        "market_cap_stale": ctx["contract_market_cap_stale"],
+        "paired_name": ctx["paired_token_name"],
+        "paired_symbol": ctx["paired_token_symbol"],
+        "paired_address": ctx["paired_token_address"],
+        "paired_market_cap": ctx["paired_market_cap"],
+        "paired_market_cap_stale": ctx["paired_market_cap_stale"],
+        "liquidity_usd": ctx.get("liquidity_usd"),
+        "pair": event_info["pair"],
+        "tx_hash": tx_hash,
+    }
+    dispatcher.publish(
+        "pancake_pair_created",
+        dict(event_info, block=ctx["block"], **values),
+        functools.partial(send_pair_created, values),
+    )
+
+    # 推送后实时跟踪交易对的 Sync/Swap
+    if pair_stream:
+        pair_stream.add(event_info["pair"], ctx["contract_symbol"])
+
+    # 推送后继续跟踪市值，突破门槛时再提醒
+    market_cap_watcher.track(
+        contract_address,
+        ctx["contract_name"],
+        ctx["contract_symbol"],
+        ctx["contract_market_cap"],
+        pair=event_info["pair"],
+        token0=event_info["token0"],
+        token1=event_info["token1"],
+    )
+
+
+async def send_market_cap_crossed(values):
+    """更新原推送消息，无法编辑时发送新消息"""
+    key = values["address"].lower()
+    sent = telegram.get_sent(key)
+    if MARKET_CAP_UPDATE_MODE == "edit" and sent:
+        text = sent.text + PANCAKE_MARKET_CAP_UPDATE.render(values)
+        if await telegram.edit(key, text):
+            return
+    await telegram.send(
+        PANCAKE_MARKET_CAP_CROSSED.render(values),
+        reply_markup=BUY_KEYBOARD.render(values),
+    )
+
+
+async def notify_market_cap_crossed(token, threshold, market_info):
+    """推送过的代币市值突破门槛"""
+    values = {
+        "threshold": threshold,
+        "name": token.name,
+        "symbol": token.symbol,
+        "address": token.address,
+        "market_cap": market_info["marketCap"],
+        "initial_market_cap": token.initial_market_cap,
+        "minutes": (time.monotonic() - token.added_at) / 60,
+        "pair": token.extra["pair"],
+    }
+    dispatcher.publish(
+        "pancake_market_cap_crossed",
+        dict(values, market_info=market_info),
+        functools.partial(send_market_cap_crossed, values),
+    )
+
+
+def publish_pair_reserves(snapshot):
+    """交易对储备更新，只作为结构化事件发布，不发 Telegram"""
+    dispatcher.publish("pancake_pair_reserves", snapshot.to_dict())
+
+
+pair_stream = (
+    PairStream(ttl=PAIR_STREAM_TTL, on_update=publish_pair_reserves)
+    if PAIR_STREAM_ENABLED
+    else None
+)
 
 
-async def subscribe_pancakeswap_pair_created():
+async def fetch_onchain_market_info(token):
     """
-    连接到 BSC 主网 WebSocket，订阅 PancakeSwap Factory 的 PairCreated 事件
+    市值跟踪的链上来源：按首次推送时的方式重新读取交易对并定价，无法定价时
+    同样回退到币安API，保证前后两次市值口径一致
     """
-    ws_url = ""
-    contract = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"  # PancakeSwap Factory
-    topic = "0x0d3648bd0f6ba80134a33ba9275ac585d9d315f0ad8355cddefde31afa28d0e9"  # PairCreated
-
-    subscribe_payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "eth_subscribe",
-        "params": ["logs", {"address": contract, "topics": [topic]}],
+    rpc = runtime.connection.rpc
+    if rpc is None:
+        return None
+    token0, token1 = token.extra["token0"], token.extra["token1"]
+    snapshot = await get_pair_snapshot(rpc, token.extra["pair"], token0, token1)
+    token_key = "token0" if token.address.lower() == token0.lower() else "token1"
+    market_cap = snapshot.get(f"{token_key}_market_cap")
+    if market_cap is None:
+        market_cap, stale = await get_token_market_cap(token.address)
+        return {"marketCap": market_cap, "stale": stale} if market_cap else None
+    return {
+        "marketCap": market_cap,
+        "stale": False,
+        "liquidity_usd": snapshot.get("liquidity_usd"),
     }
 
-    retry_delay = 5  # 重连延迟秒数
 
-    while True:
-        try:
-            async with websockets.connect(
-                ws_url, ping_interval=20, ping_timeout=10, close_timeout=10
-            ) as ws:
-                logger.info(f"已连接到 BSC 主网")
-
-                # 发送订阅请求
-                await ws.send(json.dumps(subscribe_payload))
-                logger.info(
-                    f"已订阅 PancakeSwap Factory 合约 {contract} 的 PairCreated 事件"
-                )
-
-                # 持续接收事件
-                while True:
-                    message = await ws.recv()
-                    data = json.loads(message)
-
-                    if "params" in data and "result" in data["params"]:
-                        event_result = data["params"]["result"]
-                        logger.info(f"🎉 收到新的 PairCreated 事件")
-
-                        # 解析事件数据
-                        topics = event_result.get("topics", [])
-                        event_data = event_result.get("data", "")
-
-                        if len(topics) >= 3:
-                            event_info = parse_pair_created_event(topics, event_data)
-                            if event_info:
-                                logger.info(
-                                    f"[交易对创建] Token0: {event_info['token0']} | Token1: {event_info['token1']} | Pair: {event_info['pair']} | Index: {event_info['pairIndex']}"
-                                )
-
-                                # 检查黑名单（不区分大小写）
-                                token0_upper = event_info["token0"].upper()
-                                token1_upper = event_info["token1"].upper()
-
-                                if (
-                                    token0_upper in blacklist
-                                    or token1_upper in blacklist
-                                ):
-                                    logger.info(
-                                        f"Token0或Token1在黑名单中，跳过: {event_info['token0']} / {event_info['token1']}"
-                                    )
-                                    continue
-
-                                # 检查市值
-                                token0_market_cap = await get_token_market_cap(
-                                    event_info["token0"]
-                                )
-                                token1_market_cap = await get_token_market_cap(
-                                    event_info["token1"]
-                                )
-
-                                logger.info(f"Token0市值: ${token0_market_cap:,.2f}")
-                                logger.info(f"Token1市值: ${token1_market_cap:,.2f}")
-
-                                # 如果两个token的市值都小于1M，则跳过
-                                MIN_MARKET_CAP = 1_000_000  # 1M
-                                if (
-                                    token0_market_cap < MIN_MARKET_CAP
-                                    and token1_market_cap < MIN_MARKET_CAP
-                                ):
-                                    logger.info(
-                                        f"两个token市值都小于1M，跳过: Token0=${token0_market_cap:,.2f}, Token1=${token1_market_cap:,.2f}"
-                                    )
-                                    continue
-
-                                # 获取代币信息，优先用API，失败则用区块链
-                                token0_name, token0_symbol = await get_token_metadata(
-                                    event_info["token0"]
-                                ) or await get_token_info(ws, event_info["token0"])
-                                token1_name, token1_symbol = await get_token_metadata(
-                                    event_info["token1"]
-                                ) or await get_token_info(ws, event_info["token1"])
-
-                                logger.info(
-                                    f"Token0信息: {token0_name} ({token0_symbol})"
-                                )
-                                logger.info(
-                                    f"Token1信息: {token1_name} ({token1_symbol})"
-                                )
-
-                                # 选择市值较小的token作为合约地址
-                                if token0_market_cap <= token1_market_cap:
-                                    contract_address = event_info["token0"]
-                                    contract_name = token0_name or "Unknown"
-                                    contract_symbol = token0_symbol or "?"
-                                    paired_token_address = event_info["token1"]
-                                    paired_token_name = token1_name or "Unknown"
-                                    paired_token_symbol = token1_symbol or "?"
-                                    contract_market_cap = token0_market_cap
-                                    paired_market_cap = token1_market_cap
-                                else:
-                                    contract_address = event_info["token1"]
-                                    contract_name = token1_name or "Unknown"
-                                    contract_symbol = token1_symbol or "?"
-                                    paired_token_address = event_info["token0"]
-                                    paired_token_name = token0_name or "Unknown"
-                                    paired_token_symbol = token0_symbol or "?"
-                                    contract_market_cap = token1_market_cap
-                                    paired_market_cap = token0_market_cap
-
-                                logger.info(
-                                    f"选择市值较小的Token作为合约地址: {contract_address} (市值: ${contract_market_cap:,.2f})"
-                                )
-
-                                # 检查token的name或symbol是否以dog结尾
-                                if not (
-                                    contract_name.lower().endswith("dog")
-                                    or contract_symbol.lower().endswith("dog")
-                                ):
-                                    logger.info(
-                                        f"Token的name或symbol不以dog结尾，跳过: {contract_address}"
-                                    )
-                                    continue
-
-                                # 获取交易哈希
-                                tx_hash = event_result.get("transactionHash", "")
-
-                                # 构建交易平台链接 - 参考 simple.py 的格式
-                                # 检查是否需要添加 Axiom 链接
-                                axiom_link = ""
-                                if contract_address.lower().startswith(
-                                    "0x4444"
-                                ) or contract_address.lower().endswith("4444"):
-                                    axiom_link = f"[Axiom链接](https://axiom.trade/meme/{contract_address}?chain=bnb) | "
-
-                                # 构建完整的链接字符串
-                                platform_links = (
-                                    f"[Avebot链接](https://pro.ave.ai/token/{contract_address}-bsc?lang=zh-cn&code=pikacyan) | "
-                                    f"{axiom_link}"
-                                    f"[Binance Web3](https://web3.binance.com/zh-CN/token/bsc/{contract_address}?ref=ER50PYNM) | "
-                                    f"[GMGN链接](https://gmgn.ai/bsc/token/CHENGZI_{contract_address}) | "
-                                    f"[OKX Web3](https://web3.okx.com/zh-hans/token/bsc/{contract_address})"
-                                )
-
-                                # 构建Telegram消息 - 格式类似app.py
-                                msg = (
-                                    f"🥞 *PancakeSwap新交易对创建*\n\n"
-                                    f"📛 *代币名称:* {contract_name}\n"
-                                    f"🔤 *代币符号:* {contract_symbol}\n"
-                                    f"📍 *代币地址:* `{contract_address}`\n\n"
-                                    f"💰 *市值:* ${contract_market_cap:,.2f}\n"
-                                    f"🔗 *交易对:* {paired_token_name} ({paired_token_symbol})\n"
-                                    f"📍 *配对地址:* `{paired_token_address}`\n"
-                                    f"💰 *配对市值:* ${paired_market_cap:,.2f}\n\n"
-                                    f"🔗 *交易对地址:* `{event_info['pair']}`\n"
-                                    f"🔗 *交易哈希:* [{tx_hash}](https://bscscan.com/tx/{tx_hash})\n\n"
-                                    f"🔗 *交易平台:*\n"
-                                    f"{platform_links}"
-                                )
-
-                                await send_telegram_message(msg, contract_address)
-                        else:
-                            logger.warning(f"topics数量不足: {len(topics)}")
-                    else:
-                        logger.debug(f"收到消息: {data}")
-
-        except websockets.exceptions.ConnectionClosed as e:
-            logger.warning(f"连接已关闭: {e}，{retry_delay}秒后重连...")
-            await asyncio.sleep(retry_delay)
-        except Exception as e:
-            logger.error(f"连接错误: {e}，{retry_delay}秒后重连...")
-            await asyncio.sleep(retry_delay)
+market_cap_watcher = MarketCapWatcher(
+    MARKET_CAP_WATCH_THRESHOLDS,
+    notify_market_cap_crossed,
+    fetch=fetch_onchain_market_info if PRICE_SOURCE == "onchain" else None,
+    requests_per_minute=MARKET_CAP_WATCH_BUDGET,
+)
+
+
+PANCAKE_FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+PAIR_CREATED_TOPIC = (
+    "0x0d3648bd0f6ba80134a33ba9275ac585d9d315f0ad8355cddefde31afa28d0e9"
+)
+
+runtime.log_router.on(PANCAKE_FACTORY, PAIR_CREATED_TOPIC, handle_pair_created)
+if pair_stream:
+    runtime.add_stream(pair_stream)
+    runtime.add_task(pair_stream.run)
+runtime.add_task(market_cap_watcher.run)
+runtime.add_task(rule_engine.run)
+
+
+async def main():
+    await runtime.run()
 
 
 if __name__ == "__main__":
-    # 订阅 PancakeSwap PairCreated 事件
-    asyncio.run(subscribe_pancakeswap_pair_created())
+    # 订阅 PancakeSwap PairCreated 事件，并在后台跟踪推送过的代币市值
+    asyncio.run(main())
@@ -0,0 +1,204 @@
+"""
+PancakeSwap V2 链上定价
+
+直接读取交易对的 getReserves()、token0() 以及代币的 decimals()、totalSupply()，
+所有读取打包进一次 Multicall3 aggregate3 调用，并在事件所在区块上执行，得到
+区块精确的价格、市值和流动性。
+
+BNB 的美元价格来自 WBNB/USDT 参考池，按区块缓存。交易对两边都不是 WBNB 或
+稳定币时，通过 factory.getPair(token, WBNB) 找到代币自己的 WBNB 池再定价
+（第二次 multicall）。
+"""
+
+import logging
+from collections import OrderedDict
+
+from abi import decode_aggregate3, encode_address, encode_aggregate3
+
+logger = logging.getLogger(__name__)
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+PANCAKE_FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+WBNB = "0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c"
+USDT = "0x55d398326f99059ff775485246999027b3197955"
+WBNB_USDT_PAIR = "0x16b9a82891338f9ba80e2d6970fdda79d1eb0dae"
+# 按 1 美元计价的稳定币
+STABLECOINS = {
+    USDT,
+    "0xe9e7cea3dedca5984780bafc599bd69add087d56",  # busd
+    "0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d",  # usdc
+    "0x8d0d000ee44948fc98c9b98a4fa4921476f08b0d",  # usd1
+}
+ZERO_ADDRESS = "0x" + "0" * 40
+
+AGGREGATE3 = bytes.fromhex("82ad56cb")
+GET_RESERVES = bytes.fromhex("0902f1ac")
+TOKEN0 = bytes.fromhex("0dfe1681")
+DECIMALS = bytes.fromhex("313ce567")
+TOTAL_SUPPLY = bytes.fromhex("18160ddd")
+GET_PAIR = bytes.fromhex("e6a43905")
+
+# 区块号 -> BNB 美元价格
+_bnb_price_cache = OrderedDict()
+BNB_PRICE_CACHE_SIZE = 64
+
+
+async def multicall(rpc, calls, block="latest"):
+    """
+    通过 Multicall3 aggregate3 批量 eth_call
+
+    calls: [(目标地址, calldata bytes)]，返回与之对应的 returnData 列表，单个调用失败时为 None
+    """
+    data = AGGREGATE3 + encode_aggregate3(calls)
+    result = await rpc.call(
+        "eth_call", [{"to": MULTICALL3, "data": "0x" + data.hex()}, block]
+    )
+    returned = decode_aggregate3(bytes.fromhex(result[2:]))
+    return [data if ok and data else None for ok, data in returned]
+
+
+def _uint(data):
+    return int.from_bytes(data[:32], "big") if data else None
+
+
+def _address(data):
+    return "0x" + data[12:32].hex() if data else None
+
+
+def _reserves(data):
+    """getReserves() -> (reserve0, reserve1)"""
+    if not data or len(data) < 64:
+        return None
+    return _uint(data[0:32]), _uint(data[32:64])
+
+
+def _price_from_pool(
+    token, reserves, pool_token0, other_price, token_decimals, other_decimals
+):
+    """用池子储备计算 token 的美元价格：other_price 为池子另一边代币的美元价格"""
+    if (
+        not reserves
+        or other_price is None
+        or token_decimals is None
+        or other_decimals is None
+    ):
+        return None
+    if token.lower() == pool_token0.lower():
+        token_reserve, other_reserve = reserves
+    else:
+        other_reserve, token_reserve = reserves
+    if not token_reserve:
+        return None
+    return (
+        (other_reserve / 10**other_decimals)
+        * other_price
+        / (token_reserve / 10**token_decimals)
+    )
+
+
+def _known_price(token, bnb_price):
+    token = token.lower()
+    if token in STABLECOINS:
+        return 1.0
+    if token == WBNB:
+        return bnb_price
+    return None
+
+
+async def get_pair_snapshot(rpc, pair, token0, token1, block="latest"):
+    """
+    读取交易对在指定区块的储备并定价
+
+    返回 {"token0_price", "token1_price", "token0_market_cap", "token1_market_cap",
+    "liquidity_usd", "block"}，无法定价的字段为 None
+    """
+    tokens = (token0, token1)
+    calls = [
+        (pair, GET_RESERVES),
+        (pair, TOKEN0),
+        (token0, DECIMALS),
+        (token1, DECIMALS),
+        (token0, TOTAL_SUPPLY),
+        (token1, TOTAL_SUPPLY),
+    ]
+    bnb_price = _bnb_price_cache.get(block) if block != "latest" else None
+    if bnb_price is None:
+        calls.append((WBNB_USDT_PAIR, GET_RESERVES))
+    # 两边都不是 WBNB / 稳定币时，顺便查出各自的 WBNB 池
+    need_route = all(_known_price(t, 1.0) is None for t in tokens)
+    if need_route:
+        calls += [
+            (PANCAKE_FACTORY, GET_PAIR + encode_address(t) + encode_address(WBNB))
+            for t in tokens
+        ]
+
+    results = await multicall(rpc, calls, block)
+    reserves = _reserves(results[0])
+    pool_token0 = _address(results[1]) or token0
+    decimals = [_uint(results[2]), _uint(results[3])]
+    supplies = [_uint(results[4]), _uint(results[5])]
+
+    if bnb_price is None:
+        ref = _reserves(results[6])
+        # USDT 地址更小，是参考池的 token0，两者都是 18 位小数
+        bnb_price = ref[0] / ref[1] if ref and ref[1] else None
+        if bnb_price is not None and block != "latest":
+            _bnb_price_cache[block] = bnb_price
+            if len(_bnb_price_cache) > BNB_PRICE_CACHE_SIZE:
+                _bnb_price_cache.popitem(last=False)
+
+    prices = [_known_price(t, bnb_price) for t in tokens]
+
+    if need_route:
+        routes = [_address(r) for r in results[-2:]]
+        route_calls = []
+        for route in routes:
+            if route and route != ZERO_ADDRESS:
+                route_calls += [(route, GET_RESERVES), (route, TOKEN0)]
+        route_results = await multicall(rpc, route_calls, block) if route_calls else []
+        for i, route in enumerate(routes):
+            if not route or route == ZERO_ADDRESS:
+                continue
+            route_reserves = _reserves(route_results.pop(0))
+            route_token0 = _address(route_results.pop(0)) or tokens[i]
+            prices[i] = _price_from_pool(
+                tokens[i], route_reserves, route_token0, bnb_price, decimals[i], 18
+            )
+
+    # 一边有价格时，用本交易对的储备给另一边定价
+    for i, j in ((0, 1), (1, 0)):
+        if prices[i] is None and prices[j] is not None:
+            prices[i] = _price_from_pool(
+                tokens[i], reserves, pool_token0, prices[j], decimals[i], decimals[j]
+            )
+
+    market_caps = [
+        (
+            prices[i] * supplies[i] / 10 ** decimals[i]
+            if prices[i] is not None
+            and supplies[i] is not None
+            and decimals[i] is not None
+            else None
+        )
+        for i in (0, 1)
+    ]
+
+    liquidity = None
+    if reserves and None not in decimals:
+        if pool_token0.lower() == token0.lower():
+            amounts = (reserves[0] / 10 ** decimals[0], reserves[1] / 10 ** decimals[1])
+        else:
+            amounts = (reserves[1] / 10 ** decimals[0], reserves[0] / 10 ** decimals[1])
+        sides = [a * p for a, p in zip(amounts, prices) if p is not None]
+        if sides:
+            # 恒定乘积池两边价值相等
+            liquidity = max(sides) * 2
+
+    return {
+        "token0_price": prices[0],
+        "token1_price": prices[1],
+        "token0_market_cap": market_caps[0],
+        "token1_market_cap": market_caps[1],
+        "liquidity_usd": liquidity,
+        "block": block,
+    }
@@ -0,0 +1,171 @@
+"""
+本地 WebSocket 推送服务
+
+作为一个 sink 挂在 Dispatcher 上（SINKS 中配置 ws://0.0.0.0:8765），事件发布时
+直接放进各个客户端的缓冲区，不经过 Telegram，也不等待任何网络发送。
+
+客户端连接后默认接收全部事件，可以发送订阅消息在服务端过滤：
+    {"subscribe": {"types": ["pancake_pair_created"],
+                   "addresses": ["0x..."],
+                   "rule": {"field": "liquidity_usd", "op": "ge", "value": 10000}}}
+types 匹配事件类型；addresses 匹配事件顶层任一地址字段；rule 与 rules.json
+中的 when 写法相同。三者同时给出时需全部满足，发送 {"subscribe": {}} 恢复接收全部。
+
+每个客户端的缓冲区有上限，写满说明客户端读得太慢，直接断开该客户端，
+不会阻塞链上事件的读取和其他客户端。
+"""
+
+import asyncio
+import json
+import logging
+from urllib.parse import urlparse
+
+import websockets
+
+from addrset import address_key
+from rules import compile_predicate
+from sinks import Sink
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    __slots__ = ("types", "addresses", "rule")
+
+    def __init__(self, spec):
+        self.types = frozenset(spec.get("types") or ()) or None
+        addresses = spec.get("addresses") or ()
+        keys = {address_key(address) for address in addresses}
+        if None in keys:
+            raise ValueError("addresses 中有不合法的地址")
+        self.addresses = frozenset(keys) or None
+        self.rule = compile_predicate(spec["rule"])[0] if spec.get("rule") else None
+
+    def matches(self, event, addresses, ctx):
+        if self.types is not None and event.type not in self.types:
+            return False
+        if self.addresses is not None and self.addresses.isdisjoint(addresses):
+            return False
+        if self.rule is not None:
+            try:
+                return bool(self.rule(ctx))
+            except (KeyError, TypeError, AttributeError):
+                return False
+        return True
+
+
+ALL = Subscription({})
+
+
+class Client:
+    __slots__ = ("ws", "queue", "subscription", "sent")
+
+    def __init__(self, ws, buffer_size):
+        self.ws = ws
+        self.queue = asyncio.Queue(buffer_size)
+        self.subscription = ALL
+        self.sent = 0
+
+
+class PushServer(Sink):
+    """
+    buffer_size: 每个客户端最多缓冲的事件数，超出后断开该客户端
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, buffer_size=256):
+        super().__init__(f"ws://{host}:{port}", queue_size=1)
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.clients = set()
+        self._serving = None
+
+    def submit(self, event):
+        if not self.clients:
+            return
+        # 事件中的地址和规则上下文每个事件只算一次，所有客户端共用
+        addresses = {
+            key for key in map(address_key, event.data.values()) if key is not None
+        }
+        ctx = dict(event.data, type=event.type)
+        message = None
+        for client in list(self.clients):
+            if not client.subscription.matches(event, addresses, ctx):
+                continue
+            if client.queue.full():
+                self._drop(client, "缓冲区已满")
+                continue
+            if message is None:
+                message = event.to_json()
+            client.queue.put_nowait(message)
+
+    def _drop(self, client, reason):
+        self.clients.discard(client)
+        self.dropped += 1
+        logger.warning(f"[推送服务] 断开客户端 {client.ws.remote_address}: {reason}")
+        asyncio.ensure_future(client.ws.close(1013, reason))
+
+    async def _send_loop(self, client):
+        try:
+            while True:
+                message = await client.queue.get()
+                await client.ws.send(message)
+                client.sent += 1
+                self.delivered += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _handle_messages(self, client):
+        async for message in client.ws:
+            try:
+                request = json.loads(message)
+                client.subscription = Subscription(request["subscribe"])
+                reply = {"subscribed": request["subscribe"]}
+            except Exception as e:
+                reply = {"error": f"订阅格式不正确: {e}"}
+            # 回复也走缓冲区，保证和事件的先后顺序
+            if client.queue.full():
+                self._drop(client, "缓冲区已满")
+                return
+            client.queue.put_nowait(json.dumps(reply, ensure_ascii=False))
+
+    async def _handler(self, ws):
+        client = Client(ws, self.buffer_size)
+        self.clients.add(client)
+        logger.info(
+            f"[推送服务] 客户端已连接: {ws.remote_address}，当前 {len(self.clients)} 个"
+        )
+        sender = asyncio.create_task(self._send_loop(client))
+        try:
+            await self._handle_messages(client)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            logger.info(
+                f"[推送服务] 客户端已断开: {ws.remote_address}，已推送 {client.sent} 个事件"
+            )
+
+    async def _serve(self):
+        async with websockets.serve(self._handler, self.host, self.port):
+            logger.info(f"[推送服务] 已在 ws://{self.host}:{self.port} 上监听")
+            await asyncio.Future()
+
+    async def run(self):
+        # 组合运行时多个 Dispatcher 共用同一个服务，只监听一次
+        if self._serving is None:
+            self._serving = asyncio.ensure_future(self._serve())
+        await asyncio.shield(self._serving)
+
+
+_servers = {}
+
+
+def get_push_server(url):
+    """按地址返回推送服务实例，同一地址在进程内只创建一个"""
+    parsed = urlparse(url)
+    key = (parsed.hostname, parsed.port or 8765)
+    if key not in _servers:
+        _servers[key] = PushServer(*key)
+    return _servers[key]
@@ -0,0 +1,158 @@
+"""
+基于 WebSocket 的 JSON-RPC 客户端
+
+同一条连接上既有订阅推送又有普通请求，由后台读循环统一接收：带 id 的响应
+交给对应请求的 future，订阅推送放进队列由 recv() 取出。这样请求和推送不会
+互相"抢"消息。
+
+订阅推送的 result 为 dict（如 logs）时附带 "_received"，即收到时的
+time.monotonic()，用于统计事件在队列中等待的时间。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+
+class RpcError(Exception):
+    """节点返回的 JSON-RPC 错误"""
+
+
+class RpcClient:
+    def __init__(self, ws, timeout=10):
+        self.ws = ws
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._notifications = asyncio.Queue()
+        self._closed = None
+        self._muted = {}
+        # 最近一次收到任何消息的时间，用于检测连接假死
+        self.last_message_at = time.monotonic()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            async for message in self.ws:
+                self.last_message_at = now = time.monotonic()
+                data = json.loads(message)
+                for item in data if isinstance(data, list) else (data,):
+                    future = self._pending.pop(item.get("id"), None)
+                    if future is not None:
+                        if not future.done():
+                            future.set_result(item)
+                        continue
+                    params = item.get("params") or {}
+                    subscription = params.get("subscription")
+                    if subscription in self._muted:
+                        callback = self._muted[subscription]
+                        if callback is not None:
+                            callback(params.get("result"))
+                        continue
+                    if isinstance(params.get("result"), dict):
+                        params["result"]["_received"] = now
+                    self._notifications.put_nowait(item)
+            self._closed = websockets.exceptions.ConnectionClosedOK(None, None)
+        except Exception as e:
+            self._closed = e
+        finally:
+            # close() 取消读循环时 CancelledError 不会进入上面的 except
+            if self._closed is None:
+                self._closed = ConnectionError("RPC 连接已关闭")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(self._closed)
+            self._pending.clear()
+            # 唤醒等待推送的 recv()
+            self._notifications.put_nowait(None)
+
+    def _check_closed(self):
+        if self._closed is not None:
+            raise self._closed
+
+    async def recv(self):
+        """取下一条订阅推送（或其他无人认领的消息），连接断开时抛出异常"""
+        data = await self._notifications.get()
+        if data is None:
+            self._notifications.put_nowait(None)
+            self._check_closed()
+        return data
+
+    async def recv_batch(self, limit=512):
+        """至少等到一条推送，再取走队列里已经到达的推送（最多 limit 条）"""
+        batch = [await self.recv()]
+        while len(batch) < limit and not self._notifications.empty():
+            data = self._notifications.get_nowait()
+            if data is None:
+                # 连接已断开：先处理已经取到的推送，下一次 recv() 再抛出异常
+                self._notifications.put_nowait(None)
+                break
+            batch.append(data)
+        return batch
+
+    def pending(self):
+        """队列中尚未取走的推送数"""
+        return self._notifications.qsize()
+
+    def _request(self, method, params):
+        request_id = next(self._ids)
+        payload = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        payload["params"] = params
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        return request_id, payload, future
+
+    async def call(self, method, params):
+        """发送单个请求并等待结果，节点返回错误时抛出 RpcError"""
+        self._check_closed()
+        request_id, payload, future = self._request(method, params)
+        try:
+            await self.ws.send(json.dumps(payload))
+            response = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            raise RpcError(f"{method}: {response['error']}")
+        return response.get("result")
+
+    async def call_batch(self, requests):
+        """
+        把多个 (method, params) 作为一个 JSON-RPC 批量请求发出，按顺序返回结果；
+        单个请求出错时对应位置为 RpcError 实例，不影响其他请求
+        """
+        self._check_closed()
+        if not requests:
+            return []
+        entries = [self._request(method, params) for method, params in requests]
+        try:
+            await self.ws.send(json.dumps([payload for _, payload, _ in entries]))
+            responses = await asyncio.wait_for(
+                asyncio.gather(*(future for _, _, future in entries)), self.timeout
+            )
+        finally:
+            for request_id, _, _ in entries:
+                self._pending.pop(request_id, None)
+        return [
+            (
+                RpcError(f"{method}: {response['error']}")
+                if "error" in response
+                else response.get("result")
+            )
+            for (method, _), response in zip(requests, responses)
+        ]
+
+    def mute(self, subscription_id, callback=None):
+        """
+        该订阅的推送只用来刷新 last_message_at，不进入 recv() 队列（如心跳用的 newHeads）；
+        给出 callback 时在读循环中直接以推送的 result 调用
+        """
+        self._muted[subscription_id] = callback
+
+    async def close(self):
+        self._reader.cancel()
@@ -0,0 +1,287 @@
+"""
+声明式过滤规则引擎
+
+规则文件为 JSON，按监控脚本分节，每节是一组"命中即跳过"的规则：
+{
+  "pancake": [
+    {
+      "name": "min_market_cap",
+      "message": "两个token市值都小于1M，跳过",
+      "when": {"all": [
+        {"field": "token0_market_cap", "op": "lt", "value": 1000000},
+        {"field": "token1_market_cap", "op": "lt", "value": 1000000}
+      ]}
+    }
+  ]
+}
+
+谓词写法：
+- 叶子谓词：{"field": 字段名, "op": 运算符, "value": 值, "ignore_case": 可选}
+- 组合谓词：{"all": [...]} / {"any": [...]} / {"not": {...}}
+
+运算符：eq ne lt le gt ge in not_in startswith endswith contains
+以及比较两个字段的 eq_field / ne_field（value 为另一个字段名），
+和查询具名地址集合的 in_set / not_in_set（value 为集合名）。
+
+地址集合在规则文件顶层的 "address_sets" 中定义，见 addrset.py：
+"address_sets": {"blacklist": {"files": ["lists/blacklist.txt"], "addresses": []}}
+
+规则在加载时编译成闭包。规则的代价是补齐它尚缺字段所需的 provider 代价之和
+（共用同一个 provider 的字段只算一次，见 Enricher.cost_of）：每次求值都先取
+当前代价最低的规则，前面的规则已经取到的字段不再计入。字段在谓词求值到需要
+它的叶子时才获取，all / any 的子谓词同样按代价从低到高求值，短路之后的字段
+不会被获取。run() 在后台定时检查规则文件和地址文件，修改后
+在线程中重新加载，求值时不做任何文件操作，也不需要重启 WebSocket 连接。
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from addrset import load_address_sets
+
+logger = logging.getLogger(__name__)
+
+
+def _norm(value, ignore_case):
+    if ignore_case and isinstance(value, str):
+        return value.lower()
+    return value
+
+
+def _compile_leaf(spec, sets):
+    """编译叶子谓词，返回 (test(ctx), 依赖字段元组)"""
+    field = spec["field"]
+    op = spec["op"]
+    ignore_case = spec.get("ignore_case", False)
+    value = spec.get("value")
+
+    if op in ("eq_field", "ne_field"):
+        other = value
+
+        def pair_test(ctx):
+            return _norm(ctx[field], ignore_case) == _norm(ctx[other], ignore_case)
+
+        if op == "eq_field":
+            return pair_test, (field, other)
+        return (lambda ctx: not pair_test(ctx)), (field, other)
+
+    if op in ("in_set", "not_in_set"):
+        if value not in sets:
+            raise ValueError(f"未定义的地址集合: {value}")
+        members = sets[value]
+        if op == "in_set":
+            return (lambda ctx: ctx[field] in members), (field,)
+        return (lambda ctx: ctx[field] not in members), (field,)
+
+    if op in ("in", "not_in"):
+        members = frozenset(_norm(v, ignore_case) for v in value)
+        if op == "in":
+            return (lambda ctx: _norm(ctx[field], ignore_case) in members), (field,)
+        return (lambda ctx: _norm(ctx[field], ignore_case) not in members), (field,)
+
+    value = _norm(value, ignore_case)
+    if op == "eq":
+        test = lambda v: v == value
+    elif op == "ne":
+        test = lambda v: v != value
+    elif op == "lt":
+        test = lambda v: v < value
+    elif op == "le":
+        test = lambda v: v <= value
+    elif op == "gt":
+        test = lambda v: v > value
+    elif op == "ge":
+        test = lambda v: v >= value
+    elif op == "startswith":
+        test = lambda v: v.startswith(value)
+    elif op == "endswith":
+        test = lambda v: v.endswith(value)
+    elif op == "contains":
+        test = lambda v: value in v
+    else:
+        raise ValueError(f"未知运算符: {op}")
+
+    return (lambda ctx: test(_norm(ctx[field], ignore_case))), (field,)
+
+
+def _compile(spec, sets):
+    """
+    编译谓词，返回 (test(ctx), check(ctx, resolver), 依赖字段元组)
+
+    test 假定字段都已在 ctx 中；check 为协程，求值到叶子时才通过 resolver 补齐
+    该叶子的字段，all / any 的子谓词按 resolver 给出的代价从低到高求值
+    """
+    if "all" in spec or "any" in spec:
+        combine = all if "all" in spec else any
+        # all 遇到 False、any 遇到 True 即可停止
+        stop = combine is any
+        parts = [_compile(p, sets) for p in spec.get("all", spec.get("any"))]
+        tests = [t for t, _, _ in parts]
+        # 保持字段在规则中出现的顺序
+        fields = tuple(dict.fromkeys(f for _, _, part in parts for f in part))
+
+        async def check(ctx, resolver):
+            # 稳定排序：同代价的子谓词保持规则中的顺序
+            for _, part_check, part_fields in sorted(
+                parts, key=lambda part: resolver.cost(part[2])
+            ):
+                if await part_check(ctx, resolver) is stop:
+                    return stop
+            return not stop
+
+        return (lambda ctx: combine(t(ctx) for t in tests)), check, fields
+    if "not" in spec:
+        inner, inner_check, fields = _compile(spec["not"], sets)
+
+        async def check(ctx, resolver):
+            return not await inner_check(ctx, resolver)
+
+        return (lambda ctx: not inner(ctx)), check, fields
+
+    test, fields = _compile_leaf(spec, sets)
+
+    async def check(ctx, resolver):
+        await resolver.need(fields)
+        return bool(test(ctx))
+
+    return test, check, fields
+
+
+def compile_predicate(spec, sets=None):
+    """编译谓词，返回 (test(ctx), 依赖字段元组)；sets 为可引用的具名地址集合"""
+    test, _, fields = _compile(spec, sets or {})
+    return test, fields
+
+
+class _Resolver:
+    """
+    单次求值中字段的代价和按需补齐
+
+    cost(fields, ctx): 补齐 ctx 中缺少的这些字段的代价；resolve(field, ctx): 补齐单个字段
+    """
+
+    __slots__ = ("ctx", "_resolve", "_cost")
+
+    def __init__(self, ctx, resolve, cost):
+        self.ctx = ctx
+        self._resolve = resolve
+        self._cost = cost
+
+    def cost(self, fields):
+        return self._cost(fields, self.ctx)
+
+    async def need(self, fields):
+        if self._resolve is None:
+            return
+        missing = [f for f in fields if f not in self.ctx]
+        for field in sorted(missing, key=lambda f: self._cost((f,), self.ctx)):
+            await self._resolve(field, self.ctx)
+
+
+def _zero_cost(fields, ctx):
+    return 0
+
+
+class Rule:
+    """编译后的单条规则"""
+
+    __slots__ = ("name", "message", "fields", "cost", "_test", "_check")
+
+    def __init__(self, spec, cost=_zero_cost, sets=None):
+        self.name = spec["name"]
+        self.message = spec.get("message", "")
+        self._test, self._check, self.fields = _compile(spec["when"], sets or {})
+        # 一个字段都还没有时的代价，决定加载后的初始顺序
+        self.cost = cost(self.fields, None)
+
+    def matches(self, ctx):
+        """字段都已在 ctx 中时直接求值"""
+        try:
+            return self._test(ctx)
+        except (KeyError, TypeError, AttributeError):
+            # 字段缺失或类型不符时视为未命中
+            return False
+
+    async def check(self, ctx, resolver):
+        """求值过程中按需补齐字段"""
+        try:
+            return await self._check(ctx, resolver)
+        except (KeyError, TypeError, AttributeError):
+            return False
+
+
+class RuleEngine:
+    """
+    加载并执行某个监控脚本的规则节
+
+    cost: cost(fields, ctx) 返回补齐 ctx 中缺少的这些字段的代价（如
+    Enricher.cost_of），ctx 为 None 表示一个字段都没有；缺省时所有字段代价为 0
+    """
+
+    def __init__(self, path, section, cost=None, reload_interval=1.0):
+        self.path = path
+        self.section = section
+        self.cost = cost or _zero_cost
+        self.reload_interval = reload_interval
+        self.rules = []
+        self.address_sets = {}
+        self._mtime = None
+        self._install(self._build())
+
+    def _mtime_ns(self):
+        return os.stat(self.path).st_mtime_ns
+
+    def _build(self):
+        """读取并编译规则文件（含其中的地址集合），返回 (mtime, 规则, 地址集合)"""
+        mtime = self._mtime_ns()
+        with open(self.path, encoding="utf-8") as f:
+            config = json.load(f)
+        address_sets = load_address_sets(
+            config.get("address_sets"), os.path.dirname(self.path) or "."
+        )
+        rules = [
+            Rule(spec, self.cost, address_sets) for spec in config.get(self.section, [])
+        ]
+        # 稳定排序：同代价的规则保持文件中的顺序
+        rules.sort(key=lambda r: r.cost)
+        return mtime, rules, address_sets
+
+    def _install(self, built):
+        self._mtime, self.rules, self.address_sets = built
+        logger.info(f"已加载 {self.section} 规则 {len(self.rules)} 条: {self.path}")
+
+    async def maybe_reload(self):
+        """规则文件或地址文件变化时在线程中重新加载，解析失败则保留旧数据"""
+        try:
+            if await asyncio.to_thread(self._mtime_ns) != self._mtime:
+                self._install(await asyncio.to_thread(self._build))
+                return
+        except Exception as e:
+            logger.error(f"规则重新加载失败，继续使用旧规则: {e}")
+        for address_set in self.address_sets.values():
+            await address_set.maybe_reload()
+
+    async def run(self):
+        """每 reload_interval 秒检查一次规则文件和地址文件"""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.maybe_reload()
+
+    async def evaluate(self, ctx, resolve=None):
+        """
+        按代价顺序求值规则，返回第一条命中的规则，全部未命中返回 None
+
+        ctx 中缺少的字段通过 resolve(field, ctx) 按需补齐，只有谓词求值到需要它的
+        叶子时才会获取；每条规则求值后按已有字段重新计算剩余规则的代价
+        """
+        resolver = _Resolver(ctx, resolve, self.cost)
+        remaining = list(self.rules)
+        while remaining:
+            # min 取第一个最小值，同代价的规则保持加载后的顺序
+            rule = min(remaining, key=lambda r: resolver.cost(r.fields))
+            remaining.remove(rule)
+            if await rule.check(ctx, resolver):
+                return rule
+        return None
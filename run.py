@@ -0,0 +1,27 @@
+"""
+在一个进程中组合运行多个监控脚本
+
+MONITORS 为逗号分隔的脚本名（默认 flap,four,pancake）。各脚本导入时只在共用的
+运行时（见 runtime.py）上登记处理函数、独立订阅和后台任务，这里只运行一次：
+一条连接、一个合并后的 logs 订阅、一个 newHeads 心跳和一组事件输出，客户端
+连接一次推送服务即可收到全部事件。
+"""
+
+import asyncio
+import importlib
+import os
+
+from runtime import make_runtime
+
+MONITORS = os.getenv("MONITORS", "flap,four,pancake")
+
+
+async def main():
+    for name in MONITORS.split(","):
+        if name.strip():
+            importlib.import_module(name.strip())
+    await make_runtime().run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
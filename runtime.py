@@ -0,0 +1,127 @@
+"""
+监控脚本共用的运行时
+
+WebSocket 连接、解码进程池、事件输出和链路追踪的配置各脚本完全相同，统一在
+这里从环境变量读取，各脚本不再各写一份。没有设置环境变量时使用这里的默认值。
+
+同一进程中 make_runtime() 总是返回同一个 Runtime：各脚本只在共用的
+log_router 上登记处理函数，并登记自己的独立订阅（如 PairStream）和后台任务。
+单独运行一个脚本和用 run.py 组合运行多个脚本时都只有一条连接、一个合并后的
+logs 订阅和一个 newHeads 心跳。
+"""
+
+import asyncio
+import logging
+import os
+
+import tracing
+from connection import ConnectionManager
+from decodepool import DecodePool
+from logsub import LogRouter
+from sinks import Dispatcher
+
+logger = logging.getLogger(__name__)
+
+# WebSocket 连接：BSC 主网 WebSocket 地址；WS_STANDBY=1 维持一条备用连接，断线后
+# 直接接管；超过 WS_STALL_TIMEOUT 秒没有任何消息（含 newHeads 心跳）时主动重连
+WS_URL = os.getenv("WS_URL", "")
+WS_STANDBY = os.getenv("WS_STANDBY", "0") == "1"
+WS_STALL_TIMEOUT = int(os.getenv("WS_STALL_TIMEOUT", "30"))
+
+# 解码进程池：待处理的推送堆积到 DECODE_THRESHOLD 条以上时，按 DECODE_CHUNK 条
+# 一批送进 DECODE_WORKERS 个子进程解码，0 表示始终在事件循环里解码
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "0"))
+DECODE_THRESHOLD = int(os.getenv("DECODE_THRESHOLD", "32"))
+DECODE_CHUNK = int(os.getenv("DECODE_CHUNK", "64"))
+
+# 事件输出，逗号分隔，见 sinks.py（如 "telegram,webhook:https://...,file:events.jsonl"）
+SINKS = os.getenv("SINKS", "telegram")
+
+# 链路追踪：TRACE_FOOTER=1 时在 Telegram 消息末尾附上各阶段耗时；
+# 总耗时超过 TRACE_SLOW_MS 毫秒的事件写入 TRACE_SLOW_FILE（0 表示不写）
+TRACE_FOOTER = os.getenv("TRACE_FOOTER", "0") == "1"
+TRACE_SLOW_MS = int(os.getenv("TRACE_SLOW_MS", "5000"))
+TRACE_SLOW_FILE = os.getenv("TRACE_SLOW_FILE", "slow_traces.jsonl")
+
+
+class Runtime:
+    """连接、日志路由、解码进程池和事件输出，以及各脚本登记的订阅和后台任务"""
+
+    def __init__(self, connection, decode_pool, dispatcher):
+        self.connection = connection
+        self.decode_pool = decode_pool
+        self.dispatcher = dispatcher
+        self.log_router = LogRouter()
+        self._streams = []
+        self._prefetchers = []
+        self._tasks = []
+
+    def add_stream(self, stream):
+        """
+        登记一个独立订阅：stream.attach(rpc) 在每条新连接上订阅，
+        stream.owns(订阅 id) 认领推送，stream.handle(result) 处理推送
+        """
+        self._streams.append(stream)
+
+    def add_prefetcher(self, prefetch):
+        """登记 prefetch(rpc, logs)，每批日志交给处理函数之前调用（如批量预取）"""
+        self._prefetchers.append(prefetch)
+
+    def add_task(self, run):
+        """登记后台任务，run() 为协程函数，在 run() 中与连接一起运行"""
+        self._tasks.append(run)
+
+    async def session(self, rpc):
+        """在新连接上订阅全部登记的事件，持续接收并分发推送"""
+        for stream in self._streams:
+            stream.attach(rpc)
+        await self.log_router.subscribe(rpc)
+
+        # 每次取走已经到达的全部推送，堆积时批量送进解码进程池
+        while True:
+            logs = []
+            for data in await rpc.recv_batch():
+                params = data.get("params") or {}
+                subscription = params.get("subscription")
+                stream = next((s for s in self._streams if s.owns(subscription)), None)
+                if stream is not None:
+                    stream.handle(params["result"])
+                elif self.log_router.owns(subscription) and "result" in params:
+                    logs.append(params["result"])
+                else:
+                    logger.debug("收到消息: %s", data)
+            if logs:
+                for prefetch in self._prefetchers:
+                    prefetch(rpc, logs)
+                await self.log_router.dispatch_batch(rpc, logs, self.decode_pool)
+
+    async def run(self):
+        await asyncio.gather(
+            self.connection.run(self.session),
+            self.dispatcher.run(),
+            *(run() for run in self._tasks),
+        )
+
+
+_runtime = None
+
+
+def make_runtime():
+    """返回本进程共用的运行时，第一次调用时按上面的配置创建并配置链路追踪"""
+    global _runtime
+    if _runtime is None:
+        tracing.configure(
+            footer=TRACE_FOOTER,
+            slow_threshold_ms=TRACE_SLOW_MS,
+            slow_path=TRACE_SLOW_FILE,
+        )
+        _runtime = Runtime(
+            ConnectionManager(
+                WS_URL, standby=WS_STANDBY, stall_timeout=WS_STALL_TIMEOUT
+            ),
+            DecodePool(
+                DECODE_WORKERS, threshold=DECODE_THRESHOLD, chunk_size=DECODE_CHUNK
+            ),
+            Dispatcher.from_spec(SINKS),
+        )
+    return _runtime
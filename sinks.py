@@ -0,0 +1,332 @@
+"""
+事件多路输出
+
+每条推送先作为结构化事件（JSON）发布，再由各个 sink 各自投递：Telegram、
+HTTP webhook、Redis 兼容的 Stream（XADD）、TCP / Unix socket 上的 JSON 行、
+JSONL 文件和标准输出。
+
+每个 sink 有自己的队列和后台任务，publish() 只是把事件放进各个队列，不会
+等待任何投递；某个 sink 变慢或断开只会让它自己的队列堆积，队列满时丢弃最旧
+的事件。Telegram 消息的渲染也在 Telegram sink 的任务里进行，结构化事件不需要
+等消息格式化完成就已经发出。
+
+SINKS 配置为逗号分隔的列表：
+    telegram
+    stdout
+    file:events.jsonl
+    webhook:https://example.com/hook
+    redis://127.0.0.1:6379/bsc-events
+    tcp://127.0.0.1:9000
+    unix:///tmp/bsc-events.sock
+    ws://127.0.0.1:8765        本地 WebSocket 推送服务，见 pushserver.py
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from urllib.parse import urlparse
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    """
+    type: 事件类型，如 pair_created
+    data: 结构化字段
+    message: async message()，由 Telegram sink 调用，负责渲染并发送 / 编辑消息
+    trace: 发布时的链路追踪，见 tracing.py
+    """
+
+    __slots__ = ("type", "data", "ts", "message", "trace", "_json")
+
+    def __init__(self, type, data, message=None, trace=None):
+        self.type = type
+        self.data = data
+        self.ts = time.time()
+        self.message = message
+        self.trace = trace
+        self._json = None
+
+    def to_json(self):
+        # 所有 JSON sink 共用一次序列化结果
+        if self._json is None:
+            self._json = json.dumps(
+                {"type": self.type, "ts": self.ts, **self.data},
+                ensure_ascii=False,
+                default=str,
+            )
+        return self._json
+
+
+class Sink:
+    """sink 基类，子类实现 deliver(event)"""
+
+    structured = True
+
+    def __init__(self, name, queue_size=1000):
+        self.name = name
+        self.queue = asyncio.Queue(queue_size)
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, event):
+        if self.queue.full():
+            self.discard(self.queue.get_nowait())
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"[{self.name}] 队列已满，已丢弃 {self.dropped} 个事件")
+        self.queue.put_nowait(event)
+
+    async def deliver(self, event):
+        raise NotImplementedError
+
+    def discard(self, event):
+        """队列满时被丢弃的事件"""
+
+    async def run(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.deliver(event)
+                self.delivered += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"[{self.name}] 事件投递失败: {e}, 类型: {event.type}")
+
+
+class TelegramSink(Sink):
+    """调用事件自带的 message()，没有 message 的事件直接跳过"""
+
+    structured = False
+
+    def __init__(self, queue_size=1000):
+        super().__init__("telegram", queue_size)
+
+    def submit(self, event):
+        if event.message is not None:
+            # 链路在消息发送完成后才结束
+            if event.trace is not None:
+                event.trace.hold()
+            super().submit(event)
+
+    def discard(self, event):
+        if event.trace is not None:
+            event.trace.release()
+
+    async def deliver(self, event):
+        trace = event.trace
+        if trace is None:
+            await event.message()
+            return
+        try:
+            with tracing.activate(trace):
+                if trace.published_at is not None:
+                    trace.add("等待发送", trace.published_at, time.monotonic())
+                with tracing.span("telegram"):
+                    await event.message()
+        finally:
+            trace.release()
+
+
+class WebhookSink(Sink):
+    def __init__(self, url, timeout=5, queue_size=1000):
+        # aiohttp 导入较慢，只在配置了 webhook 时导入
+        import aiohttp
+
+        super().__init__(f"webhook {url}", queue_size)
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+
+    async def deliver(self, event):
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        async with self._session.post(
+            self.url,
+            data=event.to_json().encode(),
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"HTTP {response.status}")
+
+
+class StreamSink(Sink):
+    """
+    连接到 TCP 或 Unix socket，每个事件写一行 JSON
+
+    连接断开时丢弃当前事件并在下一个事件到来时重连。
+    """
+
+    def __init__(self, url, queue_size=1000):
+        super().__init__(url, queue_size)
+        self.url = urlparse(url)
+        self._writer = None
+
+    async def _connect(self):
+        if self.url.scheme == "unix":
+            _, writer = await asyncio.open_unix_connection(self.url.path)
+        else:
+            _, writer = await asyncio.open_connection(self.url.hostname, self.url.port)
+        logger.info(f"[{self.name}] 已连接")
+        return writer
+
+    async def _write(self, line):
+        if self._writer is None or self._writer.is_closing():
+            self._writer = await self._connect()
+        self._writer.write(line)
+        await self._writer.drain()
+
+    async def deliver(self, event):
+        try:
+            await self._write(event.to_json().encode() + b"\n")
+        except Exception:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            raise
+
+
+class RedisStreamSink(StreamSink):
+    """
+    XADD 到 Redis 兼容的 Stream，直接使用 RESP 协议，不依赖 redis 客户端
+
+    redis://host:port/stream_name，每个事件写入字段 type 和 data（事件 JSON），
+    Stream 长度大致保持在 maxlen 以内。
+    """
+
+    def __init__(self, url, maxlen=100000, queue_size=1000):
+        super().__init__(url, queue_size)
+        self.stream = self.url.path.lstrip("/") or "bsc-events"
+        # 不在日志里带出密码
+        self.name = f"redis {self.url.hostname}:{self.url.port or 6379}/{self.stream}"
+        self.maxlen = maxlen
+        self._reader = None
+
+    async def _connect(self):
+        self._reader, writer = await asyncio.open_connection(
+            self.url.hostname, self.url.port or 6379
+        )
+        if self.url.password:
+            writer.write(_resp_command("AUTH", self.url.password))
+            await writer.drain()
+            await self._read_reply()
+        logger.info(f"[{self.name}] 已连接")
+        return writer
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("连接已关闭")
+        if line.startswith(b"-"):
+            raise RuntimeError(line[1:].strip().decode())
+        if line.startswith(b"$"):
+            length = int(line[1:])
+            if length >= 0:
+                await self._reader.readexactly(length + 2)
+        return line
+
+    async def deliver(self, event):
+        command = _resp_command(
+            "XADD",
+            self.stream,
+            "MAXLEN",
+            "~",
+            str(self.maxlen),
+            "*",
+            "type",
+            event.type,
+            "data",
+            event.to_json(),
+        )
+        try:
+            await self._write(command)
+            await self._read_reply()
+        except Exception:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            raise
+
+
+def _resp_command(*args):
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class JsonlFileSink(Sink):
+    def __init__(self, path, queue_size=1000):
+        super().__init__(f"file {path}", queue_size)
+        self.path = path
+        self._file = None
+
+    async def deliver(self, event):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(event.to_json() + "\n")
+        self._file.flush()
+
+
+class StdoutSink(Sink):
+    def __init__(self, queue_size=1000):
+        super().__init__("stdout", queue_size)
+
+    async def deliver(self, event):
+        sys.stdout.write(event.to_json() + "\n")
+        sys.stdout.flush()
+
+
+def build_sink(spec):
+    """按配置项创建 sink，见模块说明"""
+    if spec == "telegram":
+        return TelegramSink()
+    if spec == "stdout":
+        return StdoutSink()
+    if spec.startswith("file:"):
+        return JsonlFileSink(spec[len("file:") :])
+    if spec.startswith("webhook:"):
+        return WebhookSink(spec[len("webhook:") :])
+    if spec.startswith("redis://"):
+        return RedisStreamSink(spec)
+    if spec.startswith(("tcp://", "unix://")):
+        return StreamSink(spec)
+    if spec.startswith("ws://"):
+        from pushserver import get_push_server
+
+        return get_push_server(spec)
+    raise ValueError(f"未知的 sink 配置: {spec}")
+
+
+class Dispatcher:
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        # 是否有需要结构化事件的 sink（不只是 Telegram）
+        self.structured = any(sink.structured for sink in self.sinks)
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(build_sink(item.strip()) for item in spec.split(",") if item.strip())
+
+    def publish(self, type, data, message=None):
+        """发布事件：只放进各个 sink 的队列，立即返回"""
+        trace = tracing.current()
+        if trace is not None:
+            trace.published_at = time.monotonic()
+        event = Event(type, data, message, trace)
+        for sink in self.sinks:
+            sink.submit(event)
+        return event
+
+    async def run(self):
+        if self.sinks:
+            logger.info(f"事件输出: {', '.join(sink.name for sink in self.sinks)}")
+            await asyncio.gather(*(sink.run() for sink in self.sinks))
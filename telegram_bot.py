@@ -0,0 +1,137 @@
+"""
+Telegram Bot 推送
+
+三个脚本共用的 sendMessage / editMessageText 封装。发送时可以带一个 key
+（如代币地址），记录 sendMessage 返回的 message_id；之后同一个 key 的更新
+可以直接编辑原消息，而不是再发一条新消息，减少消息量和限流压力。
+"""
+
+import logging
+from collections import OrderedDict
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.telegram.org/bot{token}/{method}"
+
+
+class SentMessage:
+    __slots__ = ("chat_id", "message_id", "text", "reply_markup")
+
+    def __init__(self, chat_id, message_id, text, reply_markup):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.text = text
+        self.reply_markup = reply_markup
+
+
+class TelegramBot:
+    """
+    chat_id: 默认频道，send() 未指定 chat_id 时使用
+    max_tracked: 最多记录多少条已发送消息，超出时丢弃最早的
+    """
+
+    def __init__(
+        self,
+        token,
+        chat_id="",
+        parse_mode="Markdown",
+        disable_web_page_preview=True,
+        max_tracked=1000,
+    ):
+        self.token = token
+        self.chat_id = chat_id
+        self.parse_mode = parse_mode
+        self.disable_web_page_preview = disable_web_page_preview
+        self.max_tracked = max_tracked
+        self.sent = OrderedDict()
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            # aiohttp 导入较慢，推迟到第一次发消息，不占用启动时间
+            import aiohttp
+
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def _call(self, method, payload):
+        """调用 Bot API，成功返回 result，失败返回 None"""
+        url = API_URL.format(token=self.token, method=method)
+        try:
+            async with self._get_session().post(url, json=payload) as response:
+                data = await response.json(content_type=None)
+                if response.status == 200 and data.get("ok"):
+                    return data["result"]
+                description = data.get("description", "")
+                # 内容没有变化时 Telegram 返回 400，视为成功
+                if "message is not modified" in description:
+                    return True
+                logger.error(
+                    f"Telegram {method} 失败: {response.status} - {description}"
+                )
+        except Exception as e:
+            logger.error(f"Telegram {method} 异常: {e}")
+        return None
+
+    def _payload(self, chat_id, text, reply_markup):
+        payload = {"chat_id": chat_id, "text": text}
+        if self.parse_mode:
+            payload["parse_mode"] = self.parse_mode
+        if self.disable_web_page_preview:
+            payload["disable_web_page_preview"] = True
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        return payload
+
+    def _with_footer(self, text):
+        """开启耗时脚注时，在消息末尾附上当前事件各阶段的耗时"""
+        trace = tracing.current()
+        if trace is not None and tracing.footer_enabled:
+            return f"{text}\n{trace.footer()}"
+        return text
+
+    async def send(self, text, chat_id=None, reply_markup=None, key=None):
+        """发送消息，返回 message_id（失败为 None）；指定 key 时记录下来供之后编辑"""
+        chat_id = chat_id or self.chat_id
+        result = await self._call(
+            "sendMessage",
+            self._payload(chat_id, self._with_footer(text), reply_markup),
+        )
+        if result is None:
+            return None
+        message_id = result["message_id"]
+        logger.info(f"Telegram 消息发送成功到 {chat_id}")
+        if key is not None:
+            self.sent[key] = SentMessage(chat_id, message_id, text, reply_markup)
+            self.sent.move_to_end(key)
+            while len(self.sent) > self.max_tracked:
+                self.sent.popitem(last=False)
+        return message_id
+
+    def get_sent(self, key):
+        """之前用 key 发送的消息，没有记录时返回 None"""
+        return self.sent.get(key)
+
+    async def edit(self, key, text, reply_markup=None):
+        """
+        编辑之前用 key 发送的消息，成功返回 True
+
+        reply_markup 为 None 时保留原消息的按钮（editMessageText 不带按钮会把按钮清掉）。
+        记录中的 text 仍是最初发送的正文（不含耗时脚注），方便下次在原文基础上
+        重新编辑；耗时脚注按本次编辑所在的事件重新附上。
+        """
+        sent = self.sent.get(key)
+        if sent is None:
+            return False
+        payload = self._payload(
+            sent.chat_id, self._with_footer(text), reply_markup or sent.reply_markup
+        )
+        payload["message_id"] = sent.message_id
+        if await self._call("editMessageText", payload) is not None:
+            logger.info(f"Telegram 消息已更新: {sent.chat_id}/{sent.message_id}")
+            return True
+        # 原消息被删除或过旧无法编辑，之后改为发送新消息
+        self.sent.pop(key, None)
+        return False
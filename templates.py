@@ -0,0 +1,211 @@
+"""
+推送消息模板
+
+每种推送的正文布局和按钮在模块加载时编译一次：把格式串拆成固定文本和字段
+两部分，渲染时只需按顺序拼接字段值，不再每个事件重复拼 f-string。
+
+字段名对应 render() 传入的字典键，格式说明与 format() 相同（如 {tax:.2f}）。
+可选的行（流动性、过期标记等）由调用方先渲染成片段，不需要时传空字符串。
+"""
+
+from string import Formatter
+
+
+class Template:
+    __slots__ = ("source", "fields", "_parts")
+
+    def __init__(self, source):
+        self.source = source
+        parts = []
+        fields = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is not None and (conversion or not field.isidentifier()):
+                raise ValueError(f"不支持的模板字段: {{{field}}}")
+            parts.append((literal, field, spec))
+            if field is not None and field not in fields:
+                fields.append(field)
+        self._parts = tuple(parts)
+        self.fields = tuple(fields)
+
+    def render(self, values):
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is not None:
+                value = values[field]
+                out.append(format(value, spec) if spec else str(value))
+        return "".join(out)
+
+
+class Keyboard:
+    """inline_keyboard 按钮布局，rows 为 [[(按钮文字, 链接模板)]]"""
+
+    __slots__ = ("_rows",)
+
+    def __init__(self, rows):
+        self._rows = tuple(
+            tuple((text, Template(url)) for text, url in row) for row in rows
+        )
+
+    def render(self, values):
+        return {
+            "inline_keyboard": [
+                [{"text": text, "url": url.render(values)} for text, url in row]
+                for row in self._rows
+            ]
+        }
+
+
+# 交易平台链接，字段 address 为代币地址
+AVE_LINK = (
+    "[Avebot链接](https://pro.ave.ai/token/{address}-bsc?lang=zh-cn&code=pikacyan)"
+)
+AXIOM_LINK = "[Axiom链接](https://axiom.trade/t/{address}?chain=bnb)"
+BINANCE_LINK = (
+    "[Binance Web3](https://web3.binance.com/zh-CN/token/bsc/{address}?ref=ER50PYNM)"
+)
+GMGN_LINK = "[GMGN链接](https://gmgn.ai/bsc/token/CHENGZI_{address})"
+OKX_LINK = "[OKX Web3](https://web3.okx.com/zh-hans/token/bsc/{address})"
+POWERED_BY = "✨ Powered by [PikacyanWeb3](https://x.com/pikacyanweb3)"
+
+# 按钮
+AVE_BUY = (
+    "Avebot 立即购买",
+    "https://t.me/AveSniperBot_01_bot?start={address}-pikacyan",
+)
+BLOOM_BUY = (
+    "Bloom 立即购买",
+    "https://t.me/BloomEVMbot?start=ref_pikacyan_ca_{address}",
+)
+SEARCH_CA = ("🐦 Search CA on X", "https://x.com/search?q={address}")
+
+# flap.py / pancake.py 的购买按钮
+BUY_KEYBOARD = Keyboard(
+    [
+        [
+            AVE_BUY,
+            (
+                "Bloom 立即购买",
+                "https://t.me/BloomEVMbot?start=ref_AJ3IYD6EXI_ca_{address}",
+            ),
+            (
+                "GMGN 立即购买",
+                "https://t.me/gmgn_bsc_bot?start=i_lZKIXD4b_c_{address}",
+            ),
+        ]
+    ]
+)
+
+# ---- flap.py ----
+
+FLAP_TOKEN_CREATED = Template(
+    "🔔 *新慈善代币创建*\n\n"
+    "📛 *代币名称:* {name}\n"
+    "🔤 *代币符号:* {symbol}\n"
+    "📍 *代币地址:* `{address}`\n\n"
+    "👤 *创建者:* `{creator}`\n"
+    "💰 *税率:* {tax_percent:.2f}% + 1%\n"
+    "💸 *受益人:* `{beneficiary}` [Search on X🔎](https://x.com/search?q={beneficiary}) | [Search on GitHub🔎](https://github.com/search?q={beneficiary}&type=code)\n\n"
+    "🔗 *交易哈希:* [{tx_hash}](https://bscscan.com/tx/{tx_hash})\n\n"
+    "🔗 *交易平台:*\n"
+    "[Avebot链接](https://pro.ave.ai/token/{address}-bsc) | "
+    "[GMGN链接](https://gmgn.ai/bsc/token/{address}) | "
+    f"{OKX_LINK}"
+)
+
+# ---- four.py ----
+
+FOUR_PLATFORM_LINKS = " | ".join(
+    (AVE_LINK, AXIOM_LINK, BINANCE_LINK, GMGN_LINK, OKX_LINK)
+)
+
+FOUR_TOKEN_CREATED = Template(
+    "🆕 新代币创建\n\n"
+    "💰 代币名称: {name}(💛BSC)\n"
+    "🔣 代币符号: {symbol}\n\n"
+    f"{FOUR_PLATFORM_LINKS}\n\n"
+    "📋 合约地址: `{address}`\n\n"
+    f"{POWERED_BY}"
+)
+
+FOUR_TOKEN_CREATED_KEYBOARD = Keyboard(
+    [
+        [SEARCH_CA, ("🐦 Search Creator on X", "https://x.com/search?q={creator}")],
+        [AVE_BUY, BLOOM_BUY],
+    ]
+)
+
+FOUR_MARKET_LINES = Template(
+    "🚀 当前市值: **{market_cap}**{stale}\n"
+    "👥 持币人数: **{holders}** | Top10持仓: **{top10_percent}%**\n\n"
+)
+
+FOUR_TOKEN_BONDED = Template(
+    "🚀🚀🚀 代币已迁移\n\n"
+    "💰 代币名称: {name}(💛BSC)\n"
+    "🔣 代币符号: {symbol}\n\n"
+    "{market_lines}"
+    f"{FOUR_PLATFORM_LINKS}\n\n"
+    "📋 合约地址: `{address}`\n\n"
+    f"{POWERED_BY}"
+)
+
+FOUR_TOKEN_BONDED_KEYBOARD = Keyboard([[SEARCH_CA], [AVE_BUY, BLOOM_BUY]])
+
+FOUR_MARKET_CAP_CROSSED = Template(
+    "📈 市值突破 {threshold}\n\n"
+    "💰 代币名称: {name}(💛BSC)\n"
+    "🔣 代币符号: {symbol}\n\n"
+    "🚀 当前市值: **{market_cap}**\n"
+    "🕒 迁移时市值: {initial_market_cap}，已过 {minutes:.0f} 分钟\n"
+    "👥 持币人数: **{holders}**\n\n"
+    f"{AVE_LINK} | {GMGN_LINK}\n\n"
+    "📋 合约地址: `{address}`"
+)
+
+# 编辑原消息时追加在末尾的市值更新
+FOUR_MARKET_CAP_UPDATE = Template(
+    "\n\n📈 市值突破 {threshold}，当前市值: **{market_cap}** | "
+    "持币人数: **{holders}**（迁移后 {minutes:.0f} 分钟）"
+)
+
+# ---- pancake.py ----
+
+PANCAKE_AXIOM_LINK = Template(
+    "[Axiom链接](https://axiom.trade/meme/{address}?chain=bnb) | "
+)
+
+PANCAKE_LIQUIDITY_LINE = Template("💧 *流动性:* ${liquidity_usd:,.2f}\n")
+
+PANCAKE_PAIR_CREATED = Template(
+    "🥞 *PancakeSwap新交易对创建*\n\n"
+    "📛 *代币名称:* {name}\n"
+    "🔤 *代币符号:* {symbol}\n"
+    "📍 *代币地址:* `{address}`\n\n"
+    "💰 *市值:* ${market_cap:,.2f}{market_cap_stale}\n"
+    "🔗 *交易对:* {paired_name} ({paired_symbol})\n"
+    "📍 *配对地址:* `{paired_address}`\n"
+    "💰 *配对市值:* ${paired_market_cap:,.2f}{paired_market_cap_stale}\n"
+    "{liquidity_line}\n"
+    "🔗 *交易对地址:* `{pair}`\n"
+    "🔗 *交易哈希:* [{tx_hash}](https://bscscan.com/tx/{tx_hash})\n\n"
+    "🔗 *交易平台:*\n"
+    f"{AVE_LINK} | "
+    "{axiom_link}"
+    f"{BINANCE_LINK} | {GMGN_LINK} | {OKX_LINK}"
+)
+
+PANCAKE_MARKET_CAP_CROSSED = Template(
+    "📈 *市值突破 ${threshold:,.0f}*\n\n"
+    "📛 *代币名称:* {name}\n"
+    "🔤 *代币符号:* {symbol}\n"
+    "📍 *代币地址:* `{address}`\n\n"
+    "💰 *当前市值:* ${market_cap:,.2f}\n"
+    "🕒 *推送时市值:* ${initial_market_cap:,.2f}，已过 {minutes:.0f} 分钟\n"
+    "🔗 *交易对地址:* `{pair}`"
+)
+
+PANCAKE_MARKET_CAP_UPDATE = Template(
+    "\n\n📈 *市值突破 ${threshold:,.0f}*，当前市值: ${market_cap:,.2f}"
+    "（推送后 {minutes:.0f} 分钟）"
+)
@@ -0,0 +1,126 @@
+"""abi.py 的编解码，对照 eth_abi 5 生成的已知编码"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from abi import (
+    WORD,
+    decode_aggregate3,
+    encode_address,
+    encode_aggregate3,
+    encode_uint,
+    read_address,
+    read_bytes,
+    read_string,
+    read_uint,
+)
+
+ADDRESS_A = "0x" + "11" * 20
+ADDRESS_B = "0x" + "ab" * 20
+
+
+def _words(*words):
+    """按 32 字节一行书写的十六进制编码"""
+    assert all(len(w) == 2 * WORD for w in words)
+    return bytes.fromhex("".join(words))
+
+
+# encode(["uint256", "address", "string", "bytes"],
+#        [123456789, ADDRESS_A, "Dog 狗", b"\x01\x02\x03"])
+STATIC_AND_DYNAMIC = _words(
+    "00000000000000000000000000000000000000000000000000000000075bcd15",
+    "0000000000000000000000001111111111111111111111111111111111111111",
+    "0000000000000000000000000000000000000000000000000000000000000080",
+    "00000000000000000000000000000000000000000000000000000000000000c0",
+    "0000000000000000000000000000000000000000000000000000000000000007",
+    "446f6720e78b9700000000000000000000000000000000000000000000000000",
+    "0000000000000000000000000000000000000000000000000000000000000003",
+    "0102030000000000000000000000000000000000000000000000000000000000",
+)
+
+# encode(["(address,bool,bytes)[]"],
+#        [[(ADDRESS_A, True, 0x06fdde03), (ADDRESS_B, True, b"")]])
+AGGREGATE3_CALLS = _words(
+    "0000000000000000000000000000000000000000000000000000000000000020",
+    "0000000000000000000000000000000000000000000000000000000000000002",
+    "0000000000000000000000000000000000000000000000000000000000000040",
+    "00000000000000000000000000000000000000000000000000000000000000e0",
+    "0000000000000000000000001111111111111111111111111111111111111111",
+    "0000000000000000000000000000000000000000000000000000000000000001",
+    "0000000000000000000000000000000000000000000000000000000000000060",
+    "0000000000000000000000000000000000000000000000000000000000000004",
+    "06fdde0300000000000000000000000000000000000000000000000000000000",
+    "000000000000000000000000abababababababababababababababababababab",
+    "0000000000000000000000000000000000000000000000000000000000000001",
+    "0000000000000000000000000000000000000000000000000000000000000060",
+    "0000000000000000000000000000000000000000000000000000000000000000",
+)
+
+# encode(["(bool,bytes)[]"], [[(True, (0x12).to_bytes(32)), (False, b"")]])
+AGGREGATE3_RESULTS = _words(
+    "0000000000000000000000000000000000000000000000000000000000000020",
+    "0000000000000000000000000000000000000000000000000000000000000002",
+    "0000000000000000000000000000000000000000000000000000000000000040",
+    "00000000000000000000000000000000000000000000000000000000000000c0",
+    "0000000000000000000000000000000000000000000000000000000000000001",
+    "0000000000000000000000000000000000000000000000000000000000000040",
+    "0000000000000000000000000000000000000000000000000000000000000020",
+    "0000000000000000000000000000000000000000000000000000000000000012",
+    "0000000000000000000000000000000000000000000000000000000000000000",
+    "0000000000000000000000000000000000000000000000000000000000000040",
+    "0000000000000000000000000000000000000000000000000000000000000000",
+)
+
+
+def test_read_static_and_dynamic_fields():
+    data = STATIC_AND_DYNAMIC
+    assert read_uint(data, 0) == 123456789
+    assert read_address(data, WORD) == ADDRESS_A
+    assert read_string(data, read_uint(data, 2 * WORD)) == "Dog 狗"
+    assert read_bytes(data, read_uint(data, 3 * WORD)) == b"\x01\x02\x03"
+
+
+def test_encode_static_words():
+    assert encode_uint(123456789) == STATIC_AND_DYNAMIC[:WORD]
+    assert encode_address(ADDRESS_A) == STATIC_AND_DYNAMIC[WORD : 2 * WORD]
+    assert read_address(encode_address(ADDRESS_B), 0) == ADDRESS_B
+
+
+def test_encode_aggregate3():
+    calls = [(ADDRESS_A, bytes.fromhex("06fdde03")), (ADDRESS_B, b"")]
+    assert encode_aggregate3(calls) == AGGREGATE3_CALLS
+
+
+def test_encode_aggregate3_empty():
+    assert encode_aggregate3([]) == encode_uint(WORD) + encode_uint(0)
+
+
+def test_decode_aggregate3():
+    assert decode_aggregate3(AGGREGATE3_RESULTS) == [
+        (True, encode_uint(0x12)),
+        (False, b""),
+    ]
+
+
+@pytest.mark.parametrize(
+    "read, data, offset",
+    [
+        (read_uint, b"\x00" * (WORD - 1), 0),
+        (read_address, b"\x00" * WORD, 1),
+        (read_uint, b"\x00" * WORD, -1),
+        # 长度字声明 3 字节，但后面没有内容
+        (read_bytes, encode_uint(3), 0),
+    ],
+)
+def test_truncated_data_raises(read, data, offset):
+    with pytest.raises(ValueError):
+        read(data, offset)
+
+
+def test_truncated_aggregate3_raises():
+    with pytest.raises(ValueError):
+        decode_aggregate3(AGGREGATE3_RESULTS[:-WORD])
@@ -0,0 +1,255 @@
+"""calldata.py 对各种包装调用的拆解"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from abi import WORD, encode_address, encode_uint
+from calldata import MAX_DEPTH, WRAPPERS, iter_calls
+
+WRAPPER = "0x" + "aa" * 20
+PORTAL = "0x" + "e2" * 20
+TOKEN = "0x" + "cc" * 20
+CREATE = bytes.fromhex("0ba6324e") + encode_uint(1)
+APPROVE = bytes.fromhex("095ea7b3") + encode_address(PORTAL) + encode_uint(2)
+CALLS = [(PORTAL, CREATE), (TOKEN, APPROVE)]
+
+
+# 按 ABI 规则编码测试用的参数：每个值为 (是否动态类型, 编码)
+def _static(word):
+    return False, word
+
+
+def _address(address):
+    return _static(encode_address(address))
+
+
+def _uint(value):
+    return _static(encode_uint(value))
+
+
+def _bytes(value):
+    return True, encode_uint(len(value)) + value + b"\x00" * (-len(value) % WORD)
+
+
+def _head_tail(items):
+    # 测试中的 tuple 都含 bytes，是动态类型，头部每项恰好一个字
+    head, tail = b"", b""
+    for dynamic, encoded in items:
+        if dynamic:
+            head += encode_uint(len(items) * WORD + len(tail))
+            tail += encoded
+        else:
+            head += encoded
+    return head + tail
+
+
+def _tuple(*items):
+    return True, _head_tail(items)
+
+
+def _array(items):
+    return True, encode_uint(len(items)) + _head_tail(items)
+
+
+def _call(selector, *args):
+    return bytes.fromhex(selector) + _head_tail(args)
+
+
+def _user_op_v06(target, data):
+    # (sender, nonce, initCode, callData, callGasLimit, verificationGasLimit,
+    #  preVerificationGas, maxFeePerGas, maxPriorityFeePerGas, paymasterAndData, signature)
+    return _tuple(
+        _address(target),
+        _uint(0),
+        _bytes(b""),
+        _bytes(data),
+        *[_uint(100000)] * 5,
+        _bytes(b""),
+        _bytes(b"\x01" * 65),
+    )
+
+
+def _user_op_v07(target, data):
+    # (sender, nonce, initCode, callData, accountGasLimits, preVerificationGas,
+    #  gasFees, paymasterAndData, signature)
+    return _tuple(
+        _address(target),
+        _uint(0),
+        _bytes(b""),
+        _bytes(data),
+        _uint(1),
+        _uint(100000),
+        _uint(1),
+        _bytes(b""),
+        _bytes(b"\x01" * 65),
+    )
+
+
+def _erc7579_single(calls):
+    target, data = calls[0]
+    mode = b"\x00" * WORD
+    packed = bytes.fromhex(target[2:]) + encode_uint(0) + data
+    return _call("e9ae5c53", _static(mode), _bytes(packed))
+
+
+def _erc7579_batch(calls):
+    mode = b"\x01" + b"\x00" * (WORD - 1)
+    execution = _head_tail(
+        [_array([_tuple(_address(t), _uint(0), _bytes(d)) for t, d in calls])]
+    )
+    return _call("e9ae5c53", _static(mode), _bytes(execution))
+
+
+# 包装一组调用的函数：选择器 -> 按 calls 构造的包装调用，拆解后应得到 calls
+CASES = {
+    "252dba42": lambda calls: _call(
+        "252dba42", _array([_tuple(_address(t), _bytes(d)) for t, d in calls])
+    ),
+    "c3077fa9": lambda calls: _call(
+        "c3077fa9", _array([_tuple(_address(t), _bytes(d)) for t, d in calls])
+    ),
+    "bce38bd7": lambda calls: _call(
+        "bce38bd7",
+        _uint(1),
+        _array([_tuple(_address(t), _bytes(d)) for t, d in calls]),
+    ),
+    "399542e9": lambda calls: _call(
+        "399542e9",
+        _uint(0),
+        _array([_tuple(_address(t), _bytes(d)) for t, d in calls]),
+    ),
+    "82ad56cb": lambda calls: _call(
+        "82ad56cb",
+        _array([_tuple(_address(t), _uint(1), _bytes(d)) for t, d in calls]),
+    ),
+    "174dea71": lambda calls: _call(
+        "174dea71",
+        _array([_tuple(_address(t), _uint(1), _uint(0), _bytes(d)) for t, d in calls]),
+    ),
+    "34fcd5be": lambda calls: _call(
+        "34fcd5be",
+        _array([_tuple(_address(t), _uint(0), _bytes(d)) for t, d in calls]),
+    ),
+    "18dfb3c7": lambda calls: _call(
+        "18dfb3c7",
+        _array([_address(t) for t, _ in calls]),
+        _array([_bytes(d) for _, d in calls]),
+    ),
+    "47e1da2a": lambda calls: _call(
+        "47e1da2a",
+        _array([_address(t) for t, _ in calls]),
+        _array([_uint(0) for _ in calls]),
+        _array([_bytes(d) for _, d in calls]),
+    ),
+    "1fad948c": lambda calls: _call(
+        "1fad948c", _array([_user_op_v06(t, d) for t, d in calls]), _address(TOKEN)
+    ),
+    "765e827f": lambda calls: _call(
+        "765e827f", _array([_user_op_v07(t, d) for t, d in calls]), _address(TOKEN)
+    ),
+}
+
+# 只包装一个调用的函数
+SINGLE_CASES = {
+    "b61d27f6": lambda t, d: _call("b61d27f6", _address(t), _uint(0), _bytes(d)),
+    "51945447": lambda t, d: _call(
+        "51945447", _address(t), _uint(0), _bytes(d), _uint(0)
+    ),
+    "9e5d4c49": lambda t, d: _call("9e5d4c49", _address(t), _uint(0), _bytes(d)),
+    # execTransaction(to, value, data, operation, safeTxGas, baseGas, gasPrice,
+    #                 gasToken, refundReceiver, signatures)
+    "6a761202": lambda t, d: _call(
+        "6a761202",
+        _address(t),
+        _uint(0),
+        _bytes(d),
+        *[_uint(0)] * 4,
+        _address("0x" + "00" * 20),
+        _address("0x" + "00" * 20),
+        _bytes(b"\x01" * 65),
+    ),
+}
+
+# 调用自身的 multicall，内层目标沿用外层目标
+SELF_CASES = {
+    "ac9650d8": lambda calls: _call("ac9650d8", _array([_bytes(d) for d in calls])),
+    "5ae401dc": lambda calls: _call(
+        "5ae401dc", _uint(2**40), _array([_bytes(d) for d in calls])
+    ),
+    "1f0464d1": lambda calls: _call(
+        "1f0464d1", _uint(7), _array([_bytes(d) for d in calls])
+    ),
+}
+
+
+def test_every_wrapper_has_a_case():
+    covered = set(CASES) | set(SINGLE_CASES) | set(SELF_CASES) | {"e9ae5c53"}
+    assert covered == {selector.hex() for selector in WRAPPERS}
+
+
+@pytest.mark.parametrize("selector", sorted(CASES))
+def test_unwrap_call_list(selector):
+    calldata = CASES[selector](CALLS)
+    assert list(iter_calls(WRAPPER, calldata)) == CALLS
+
+
+@pytest.mark.parametrize("selector", sorted(SINGLE_CASES))
+def test_unwrap_single_call(selector):
+    calldata = SINGLE_CASES[selector](PORTAL, CREATE)
+    assert list(iter_calls(WRAPPER, calldata)) == [(PORTAL, CREATE)]
+
+
+@pytest.mark.parametrize("selector", sorted(SELF_CASES))
+def test_unwrap_self_calls(selector):
+    calldata = SELF_CASES[selector]([CREATE, APPROVE])
+    assert list(iter_calls(PORTAL, calldata)) == [(PORTAL, CREATE), (PORTAL, APPROVE)]
+
+
+def test_unwrap_erc7579_single():
+    assert list(iter_calls(WRAPPER, _erc7579_single(CALLS))) == [(PORTAL, CREATE)]
+
+
+def test_unwrap_erc7579_batch():
+    assert list(iter_calls(WRAPPER, _erc7579_batch(CALLS))) == CALLS
+
+
+def test_erc7579_unknown_call_type_yields_nothing():
+    mode = b"\xff" + b"\x00" * (WORD - 1)
+    calldata = _call("e9ae5c53", _static(mode), _bytes(b""))
+    assert list(iter_calls(WRAPPER, calldata)) == []
+
+
+def test_nested_wrappers():
+    # Safe -> Multicall3.aggregate3 -> 路由 multicall(bytes[])
+    inner = SELF_CASES["ac9650d8"]([CREATE])
+    aggregate = CASES["82ad56cb"]([(PORTAL, inner), (TOKEN, APPROVE)])
+    calldata = SINGLE_CASES["6a761202"](WRAPPER, aggregate)
+    assert list(iter_calls(WRAPPER, calldata)) == CALLS
+
+
+def test_plain_call_is_yielded_as_is():
+    assert list(iter_calls(PORTAL, CREATE)) == [(PORTAL, CREATE)]
+    assert list(iter_calls(PORTAL, b"")) == [(PORTAL, b"")]
+
+
+def test_max_depth():
+    calldata = CREATE
+    for _ in range(MAX_DEPTH):
+        calldata = SINGLE_CASES["b61d27f6"](PORTAL, calldata)
+    # 恰好 MAX_DEPTH 层时可以拆到最内层
+    assert list(iter_calls(WRAPPER, calldata)) == [(PORTAL, CREATE)]
+
+    wrapped = SINGLE_CASES["b61d27f6"](PORTAL, calldata)
+    # 再多一层时，第 MAX_DEPTH 层的包装调用原样产出
+    assert list(iter_calls(WRAPPER, wrapped)) == [
+        (PORTAL, SINGLE_CASES["b61d27f6"](PORTAL, CREATE))
+    ]
+
+
+def test_malformed_wrapper_is_yielded_as_is():
+    calldata = CASES["82ad56cb"](CALLS)[:-WORD]
+    assert list(iter_calls(WRAPPER, calldata)) == [(WRAPPER, calldata)]
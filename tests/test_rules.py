@@ -0,0 +1,318 @@
+"""rules.py 的谓词、代价排序和按需取字段，以及 addrset.py 的地址集合"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from addrset import AddressSet, address_key, load_address_sets
+from enrich import Enricher
+from rules import Rule, RuleEngine, compile_predicate
+
+WBNB = "0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c"
+USDT = "0x55d398326f99059ff775485246999027b3197955"
+TOKEN = "0x" + "cc" * 20
+
+
+def _matches(spec, ctx, sets=None):
+    test, _ = compile_predicate(spec, sets)
+    return test(ctx)
+
+
+def _touch(path, content):
+    """写入文件并把 mtime 往后推，避免与上次写入落在同一个时间戳上"""
+    path.write_text(content, encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.mark.parametrize(
+    "op, value, field_value, expected",
+    [
+        ("eq", 3, 3, True),
+        ("ne", 3, 3, False),
+        ("lt", 1000000, 999999, True),
+        ("le", 1000000, 1000000, True),
+        ("gt", 1000000, 1000000, False),
+        ("ge", 1000000, 1000000, True),
+        ("in", ["a", "b"], "b", True),
+        ("not_in", ["a", "b"], "b", False),
+        ("startswith", "0x", "0xabc", True),
+        ("endswith", "dog", "hotdog", True),
+        ("contains", "og", "hotdog", True),
+    ],
+)
+def test_leaf_ops(op, value, field_value, expected):
+    spec = {"field": "x", "op": op, "value": value}
+    assert _matches(spec, {"x": field_value}) is expected
+
+
+def test_ignore_case():
+    spec = {"field": "symbol", "op": "endswith", "value": "DOG", "ignore_case": True}
+    assert _matches(spec, {"symbol": "HotDog"})
+    assert not _matches({**spec, "ignore_case": False}, {"symbol": "HotDog"})
+
+    spec = {"field": "symbol", "op": "in", "value": ["WBNB"], "ignore_case": True}
+    assert _matches(spec, {"symbol": "wbnb"})
+
+
+def test_eq_field_ignore_case():
+    ctx = {"token0": WBNB.upper().replace("0X", "0x"), "token1": WBNB}
+    spec = {"field": "token0", "op": "eq_field", "value": "token1"}
+    assert not _matches(spec, ctx)
+    assert _matches({**spec, "ignore_case": True}, ctx)
+    assert not _matches({**spec, "op": "ne_field", "ignore_case": True}, ctx)
+
+
+def test_in_set():
+    sets = {"blacklist": AddressSet("blacklist", addresses=[WBNB, USDT])}
+    spec = {"field": "token", "op": "in_set", "value": "blacklist"}
+    # 与大小写无关
+    assert _matches(spec, {"token": WBNB.upper().replace("0X", "0x")}, sets)
+    assert not _matches(spec, {"token": TOKEN}, sets)
+    assert _matches({**spec, "op": "not_in_set"}, {"token": TOKEN}, sets)
+
+
+def test_undefined_set_and_unknown_op_raise():
+    with pytest.raises(ValueError):
+        compile_predicate({"field": "token", "op": "in_set", "value": "missing"})
+    with pytest.raises(ValueError):
+        compile_predicate({"field": "x", "op": "regex", "value": ".*"})
+
+
+def test_combinators_and_fields():
+    spec = {
+        "any": [
+            {"not": {"field": "a", "op": "eq", "value": 1}},
+            {
+                "all": [
+                    {"field": "b", "op": "gt", "value": 0},
+                    {"field": "a", "op": "eq_field", "value": "c"},
+                ]
+            },
+        ]
+    }
+    test, fields = compile_predicate(spec)
+    assert fields == ("a", "b", "c")
+    assert test({"a": 2, "b": 0, "c": 0})
+    assert test({"a": 1, "b": 1, "c": 1})
+    assert not test({"a": 1, "b": 1, "c": 2})
+
+
+def test_missing_field_does_not_match():
+    rule = Rule({"name": "r", "when": {"field": "x", "op": "lt", "value": 1}})
+    assert not rule.matches({})
+    assert not rule.matches({"x": None})
+
+
+def _enricher(calls):
+    """
+    metadata（代价 1）同时产出 name 和 symbol；market_cap（代价 2）依赖 token；
+    holders（代价 3）依赖 market_cap；score（代价 4）不依赖其他字段
+    """
+    enricher = Enricher("test", stats_every=0)
+
+    @enricher.provider("name", "symbol", cost=1)
+    async def metadata(ctx):
+        calls.append("metadata")
+        return {"name": "Hot Dog", "symbol": "HDOG"}
+
+    @enricher.provider("market_cap", cost=2, requires=("token",))
+    async def market_cap(ctx):
+        calls.append("market_cap")
+        return {"market_cap": 500000}
+
+    @enricher.provider("holders", cost=3, requires=("market_cap",))
+    async def holders(ctx):
+        calls.append("holders")
+        return {"holders": 10}
+
+    @enricher.provider("score", cost=4)
+    async def score(ctx):
+        calls.append("score")
+        return {"score": 0}
+
+    return enricher
+
+
+def test_cost_of_sums_distinct_providers():
+    enricher = _enricher([])
+    # name 和 symbol 来自同一个 provider，只算一次
+    assert enricher.cost_of(("name", "symbol")) == 1
+    assert enricher.cost_of(("name", "market_cap")) == 3
+    # holders 依赖 market_cap，与 market_cap 一起时 market_cap 只算一次
+    assert enricher.cost_of(("holders", "market_cap")) == 5
+    # ctx 中已有的字段和已调用过的 provider 不计
+    ctx = enricher.context({"token": TOKEN, "market_cap": 1})
+    assert enricher.cost_of(("holders",), ctx) == 3
+    ctx.fetched.add("metadata")
+    assert enricher.cost_of(("name", "symbol"), ctx) == 0
+
+
+def _write_rules(tmp_path, rules, address_sets=None):
+    path = tmp_path / "rules.json"
+    config = {"test": rules}
+    if address_sets is not None:
+        config["address_sets"] = address_sets
+    _touch(path, json.dumps(config))
+    return path
+
+
+CAP_RULE = {
+    "name": "cap",
+    "when": {"field": "market_cap", "op": "lt", "value": 1000000},
+}
+CAT_RULE = {
+    "name": "cat",
+    "when": {
+        "all": [
+            {"field": "name", "op": "endswith", "value": "cat", "ignore_case": True},
+            {"field": "symbol", "op": "endswith", "value": "cat", "ignore_case": True},
+        ]
+    },
+}
+HOLDERS_RULE = {
+    "name": "holders",
+    "when": {"field": "holders", "op": "lt", "value": 100},
+}
+
+
+def test_rules_sorted_by_cost(tmp_path):
+    enricher = _enricher([])
+    path = _write_rules(tmp_path, [HOLDERS_RULE, CAP_RULE, CAT_RULE])
+    engine = RuleEngine(str(path), "test", cost=enricher.cost_of)
+    assert [r.name for r in engine.rules] == ["cat", "cap", "holders"]
+    assert [r.cost for r in engine.rules] == [1, 2, 5]
+
+
+def test_evaluate_fetches_lazily_in_cost_order(tmp_path):
+    calls = []
+    enricher = _enricher(calls)
+    path = _write_rules(tmp_path, [HOLDERS_RULE, CAP_RULE, CAT_RULE])
+    engine = RuleEngine(str(path), "test", cost=enricher.cost_of)
+
+    ctx = enricher.context({"token": TOKEN})
+    rule = asyncio.run(engine.evaluate(ctx, enricher.resolve))
+    # cat 未命中，cap 命中；holders 规则没有求值，不调用 holders
+    assert rule.name == "cap"
+    assert calls == ["metadata", "market_cap"]
+
+
+def test_evaluate_reorders_by_remaining_cost(tmp_path):
+    calls = []
+    enricher = _enricher(calls)
+    big_cap = {
+        "name": "big_cap",
+        "when": {"field": "market_cap", "op": "gt", "value": 10**9},
+    }
+    score = {"name": "score", "when": {"field": "score", "op": "lt", "value": 100}}
+    path = _write_rules(tmp_path, [HOLDERS_RULE, score, big_cap])
+    engine = RuleEngine(str(path), "test", cost=enricher.cost_of)
+    # 加载时按一个字段都没有的代价排序：big_cap 2、score 4、holders 5
+    assert [r.name for r in engine.rules] == ["big_cap", "score", "holders"]
+
+    ctx = enricher.context({"token": TOKEN})
+    rule = asyncio.run(engine.evaluate(ctx, enricher.resolve))
+    # big_cap 取到 market_cap 后未命中，holders 只剩 3，先于 score 求值并命中
+    assert rule.name == "holders"
+    assert calls == ["market_cap", "holders"]
+
+
+def test_any_short_circuits_before_expensive_fields(tmp_path):
+    calls = []
+    enricher = _enricher(calls)
+    rule = {
+        "name": "either",
+        "when": {
+            "any": [
+                # 写在前面但代价高，应在便宜的子谓词之后求值
+                {"field": "holders", "op": "lt", "value": 100},
+                {
+                    "field": "symbol",
+                    "op": "endswith",
+                    "value": "dog",
+                    "ignore_case": True,
+                },
+            ]
+        },
+    }
+    path = _write_rules(tmp_path, [rule])
+    engine = RuleEngine(str(path), "test", cost=enricher.cost_of)
+    ctx = enricher.context({"token": TOKEN})
+    assert asyncio.run(engine.evaluate(ctx, enricher.resolve)).name == "either"
+    assert calls == ["metadata"]
+
+
+def test_evaluate_without_resolve_uses_ctx_only(tmp_path):
+    path = _write_rules(tmp_path, [CAP_RULE])
+    engine = RuleEngine(str(path), "test")
+    assert asyncio.run(engine.evaluate({"market_cap": 1})).name == "cap"
+    assert asyncio.run(engine.evaluate({})) is None
+
+
+def test_rule_engine_reload(tmp_path):
+    path = _write_rules(tmp_path, [CAP_RULE])
+    engine = RuleEngine(str(path), "test")
+    _touch(path, json.dumps({"test": [CAP_RULE, HOLDERS_RULE]}))
+    asyncio.run(engine.maybe_reload())
+    assert [r.name for r in engine.rules] == ["cap", "holders"]
+
+    # 解析失败时保留旧规则
+    _touch(path, "{")
+    asyncio.run(engine.maybe_reload())
+    assert [r.name for r in engine.rules] == ["cap", "holders"]
+
+
+def test_rule_engine_address_sets(tmp_path):
+    _touch(tmp_path / "blacklist.txt", f"{WBNB}\n")
+    rule = {
+        "name": "blacklisted",
+        "when": {"field": "token", "op": "in_set", "value": "blacklist"},
+    }
+    address_sets = {"blacklist": {"files": ["blacklist.txt"], "addresses": [USDT]}}
+    path = _write_rules(tmp_path, [rule], address_sets)
+    engine = RuleEngine(str(path), "test")
+    assert asyncio.run(engine.evaluate({"token": USDT})).name == "blacklisted"
+    assert asyncio.run(engine.evaluate({"token": TOKEN})) is None
+
+    # 只改地址文件时，run() 的定时检查也会重新加载地址集合
+    _touch(tmp_path / "blacklist.txt", f"{TOKEN}\n")
+    asyncio.run(engine.maybe_reload())
+    assert asyncio.run(engine.evaluate({"token": TOKEN})).name == "blacklisted"
+
+
+def test_address_key():
+    assert address_key(WBNB) == bytes.fromhex(WBNB[2:])
+    assert address_key(WBNB.upper().replace("0X", "0x")) == address_key(WBNB)
+    assert address_key(WBNB[2:]) == address_key(WBNB)
+    assert address_key("0x1234") is None
+    assert address_key("0x" + "zz" * 20) is None
+    assert address_key(None) is None
+
+
+def test_address_set_files_and_reload(tmp_path):
+    path = tmp_path / "blacklist.txt"
+    _touch(path, f"# 注释\n{WBNB}  # WBNB\n\nnot-an-address\n")
+    sets = load_address_sets(
+        {"blacklist": {"files": ["blacklist.txt"], "addresses": [USDT]}},
+        str(tmp_path),
+    )
+    blacklist = sets["blacklist"]
+    assert len(blacklist) == 2
+    assert WBNB in blacklist and USDT in blacklist
+    assert bytes.fromhex(WBNB[2:]) in blacklist
+    assert TOKEN not in blacklist
+
+    _touch(path, f"{TOKEN}\n")
+    asyncio.run(blacklist.maybe_reload())
+    assert TOKEN in blacklist and USDT in blacklist
+    assert WBNB not in blacklist
+
+    # 文件读取失败时保留旧集合
+    path.unlink()
+    asyncio.run(blacklist.maybe_reload())
+    assert TOKEN in blacklist
@@ -0,0 +1,167 @@
+"""
+事件链路追踪
+
+每个链上事件从 WebSocket 收到起建立一个 Trace，处理过程中各阶段（排队、解码、
+各个 provider 的 RPC / 币安请求、等待发送、Telegram 发送）用单调时钟记录起止
+时间。当前 Trace 放在 contextvar 中，处理函数、provider 和 Telegram sink 不需要
+层层传参；日志记录自动带上 trace id（见 logsetup.py）。
+
+"出块→收到" 用 newHeads 心跳中的出块时间（秒级精度）与收到日志的时间相减，
+反映节点推送的延迟，不计入总耗时。
+
+Trace 在处理函数结束、且对应的 Telegram 消息发送完成后结束；总耗时超过
+slow_ms 时把各阶段写入 slow_file（每行一个 JSON）。
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("trace", default=None)
+
+# 由各脚本调用 configure() 修改
+footer_enabled = False
+slow_ms = 5000
+slow_file = "slow_traces.jsonl"
+
+# 区块号 -> 出块时间（秒），来自 newHeads 心跳
+_block_times = OrderedDict()
+BLOCK_TIMES_SIZE = 256
+
+
+def configure(footer=None, slow_threshold_ms=None, slow_path=None):
+    """footer: Telegram 消息末尾附加耗时；slow_threshold_ms 为 0 时不写慢事件文件"""
+    global footer_enabled, slow_ms, slow_file
+    if footer is not None:
+        footer_enabled = footer
+    if slow_threshold_ms is not None:
+        slow_ms = slow_threshold_ms
+    if slow_path is not None:
+        slow_file = slow_path
+
+
+def record_head(head):
+    """newHeads 推送的回调，记录出块时间"""
+    try:
+        _block_times[int(head["number"], 16)] = int(head["timestamp"], 16)
+    except (KeyError, TypeError, ValueError):
+        return
+    if len(_block_times) > BLOCK_TIMES_SIZE:
+        _block_times.popitem(last=False)
+
+
+class Trace:
+    """
+    name: 事件处理函数名
+    received: 收到推送时的 time.monotonic()，缺省为现在
+    block: 事件所在区块号，用于计算出块→收到
+    """
+
+    __slots__ = ("id", "name", "start", "spans", "node_ms", "published_at", "_holds")
+
+    def __init__(self, name, received=None, block=None):
+        now = time.monotonic()
+        self.id = os.urandom(4).hex()
+        self.name = name
+        self.start = now if received is None else min(received, now)
+        self.spans = []
+        if self.start < now:
+            self.spans.append(("排队", self.start, now))
+        self.node_ms = None
+        block_time = _block_times.get(block)
+        if block_time is not None:
+            received_wall = time.time() - (now - self.start)
+            self.node_ms = max(0.0, (received_wall - block_time) * 1000)
+        self.published_at = None
+        self._holds = 1
+
+    def add(self, name, start, end):
+        self.spans.append((name, start, end))
+
+    def hold(self):
+        """还有一个阶段（如 Telegram 发送）要等待"""
+        self._holds += 1
+
+    def release(self):
+        self._holds -= 1
+        if self._holds == 0:
+            self._finish()
+
+    def total_ms(self):
+        end = max((end for _, _, end in self.spans), default=self.start)
+        return (end - self.start) * 1000
+
+    def stages(self):
+        """按阶段名合并的 [(名称, 毫秒)]，保持首次出现的顺序"""
+        stages = {}
+        for name, start, end in self.spans:
+            stages[name] = stages.get(name, 0.0) + (end - start) * 1000
+        return list(stages.items())
+
+    def footer(self):
+        """Telegram 消息末尾的耗时行，放在代码格式里避免 Markdown 解析阶段名"""
+        parts = [f"⏱ {(time.monotonic() - self.start) * 1000:.0f}ms"]
+        if self.node_ms is not None:
+            parts.append(f"出块→收到 {self.node_ms:.0f}")
+        parts += [f"{name} {ms:.0f}" for name, ms in self.stages()]
+        return "`" + " | ".join(parts) + "`"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "total_ms": round(self.total_ms(), 1),
+            "node_ms": None if self.node_ms is None else round(self.node_ms),
+            "stages": {name: round(ms, 1) for name, ms in self.stages()},
+            "ts": time.time(),
+        }
+
+    def _finish(self):
+        total = self.total_ms()
+        summary = " | ".join(f"{name} {ms:.0f}ms" for name, ms in self.stages())
+        if self.node_ms is not None:
+            summary = f"出块→收到 {self.node_ms:.0f}ms | {summary}"
+        logger.debug("[%s] %s 总耗时 %.0fms: %s", self.id, self.name, total, summary)
+        if slow_ms and total >= slow_ms:
+            logger.warning(
+                f"[{self.id}] {self.name} 处理耗时 {total:.0f}ms，超过 {slow_ms}ms: {summary}"
+            )
+            try:
+                with open(slow_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"慢事件写入失败: {e}")
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def activate(trace):
+    """在 with 块内把 trace 设为当前 Trace"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def span(name):
+    """记录当前 Trace 的一个阶段，没有当前 Trace 时什么也不做"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.monotonic())
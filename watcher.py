@@ -0,0 +1,228 @@
+"""
+新币市值跟踪
+
+在首次推送之后继续跟踪一批最近上线的代币，按批次重新拉取市场信息，
+市值向上突破设定门槛时回调一次（每个门槛每个代币只提醒一次）。市场信息默认
+来自币安API；首次推送的市值来自其他来源（如链上定价）时应传入同一来源的
+fetch，否则突破判断会拿两种口径的市值比较。
+
+轮询间隔自适应：刚上线或市值变化剧烈的代币频繁轮询，长时间没有变化的代币
+间隔逐步拉长；超过最大跟踪时长或长时间无变化的代币会被移出。所有轮询共享
+一个每分钟请求预算（令牌桶），预算不足时推迟到下一轮。
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from market import get_token_market_info
+
+logger = logging.getLogger(__name__)
+
+
+async def _fetch_binance(token):
+    return await get_token_market_info(token.address)
+
+
+class WatchedToken:
+    __slots__ = (
+        "address",
+        "name",
+        "symbol",
+        "extra",
+        "added_at",
+        "initial_market_cap",
+        "market_cap",
+        "last_change_at",
+        "interval",
+        "next_poll",
+        "next_threshold",
+    )
+
+    def __init__(self, address, name, symbol, market_cap, extra, now):
+        self.address = address
+        self.name = name
+        self.symbol = symbol
+        self.extra = extra
+        self.added_at = now
+        self.initial_market_cap = market_cap
+        self.market_cap = market_cap
+        self.last_change_at = now
+        self.interval = 0.0
+        self.next_poll = now
+        self.next_threshold = 0
+
+
+class MarketCapWatcher:
+    """
+    thresholds: 市值门槛（美元），从小到大
+    on_cross: async on_cross(token, threshold, market_info)，突破门槛时调用
+    requests_per_minute: 所有代币共享的每分钟请求预算
+    fetch: async fetch(token) -> market_info（至少含 marketCap、stale）或 None，
+        缺省为币安API（market.get_token_market_info）
+    """
+
+    def __init__(
+        self,
+        thresholds,
+        on_cross,
+        fetch=None,
+        max_tokens=500,
+        requests_per_minute=60,
+        batch_size=10,
+        min_interval=15,
+        max_interval=600,
+        young_age=600,
+        hot_change=0.2,
+        idle_change=0.05,
+        idle_timeout=3600,
+        max_age=6 * 3600,
+    ):
+        self.thresholds = sorted(thresholds)
+        self.on_cross = on_cross
+        self.fetch = fetch or _fetch_binance
+        self.max_tokens = max_tokens
+        self.requests_per_minute = requests_per_minute
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.young_age = young_age
+        self.hot_change = hot_change
+        self.idle_change = idle_change
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+
+        self.tokens = {}
+        self._heap = []
+        self._seq = itertools.count()
+        # 令牌桶：最多攒 10 秒的预算
+        self._budget = self._budget_capacity = max(1.0, requests_per_minute / 6)
+        self._budget_at = time.monotonic()
+
+    def track(self, address, name="", symbol="", market_cap=0.0, **extra):
+        """开始跟踪一个代币，已在跟踪中则忽略"""
+        key = address.lower()
+        if key in self.tokens or not self.thresholds:
+            return
+        if len(self.tokens) >= self.max_tokens:
+            # 移出最久没有变化的代币
+            oldest = min(self.tokens.values(), key=lambda t: t.last_change_at)
+            self._evict(oldest, "跟踪数量已满")
+
+        now = time.monotonic()
+        token = WatchedToken(address, name, symbol, market_cap or 0.0, extra, now)
+        token.interval = self.min_interval
+        token.next_poll = now + self.min_interval
+        # 已经超过的门槛不再提醒
+        while (
+            token.next_threshold < len(self.thresholds)
+            and token.market_cap >= self.thresholds[token.next_threshold]
+        ):
+            token.next_threshold += 1
+        if token.next_threshold >= len(self.thresholds):
+            return
+        self.tokens[key] = token
+        self._schedule(token)
+        logger.info(f"开始跟踪市值: {name} ({symbol}) {address}")
+
+    def _schedule(self, token):
+        heapq.heappush(self._heap, (token.next_poll, next(self._seq), token))
+
+    def _evict(self, token, reason):
+        self.tokens.pop(token.address.lower(), None)
+        logger.info(f"停止跟踪市值 ({reason}): {token.name} ({token.symbol})")
+
+    def _refill_budget(self, now):
+        rate = self.requests_per_minute / 60
+        self._budget = min(
+            self._budget_capacity, self._budget + (now - self._budget_at) * rate
+        )
+        self._budget_at = now
+
+    def _due_tokens(self, now):
+        """取出已到期的代币，数量受批大小和请求预算限制"""
+        self._refill_budget(now)
+        due = []
+        while self._heap and len(due) < self.batch_size and self._budget >= 1:
+            next_poll, _, token = self._heap[0]
+            if next_poll > now:
+                break
+            heapq.heappop(self._heap)
+            # 已被移出或重新排期过的旧条目直接丢弃
+            if self.tokens.get(token.address.lower()) is not token:
+                continue
+            if token.next_poll != next_poll:
+                continue
+            if now - token.added_at > self.max_age:
+                self._evict(token, "超过最大跟踪时长")
+                continue
+            if now - token.last_change_at > self.idle_timeout:
+                self._evict(token, "长时间无变化")
+                continue
+            self._budget -= 1
+            due.append(token)
+        return due
+
+    def _next_interval(self, token, change, now):
+        if change >= self.hot_change or now - token.added_at < self.young_age:
+            return self.min_interval
+        return min(self.max_interval, token.interval * 2)
+
+    async def _poll(self, token):
+        try:
+            market_info = await self.fetch(token)
+        except Exception as e:
+            logger.warning(f"市值跟踪获取市场信息异常: {e}, token: {token.address}")
+            market_info = None
+        now = time.monotonic()
+        if market_info and not market_info["stale"]:
+            market_cap = market_info["marketCap"]
+            previous = token.market_cap
+            change = abs(market_cap - previous) / previous if previous else 1.0
+            if change >= self.idle_change:
+                token.last_change_at = now
+            token.market_cap = market_cap
+            token.interval = self._next_interval(token, change, now)
+
+            while (
+                token.next_threshold < len(self.thresholds)
+                and market_cap >= self.thresholds[token.next_threshold]
+            ):
+                threshold = self.thresholds[token.next_threshold]
+                token.next_threshold += 1
+                # 一次跨过多个门槛只提醒最高的那个
+                if (
+                    token.next_threshold < len(self.thresholds)
+                    and market_cap >= self.thresholds[token.next_threshold]
+                ):
+                    continue
+                try:
+                    await self.on_cross(token, threshold, market_info)
+                except Exception as e:
+                    logger.warning(f"市值突破提醒发送失败: {e}")
+
+            if token.next_threshold >= len(self.thresholds):
+                self._evict(token, "已突破全部门槛")
+                return
+        else:
+            # 没拿到新数据，退避但不算作活跃
+            token.interval = min(self.max_interval, token.interval * 2)
+
+        token.next_poll = now + token.interval
+        self._schedule(token)
+
+    async def run(self, tick=1.0):
+        """后台循环：每个 tick 取一批到期代币并发拉取"""
+        if not self.thresholds:
+            return
+        logger.info(
+            f"市值跟踪已启动，门槛: {self.thresholds}，预算: {self.requests_per_minute} 次/分钟"
+        )
+        while True:
+            due = self._due_tokens(time.monotonic())
+            if due:
+                await asyncio.gather(*(self._poll(token) for token in due))
+            else:
+                await asyncio.sleep(tick)